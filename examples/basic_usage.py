@@ -19,13 +19,8 @@ manager.insert_cell(3, "code", "df = pd.DataFrame(data)\nprint(df)")
 
 # Example 3: Executing cells
 print("\n=== Example 3: Executing Cells ===")
-outputs = manager.execute_cell(1)  # Import statements
-print("Executed imports")
-
-outputs = manager.execute_cell(2)  # Create data
-print("Created data")
-
-outputs = manager.execute_cell(3)  # Display dataframe
+# Imports, data creation and display run in one call; the notebook is saved once
+outputs = manager.execute_cells([1, 2, 3])
 print("Outputs:", outputs)
 
 # Example 4: Executing code directly (without saving to notebook)
@@ -12,11 +12,13 @@ print("1. Creating a notebook with 5 cells...")
 manager.use_notebook("reorder_demo", "reorder_demo.ipynb", mode="create")
 
 # Add cells
-manager.insert_cell(0, "markdown", "# Data Analysis Workflow")
-manager.insert_cell(1, "code", "import pandas as pd\nimport numpy as np")
-manager.insert_cell(2, "code", "data = {'x': [1,2,3,4,5], 'y': [2,4,6,8,10]}")
-manager.insert_cell(3, "code", "df = pd.DataFrame(data)")
-manager.insert_cell(4, "code", "print(df.describe())")
+manager.insert_cells(0, [
+    ("markdown", "# Data Analysis Workflow"),
+    ("code", "import pandas as pd\nimport numpy as np"),
+    ("code", "data = {'x': [1,2,3,4,5], 'y': [2,4,6,8,10]}"),
+    ("code", "df = pd.DataFrame(data)"),
+    ("code", "print(df.describe())"),
+])
 
 # Read the initial structure
 print("\n2. Initial notebook structure:")
@@ -47,11 +49,13 @@ print("   New order:        [1, 0, 3, 2, 4]")
 manager.unuse_notebook("reorder_demo")
 manager.use_notebook("reorder_demo", "reorder_demo.ipynb", mode="create")
 
-manager.insert_cell(0, "markdown", "# Data Analysis Workflow")
-manager.insert_cell(1, "code", "import pandas as pd\nimport numpy as np")
-manager.insert_cell(2, "code", "data = {'x': [1,2,3,4,5], 'y': [2,4,6,8,10]}")
-manager.insert_cell(3, "code", "df = pd.DataFrame(data)")
-manager.insert_cell(4, "code", "print(df.describe())")
+manager.insert_cells(0, [
+    ("markdown", "# Data Analysis Workflow"),
+    ("code", "import pandas as pd\nimport numpy as np"),
+    ("code", "data = {'x': [1,2,3,4,5], 'y': [2,4,6,8,10]}"),
+    ("code", "df = pd.DataFrame(data)"),
+    ("code", "print(df.describe())"),
+])
 
 result = manager.reorder_cells([1, 0, 3, 2, 4])
 print(result)
@@ -86,8 +90,7 @@ sections = [
     ("code", "result = df.mean()"),
 ]
 
-for idx, (cell_type, source) in enumerate(sections):
-    manager.insert_cell(idx, cell_type, source)
+manager.insert_cells(0, sections)
 
 print("\nInitial structure (random order):")
 print(manager.read_notebook("complex", response_format="brief"))
@@ -26,6 +26,7 @@ from pathlib import Path
 from headlesnb.dialoghelper_server import (
     app,
     init_manager,
+    init_manager_in_background,
     serve
 )
 
@@ -42,21 +43,21 @@ def setup_demo_dialog(root_path: str = ".", dialog_name: str = "demo"):
     )
     print(f"Dialog setup: {result}")
 
-    # Add some demo messages
-    manager.add_message(
-        content="# Welcome to Dialog Helper\n\nThis is a demo dialog.",
-        msg_type="note"
-    )
-
-    manager.add_message(
-        content="import pandas as pd\nimport numpy as np",
-        msg_type="code"
-    )
-
-    manager.add_message(
-        content="What are the main features of pandas?",
-        msg_type="prompt"
-    )
+    # Add some demo messages (one save, one undo entry)
+    manager.add_messages([
+        {
+            "content": "# Welcome to Dialog Helper\n\nThis is a demo dialog.",
+            "msg_type": "note"
+        },
+        {
+            "content": "import pandas as pd\nimport numpy as np",
+            "msg_type": "code"
+        },
+        {
+            "content": "What are the main features of pandas?",
+            "msg_type": "prompt"
+        }
+    ])
 
     print(f"Added 3 demo messages to '{dialog_name}'")
 
@@ -105,9 +106,11 @@ def main():
     root = Path(args.root_path)
     root.mkdir(parents=True, exist_ok=True)
 
-    # Setup demo dialog unless disabled
+    # Setup demo dialog unless disabled. The kernel boots on a worker
+    # thread while the server binds; the first request waits for it.
     if not args.no_demo:
-        setup_demo_dialog(
+        init_manager_in_background(
+            setup_demo_dialog,
             root_path=str(root),
             dialog_name=args.dialog_name
         )
@@ -22,9 +22,7 @@ manager.insert_cell(0, "code", "import numpy as np")
 manager.insert_cell(1, "code", "data = np.array([1, 2, 3, 4, 5])")
 manager.insert_cell(2, "code", "mean = data.mean()\nprint(f'Mean: {mean}')")
 
-manager.execute_cell(0)
-manager.execute_cell(1)
-outputs = manager.execute_cell(2)
+outputs = manager.execute_cells([0, 1, 2])
 print("Analysis output:", outputs)
 
 # Switch to the other notebook
@@ -38,9 +36,7 @@ manager.insert_cell(0, "code", "import pandas as pd")
 manager.insert_cell(1, "code", "raw_data = [10, 20, 30, 40, 50]")
 manager.insert_cell(2, "code", "df = pd.DataFrame({'values': raw_data})\nprint(df)")
 
-manager.execute_cell(0)
-manager.execute_cell(1)
-outputs = manager.execute_cell(2)
+outputs = manager.execute_cells([0, 1, 2])
 print("Data prep output:", outputs)
 
 # List kernels to see both are running
@@ -70,8 +70,7 @@ manager.use_notebook("complex", "complex.ipynb", mode="create")
 
 # Add 5 cells
 print("   Adding 5 cells...")
-for i in range(5):
-    manager.insert_cell(i, "code", f"cell_{i} = {i}")
+manager.insert_cells(0, [("code", f"cell_{i} = {i}") for i in range(5)])
 
 # Rearrange twice
 print("   Rearranging cells (1st time - reverse)...")
@@ -146,9 +145,11 @@ manager.unuse_notebook("overwrite_test")
 manager.use_notebook("delete_test", "delete_test.ipynb", mode="create")
 
 # Add multiple cells
-for i in range(5):
-    manager.insert_cell(i, "markdown", f"# Section {i+1}")
-    manager.insert_cell(i*2+1, "code", f"data_{i} = {i * 10}")
+manager.insert_cells(0, [
+    cell
+    for i in range(5)
+    for cell in (("markdown", f"# Section {i+1}"), ("code", f"data_{i} = {i * 10}"))
+])
 
 print("Notebook with 10 cells:")
 print(manager.read_notebook("delete_test", response_format="brief"))
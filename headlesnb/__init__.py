@@ -2,40 +2,62 @@
 
 # Patch execnb.shell.CaptureShell with missing methods
 from execnb.shell import CaptureShell
+import importlib
 import threading
 
-if not hasattr(CaptureShell, '_stop_execution'):
-    CaptureShell._stop_execution = False
-    CaptureShell._execution_lock = threading.Lock()
+if not getattr(CaptureShell, '_headlesnb_patched', False):
+    def _stop_execution_event(self):
+        """Per-shell Event set by stop_execution and checked between cells"""
+        event = self.__dict__.get('_stop_event')
+        if event is None:
+            event = self.__dict__.setdefault('_stop_event', threading.Event())
+        return event
 
-if not hasattr(CaptureShell, 'stop_execution'):
     def _stop_execution_method(self):
         """Request to stop the current execution"""
-        self._stop_execution = True
-    CaptureShell.stop_execution = _stop_execution_method
+        self._stop_execution.set()
 
-if not hasattr(CaptureShell, 'restart_kernel'):
     def _restart_kernel_method(self):
         """Restart the kernel by resetting the namespace"""
         self.reset(new_session=True)
         self.exc = None
         self.result = None
-        self._stop_execution = False
+        self._stop_execution.clear()
+
+    CaptureShell._stop_execution = property(_stop_execution_event)
+    CaptureShell.stop_execution = _stop_execution_method
     CaptureShell.restart_kernel = _restart_kernel_method
+    CaptureShell._headlesnb_patched = True
 
 from .nb_manager import NotebookManager
 from .base import BaseManager, ManagedItemInfo
-from .tools import *
-
-# DialogManager imports
-from .dialogmanager import (
-    DialogManager,
-    DialogInfo,
-    Message,
-    generate_msg_id,
-    dialog_to_notebook,
-    notebook_to_dialog,
-)
+
+# DialogManager symbols and MCP tool schemas are imported on first access
+# (PEP 562) so that `from headlesnb import NotebookManager` doesn't load them
+_LAZY_IMPORTS = {
+    'TOOL_SCHEMAS': '.tools',
+    'get_all_tool_schemas': '.tools',
+    'DialogManager': '.dialogmanager',
+    'DialogInfo': '.dialogmanager',
+    'Message': '.dialogmanager',
+    'generate_msg_id': '.dialogmanager',
+    'dialog_to_notebook': '.dialogmanager',
+    'notebook_to_dialog': '.dialogmanager',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
+
 
 __version__ = "0.1.0"
 __all__ = [
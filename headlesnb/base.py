@@ -15,16 +15,238 @@ Example:
     ...         return "notebook"
 """
 
+import os
+import re
+import stat
+import time
+import heapq
+import fnmatch
+import logging
 import threading
+from collections import deque, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import cached_property, lru_cache, partial
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, NamedTuple, Union
 from datetime import datetime
 from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
 
 from execnb.shell import CaptureShell
 
-from .history import OperationHistory
+from .history import OperationHistory, DEFAULT_HISTORY_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class _FileEntry(NamedTuple):
+    """One row of the list_files table, in column order."""
+    path: str
+    type: str
+    size: str
+    modified: str
+
+
+@lru_cache(maxsize=64)
+def _glob_matcher(pattern: str):
+    """Return a compiled match function for a list_files glob pattern.
+
+    Cached so paginated or repeated list_files calls with the same pattern
+    compile it once, and the walk calls the regex directly per entry. Names
+    are matched with "/" separators; case folding on case-insensitive
+    platforms is done by the regex instead of os.path.normcase per name.
+    """
+    flags = re.IGNORECASE if os.path.normcase("A") == "a" else 0
+    return re.compile(fnmatch.translate(pattern), flags).match
+
+
+def _sorted_page(matches: list, start_index: int, end_index: int) -> list:
+    """Return matches[start_index:end_index] of the (rel_path, ...) list sorted by path.
+
+    Only the items up to the page are ordered: the first end_index with a
+    bounded heap, or for pages near the end the last len - start_index,
+    whichever is fewer (O(N log k)). The whole list is sorted only when the
+    page needs all of it.
+    """
+    total = len(matches)
+    end_index = min(end_index, total)
+    if start_index >= end_index:
+        return []
+    tail = total - start_index
+    if end_index < total and end_index <= tail:
+        return heapq.nsmallest(end_index, matches, key=itemgetter(0))[start_index:]
+    if tail < total:
+        page = heapq.nlargest(tail, matches, key=itemgetter(0))
+        page.reverse()
+        return page[:end_index - start_index]
+    matches.sort(key=itemgetter(0))
+    return matches[start_index:end_index]
+
+
+# Inline image payloads above this many characters are truncated in
+# formatted outputs; the full data stays in the cell outputs on disk
+MAX_INLINE_PAYLOAD = 256 * 1024
+
+
+def _join_text(value) -> str:
+    """Join an nbformat multiline value, which may be a str or a list of lines.
+
+    ''.join on a str iterates it character by character, so strings (e.g.
+    base64 images) are returned as is.
+    """
+    return value if isinstance(value, str) else ''.join(value)
+
+
+def _format_mime_data(data: dict) -> Union[str, Dict, None]:
+    """Pick the display form of an execute_result/display_data bundle."""
+    if 'text/plain' in data:
+        return _join_text(data['text/plain'])
+    if 'text/html' in data:
+        return {'type': 'html', 'content': _join_text(data['text/html'])}
+    for fmt in ('png', 'jpeg'):
+        if f'image/{fmt}' in data:
+            payload = _join_text(data[f'image/{fmt}'])
+            if len(payload) > MAX_INLINE_PAYLOAD:
+                return {'type': 'image', 'format': fmt, 'size': len(payload),
+                        'truncated': True, 'data': payload[:256]}
+            return {'type': 'image', 'format': fmt, 'data': payload}
+    return None
+
+
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+
+def _format_size(size: int) -> str:
+    """Format a byte count as "512 B", "1.5 KB", ... "2.0 TB".
+
+    The unit index is log2(size) // 10, taken from int.bit_length().
+    """
+    idx = min((size.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1) if size > 0 else 0
+    if idx == 0:
+        return f"{size} B"
+    return f"{size / (1 << (10 * idx)):.1f} {_SIZE_UNITS[idx]}"
+
+
+@lru_cache(maxsize=4096)
+def _format_mtime(mtime: int) -> str:
+    """Format a whole-second mtime for list_files.
+
+    Cached because files created together share mtimes, and time.strftime
+    on a struct_time avoids building a datetime per row.
+    """
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(mtime))
+
+
+def _stat_or_none(path: str) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _stat_page(page: list) -> list:
+    """Stat the abs_path of each (rel_path, abs_path) pair, None where it fails.
+
+    Setting HEADLESNB_PARALLEL_SCAN=1 overlaps the stat calls on a thread
+    pool. stat is I/O-bound and releases the GIL, which pays off on network
+    filesystems (NFS, SMB, FUSE) where each call takes milliseconds.
+    """
+    paths = [abs_path for _, abs_path in page]
+    if len(paths) > 1 and os.environ.get("HEADLESNB_PARALLEL_SCAN") == "1":
+        with ThreadPoolExecutor(max_workers=min(32, len(paths))) as pool:
+            return list(pool.map(_stat_or_none, paths))
+    return [_stat_or_none(p) for p in paths]
+
+
+class _ListingCache:
+    """Directory walk for list_files with a small LRU of previous results.
+
+    Each cached walk remembers the mtime of every directory it scanned. Adding,
+    removing or renaming an entry changes its parent directory's mtime, so a
+    walk is reused only while all those mtimes are unchanged; re-validating
+    costs one stat per directory instead of a scandir of the whole tree.
+    Walks that saw a directory modified within the filesystem's timestamp
+    granularity of the scan are not cached, since a later change could leave
+    its mtime unchanged.
+    """
+
+    max_size = 32
+    racy_window_ns = 2_000_000_000  # coarsest common mtime resolution (FAT)
+
+    def __init__(self):
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def scan(self, root_path: Path, start_path: Path, max_depth: int, pattern: str) -> list:
+        """Return unsorted (rel_path, abs_path) pairs matching pattern under start_path."""
+        key = (str(start_path), max_depth, pattern)
+        cached = self._entries.get(key)
+        if cached is not None:
+            dir_mtimes, matches = cached
+            if self._unchanged(dir_mtimes):
+                self._entries.move_to_end(key)
+                return matches
+            self._entries.pop(key, None)
+
+        scan_start_ns = time.time_ns()
+        matches, dir_mtimes = self._walk(root_path, start_path, max_depth, pattern)
+
+        # A walk whose start directory could not be stat'ed is never cached
+        if dir_mtimes and all(mtime < scan_start_ns - self.racy_window_ns for _, mtime in dir_mtimes):
+            self._entries[key] = (dir_mtimes, matches)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return matches
+
+    @staticmethod
+    def _unchanged(dir_mtimes: list) -> bool:
+        try:
+            return all(os.stat(path).st_mtime_ns == mtime for path, mtime in dir_mtimes)
+        except OSError:
+            return False
+
+    @staticmethod
+    def _walk(root_path: Path, start_path: Path, max_depth: int, pattern: str):
+        # Iterative BFS with os.scandir, filtering during the walk. Relative
+        # paths are built from the parent's prefix rather than with
+        # os.path.join/relpath per entry. A directory is stat'ed before it is
+        # listed so a change made while listing invalidates the cached walk.
+        matches = []
+        dir_mtimes = []
+        match_path = "/" in pattern
+        matcher = _glob_matcher(pattern) if pattern else None
+        start_rel = os.path.relpath(start_path, root_path)
+        queue = deque([(str(start_path), "" if start_rel == os.curdir else start_rel, 0)])
+        add_match = matches.append
+        push_dir = queue.append
+        to_slash = match_path and os.sep != "/"
+        while queue:
+            current_path, rel_dir, depth = queue.popleft()
+            prefix = rel_dir + os.sep if rel_dir else ""
+            descend = depth < max_depth
+            try:
+                dir_mtimes.append((current_path, os.stat(current_path).st_mtime_ns))
+                with os.scandir(current_path) as it:
+                    for entry in it:
+                        name = entry.name
+                        rel_path = prefix + name
+                        if matcher is None or matcher(
+                            (rel_path.replace(os.sep, "/") if to_slash else rel_path)
+                            if match_path else name
+                        ):
+                            add_match((rel_path, entry.path))
+                        # Recurse regardless of the pattern so that e.g.
+                        # "*.csv" finds files in subdirectories. Symlinked
+                        # directories are listed but not followed.
+                        if descend:
+                            try:
+                                if entry.is_dir(follow_symlinks=False):
+                                    push_dir((entry.path, rel_path, depth + 1))
+                            except OSError:
+                                pass
+            except (PermissionError, OSError):
+                pass
+        return matches, dir_mtimes
 
 
 @dataclass
@@ -37,7 +259,8 @@ class ManagedItemInfo(ABC):
     Attributes:
         name: Unique identifier for this item.
         path: File system path where item is stored. None for in-memory items.
-        shell: CaptureShell instance for code execution. None if not needed.
+        shell: CaptureShell instance for code execution. None until first
+            needed; use ensure_shell() rather than creating it on load.
         history: Operation history for undo/redo support.
         created_at: Timestamp when item was created or loaded.
         last_activity: Timestamp of most recent modification.
@@ -53,11 +276,21 @@ class ManagedItemInfo(ABC):
     name: str
     path: Optional[Path] = None
     shell: Optional[CaptureShell] = None
-    history: OperationHistory = field(default_factory=lambda: OperationHistory(max_size=100))
+    history: OperationHistory = field(default_factory=OperationHistory)
     created_at: datetime = field(default_factory=datetime.now)
     last_activity: datetime = field(default_factory=datetime.now)
     is_active: bool = False
 
+    def ensure_shell(self) -> CaptureShell:
+        """Return the item's shell, starting it on first use.
+
+        Starting a CaptureShell spins up an IPython instance, so items that
+        are only inspected (listing, history, reads) never pay for it.
+        """
+        if self.shell is None:
+            self.shell = CaptureShell(path=self.path.parent) if self.path else CaptureShell()
+        return self.shell
+
 
 class BaseManager(ABC):
     """Base manager class with common functionality for notebooks and dialogs.
@@ -86,6 +319,8 @@ class BaseManager(ABC):
         ...         ...
     """
 
+    HISTORY_MAX_SIZE: int = DEFAULT_HISTORY_SIZE  # undo steps kept per item
+
     def __init__(self, root_path: str = "."):
         """Initialize the BaseManager.
 
@@ -93,10 +328,37 @@ class BaseManager(ABC):
             root_path: Root directory for file operations. Defaults to
                 current directory.
         """
-        self.root_path = Path(root_path).resolve()
+        # Resolved on first use of root_path; abspath pins a relative path to
+        # the current directory now without touching the filesystem
+        self._root_path_raw = Path(os.path.abspath(root_path))
+        # item_type_name is constant per subclass; resolve it once for messages
+        self._type_name = self.item_type_name
+        self._type_name_title = self._type_name.title()
+        # Message templates with the type name already bound; call sites
+        # only fill in the item name or path
+        title = self._type_name_title
+        self._msg_in_use = f"Error: {title} '{{name}}' is already in use."
+        self._msg_exists = f"Error: {title} '{{path}}' already exists."
+        self._msg_path_not_found = f"Error: {title} '{{path}}' not found."
+        self._msg_not_found = f"Error: {title} '{{name}}' not found"
+        self._msg_activated = f"... {title} '{{name}}' activated"
+        self._msg_released = f"... {title} '{{name}}' released"
+        self._msg_now_active = f"... {title} '{{name}}' is now active"
+        self._msg_no_active = f"Error: No active {self._type_name}."
         self._items: Dict[str, ManagedItemInfo] = {}
         self._active_item: Optional[str] = None
-        self._lock = threading.Lock()
+        self._lock = threading.Lock()  # guards _items/_active_item; never held across disk I/O
+        self._pending: set = set()  # names being loaded/created by use_item
+        # unuse_item saves on this single writer thread; in-flight saves are
+        # keyed by file path so use_item can wait before reopening the file
+        self._save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="headlesnb-save")
+        self._pending_saves: Dict[str, Future] = {}
+        self._list_cache = _ListingCache()
+
+    @cached_property
+    def root_path(self) -> Path:
+        """Root directory for file operations, with symlinks resolved."""
+        return self._root_path_raw.resolve()
 
     # ================== Abstract Methods (must implement) ==================
 
@@ -114,6 +376,9 @@ class BaseManager(ABC):
     def _load_item(self, name: str, path: str) -> ManagedItemInfo:
         """Load an item from disk.
 
+        Implementations should leave ``shell`` unset; code execution paths
+        call ``item.ensure_shell()`` so loading never starts a kernel.
+
         Args:
             name: Unique identifier for the item.
             path: Relative path to the item file.
@@ -131,6 +396,8 @@ class BaseManager(ABC):
     def _create_item(self, name: str, path: str) -> ManagedItemInfo:
         """Create a new item.
 
+        As with _load_item, the shell is created lazily via ensure_shell().
+
         Args:
             name: Unique identifier for the item.
             path: Relative path where item will be saved.
@@ -187,51 +454,34 @@ class BaseManager(ABC):
         max_depth = min(max_depth, 3)
         start_path = self.root_path / path if path else self.root_path
 
-        if not start_path.exists():
+        # Reuses the previous walk while no scanned directory has changed;
+        # only entries on the requested page are stat'ed
+        matches = self._list_cache.scan(self.root_path, start_path, max_depth, pattern)
+        # The walk (or the cache check) already stats start_path, so existence
+        # is only checked separately when nothing was found
+        if not matches and not start_path.exists():
             return f"Error: Path '{path}' does not exist"
 
-        files = []
-
-        def _scan_dir(current_path: Path, current_depth: int):
-            if current_depth > max_depth:
-                return
-            try:
-                for item in current_path.iterdir():
-                    rel_path = item.relative_to(self.root_path)
-                    if pattern and not item.match(pattern):
-                        continue
-                    try:
-                        stat = item.stat()
-                        if item.is_file():
-                            file_type = "notebook" if item.suffix == ".ipynb" else "file"
-                            size_str = self._format_size(stat.st_size)
-                        else:
-                            file_type = "directory"
-                            size_str = ""
-                        modified = datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
-                        files.append({
-                            "path": str(rel_path),
-                            "type": file_type,
-                            "size": size_str,
-                            "modified": modified
-                        })
-                        if item.is_dir():
-                            _scan_dir(item, current_depth + 1)
-                    except (PermissionError, OSError):
-                        files.append({"path": str(rel_path), "type": "error", "size": "", "modified": ""})
-            except (PermissionError, OSError):
-                pass
-
-        _scan_dir(start_path, 0)
-        files.sort(key=lambda x: x["path"])
-
-        total_count = len(files)
+        total_count = len(matches)
         end_index = start_index + limit if limit > 0 else total_count
-        paginated_files = files[start_index:end_index]
+        page = _sorted_page(matches, start_index, end_index)
+        paginated_files = []
+        for (rel_path, _), st in zip(page, _stat_page(page)):
+            if st is None:
+                paginated_files.append(_FileEntry(rel_path, "error", "", ""))
+                continue
+            if stat.S_ISREG(st.st_mode):
+                file_type = "notebook" if rel_path.endswith(".ipynb") else "file"
+                size_str = self._format_size(st.st_size)
+            else:
+                file_type = "directory"
+                size_str = ""
+            modified = _format_mtime(int(st.st_mtime))
+            paginated_files.append(_FileEntry(rel_path, file_type, size_str, modified))
 
         header = f"Showing {start_index + 1}-{min(end_index, total_count)} of {total_count} items\n"
         header += "Path\tType\tSize\tLast_Modified"
-        rows = [f"{f['path']}\t{f['type']}\t{f['size']}\t{f['modified']}" for f in paginated_files]
+        rows = ["\t".join(f) for f in paginated_files]
 
         return header + "\n" + "\n".join(rows)
 
@@ -262,31 +512,49 @@ class BaseManager(ABC):
             '... Dialog "my_dialog" activated'
         """
         with self._lock:
-            if name in self._items:
-                return f"Error: {self.item_type_name.title()} '{name}' is already in use."
+            if name in self._items or name in self._pending:
+                return self._msg_in_use.format(name=name)
+            if mode not in ("create", "connect"):
+                return f"Error: Invalid mode '{mode}'."
+            # Reserve the name so the lock can be released during disk I/O
+            self._pending.add(name)
 
+        try:
             full_path = self.root_path / path if path else None
+            if full_path is not None:
+                error = self._wait_for_save(self._save_key(full_path))
+                if error:
+                    return error
 
             if mode == "create":
                 if full_path and full_path.exists():
-                    return f"Error: {self.item_type_name.title()} '{path}' already exists."
+                    return self._msg_exists.format(path=path)
                 item = self._create_item(name, path)
-            elif mode == "connect":
+            else:
                 if full_path and not full_path.exists():
-                    return f"Error: {self.item_type_name.title()} '{path}' not found."
+                    return self._msg_path_not_found.format(path=path)
                 item = self._load_item(name, path)
-            else:
-                return f"Error: Invalid mode '{mode}'."
+            item.history.set_max_size(self.HISTORY_MAX_SIZE)
 
-            self._items[name] = item
-            self._active_item = name
-            item.is_active = True
+            with self._lock:
+                if self._active_item in self._items:
+                    self._items[self._active_item].is_active = False
+                self._items[name] = item
+                self._active_item = name
+                item.is_active = True
+        finally:
+            with self._lock:
+                self._pending.discard(name)
 
-            return f"... {self.item_type_name.title()} '{name}' activated"
+        return self._msg_activated.format(name=name)
 
     def unuse_item(self, name: str) -> str:
         """Release an item and save it to disk.
 
+        The save runs on a background writer thread, so the returned message
+        does not confirm that it succeeded; a failure is logged. Using the
+        same file again, or calling close(), waits for the save to finish.
+
         Args:
             name: Name of the item to release.
 
@@ -294,17 +562,74 @@ class BaseManager(ABC):
             Success message, or error if item not found.
         """
         with self._lock:
-            if name not in self._items:
-                return f"Error: {self.item_type_name.title()} '{name}' not found"
+            item = self._items.get(name)
+        if item is None:
+            return self._msg_not_found.format(name=name)
+        # Resolved outside the lock; the save is then queued in the same
+        # critical section that removes the item, so a use_item reopening
+        # the file can never miss it
+        key = self._save_key(item.path) if item.path is not None else None
 
-            item = self._items[name]
-            self._save_item(item)
+        with self._lock:
+            if self._items.get(name) is not item:
+                return self._msg_not_found.format(name=name)
             del self._items[name]
 
             if self._active_item == name:
                 self._active_item = next(iter(self._items.keys()), None)
 
-            return f"... {self.item_type_name.title()} '{name}' released"
+            # Save on the writer thread so the caller does not wait for disk I/O
+            if key is not None:
+                future = self._save_executor.submit(self._save_item, item)
+                self._pending_saves[key] = future
+
+        if key is None:
+            self._save_item(item)
+        else:
+            # Added outside the lock: an already finished future runs the
+            # callback right here
+            future.add_done_callback(partial(self._save_done, key))
+
+        return self._msg_released.format(name=name)
+
+    def close(self) -> None:
+        """Wait for pending background saves and stop the writer thread."""
+        self._save_executor.shutdown(wait=True)
+        for key in list(self._pending_saves):
+            self._wait_for_save(key)
+
+    def _save_key(self, path) -> str:
+        """Normalized absolute path used to track a pending save."""
+        return str((self.root_path / path).resolve())
+
+    def _save_done(self, key: str, future: Future) -> None:
+        """Done-callback for background saves: log a failure and forget the save."""
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning("Background save of %s failed: %s", key, future.exception())
+        with self._lock:
+            if self._pending_saves.get(key) is future:
+                del self._pending_saves[key]
+
+    def _wait_for_save(self, key: str) -> Optional[str]:
+        """Block until the pending background save for key finishes.
+
+        Returns:
+            Error message if that save failed, else None.
+        """
+        with self._lock:
+            future = self._pending_saves.get(key)
+        if future is None:
+            return None
+        try:
+            future.result()
+            return None
+        except Exception as e:
+            # Already logged by _save_done
+            return f"Error: Saving '{key}' failed: {str(e)}"
+        finally:
+            with self._lock:
+                if self._pending_saves.get(key) is future:
+                    del self._pending_saves[key]
 
     def get_active_item(self) -> Optional[str]:
         """Get the name of the currently active item.
@@ -323,16 +648,26 @@ class BaseManager(ABC):
         Returns:
             Success message, or error if item not found.
         """
-        if name not in self._items:
-            return f"Error: {self.item_type_name.title()} '{name}' not found"
+        with self._lock:
+            if name not in self._items:
+                return self._msg_not_found.format(name=name)
+
+            if self._active_item in self._items:
+                self._items[self._active_item].is_active = False
 
-        if self._active_item:
-            self._items[self._active_item].is_active = False
+            self._active_item = name
+            self._items[name].is_active = True
 
-        self._active_item = name
-        self._items[name].is_active = True
+        return self._msg_now_active.format(name=name)
 
-        return f"... {self.item_type_name.title()} '{name}' is now active"
+    def _get_active(self) -> Optional[ManagedItemInfo]:
+        """Snapshot the active item, or None, under the lock.
+
+        Callers work on the returned reference without holding the lock, so a
+        concurrent unuse_item cannot make them look up a name that is gone.
+        """
+        with self._lock:
+            return self._items.get(self._active_item) if self._active_item else None
 
     # ================== Generic Undo/Redo (100% reusable) ==================
 
@@ -345,10 +680,9 @@ class BaseManager(ABC):
         Returns:
             Summary of undone operations, or error message.
         """
-        if not self._active_item:
-            return f"Error: No active {self.item_type_name}."
-
-        item = self._items[self._active_item]
+        item = self._get_active()
+        if item is None:
+            return self._msg_no_active
 
         if not item.history.can_undo():
             return "Nothing to undo"
@@ -357,10 +691,9 @@ class BaseManager(ABC):
 
         try:
             results = item.history.undo(self, steps)
-            summary = f"... Undid {len(results)} operation(s):\n"
-            for desc in descriptions[:len(results)]:
-                summary += f"  - {desc}\n"
-            return summary.rstrip()
+            lines = [f"... Undid {len(results)} operation(s):"]
+            lines.extend(f"  - {desc}" for desc in descriptions[:len(results)])
+            return "\n".join(lines)
         except Exception as e:
             return f"Error during undo: {str(e)}"
 
@@ -373,10 +706,9 @@ class BaseManager(ABC):
         Returns:
             Summary of redone operations, or error message.
         """
-        if not self._active_item:
-            return f"Error: No active {self.item_type_name}."
-
-        item = self._items[self._active_item]
+        item = self._get_active()
+        if item is None:
+            return self._msg_no_active
 
         if not item.history.can_redo():
             return "Nothing to redo"
@@ -385,10 +717,9 @@ class BaseManager(ABC):
 
         try:
             results = item.history.redo(self, steps)
-            summary = f"... Redid {len(results)} operation(s):\n"
-            for desc in descriptions[:len(results)]:
-                summary += f"  - {desc}\n"
-            return summary.rstrip()
+            lines = [f"... Redid {len(results)} operation(s):"]
+            lines.extend(f"  - {desc}" for desc in descriptions[:len(results)])
+            return "\n".join(lines)
         except Exception as e:
             return f"Error during redo: {str(e)}"
 
@@ -399,24 +730,28 @@ class BaseManager(ABC):
             Formatted history summary including undo/redo counts
             and recent operations.
         """
-        if not self._active_item:
-            return f"Error: No active {self.item_type_name}."
+        item = self._get_active()
+        if item is None:
+            return self._msg_no_active
 
-        item = self._items[self._active_item]
         summary = item.history.get_history_summary()
 
-        result = f"Operation History for '{self._active_item}':\n"
-        result += f"  Undo available: {summary['undo_count']} operation(s)\n"
-        result += f"  Redo available: {summary['redo_count']} operation(s)\n"
-
-        if summary['recent_operations']:
-            result += f"\nRecent operations:\n"
-            for i, op in enumerate(summary['recent_operations'], 1):
-                result += f"  {i}. {op}\n"
+        parts = [
+            f"Operation History for '{item.name}':",
+            f"  Undo available: {summary.undo_count} operation(s)",
+            f"  Redo available: {summary.redo_count} operation(s)",
+        ]
+
+        if summary.recent_operations:
+            parts.append("\nRecent operations:")
+            parts.extend(
+                f"  {i}. {op}"
+                for i, op in enumerate(summary.recent_operations, 1)
+            )
         else:
-            result += "\nNo operations in history\n"
+            parts.append("\nNo operations in history")
 
-        return result.rstrip()
+        return "\n".join(parts)
 
     def clear_history(self) -> str:
         """Clear the operation history for the active item.
@@ -424,11 +759,12 @@ class BaseManager(ABC):
         Returns:
             Success message.
         """
-        if not self._active_item:
-            return f"Error: No active {self.item_type_name}."
+        item = self._get_active()
+        if item is None:
+            return self._msg_no_active
 
-        self._items[self._active_item].history.clear()
-        return f"... History cleared for '{self._active_item}'"
+        item.history.clear()
+        return f"... History cleared for '{item.name}'"
 
     # ================== Generic Helpers (100% reusable) ==================
 
@@ -441,12 +777,7 @@ class BaseManager(ABC):
         Returns:
             Formatted string like "1.5 KB" or "2.3 MB".
         """
-        if size < 1024:
-            return f"{size} B"
-        elif size < 1024 * 1024:
-            return f"{size / 1024:.1f} KB"
-        else:
-            return f"{size / (1024 * 1024):.1f} MB"
+        return _format_size(size)
 
     def _format_outputs(self, outputs: List) -> List:
         """Format execution outputs for display.
@@ -469,16 +800,12 @@ class BaseManager(ABC):
             output_type = output.get('output_type', 'unknown')
 
             if output_type == 'stream':
-                text = ''.join(output.get('text', []))
+                text = _join_text(output.get('text', []))
                 result.append(f"[{output['name']}]\n{text}")
             elif output_type in ('execute_result', 'display_data'):
-                data = output.get('data', {})
-                if 'text/plain' in data:
-                    result.append(''.join(data['text/plain']))
-                elif 'text/html' in data:
-                    result.append({'type': 'html', 'content': ''.join(data['text/html'])})
-                elif 'image/png' in data:
-                    result.append({'type': 'image', 'format': 'png', 'data': ''.join(data['image/png'])})
+                formatted = _format_mime_data(output.get('data', {}))
+                if formatted is not None:
+                    result.append(formatted)
             elif output_type == 'error':
                 traceback = ''.join(output.get('traceback', []))
                 result.append(f"[ERROR] {output.get('ename', 'Error')}: {output.get('evalue', '')}\n{traceback}")
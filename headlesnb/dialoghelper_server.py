@@ -26,29 +26,48 @@ Endpoints:
 """
 
 import re
+import html
 import json
 import asyncio
+import logging
 import threading
-from typing import Optional, Dict, Any, List
-from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Callable
+from collections import defaultdict, deque
 from pathlib import Path
 from datetime import datetime
 
 from fasthtml.common import (
-    FastHTML, fast_app, serve as fh_serve, Script, Div, Safe,
+    FastHTML, fast_app, serve as fh_serve, Script, Safe,
     EventStream, sse_message
 )
-from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.responses import JSONResponse, PlainTextResponse, Response
 
 from .dialogmanager import DialogManager, Message
 
+try:
+    import orjson
+except ImportError:  # optional, see the "fast" extra
+    orjson = None
+
+
+logger = logging.getLogger(__name__)
 
 # Global state
 manager: Optional[DialogManager] = None
-html_queues: Dict[str, asyncio.Queue] = defaultdict(asyncio.Queue)
-data_store: Dict[str, asyncio.Event] = {}
-data_values: Dict[str, Any] = {}
+html_queues: Dict[str, "_HtmlStream"] = {}  # created on first use, see _stream_for
+HEARTBEAT_INTERVAL = 30  # seconds between keepalive frames on an idle html_stream_
+HTML_BACKLOG = 256  # undelivered add_html_ frames kept per dialog; older ones are dropped
+data_channels: Dict[str, asyncio.Queue] = {}  # one-slot handoff per data_id, see _channel_for
+data_waiters: Dict[str, int] = {}  # pop_data_blocking_ calls waiting per data_id
 run_queue: Dict[str, List[str]] = defaultdict(list)
+_manager_future: Optional[Future] = None  # Pending background setup, see init_manager_in_background
+# LLM calls for prompt runs happen on this worker so they never block the
+# event loop; a single thread keeps them in submission order. Code runs stay
+# on the loop's thread (execnb's timeout handling needs the main thread)
+_run_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dialoghelper-run")
+SAVE_DELAY = 0.1  # seconds; a burst of edits to a dialog is written to disk once
 
 # Create app with HTMX SSE extension support
 app, rt = fast_app(
@@ -57,36 +76,268 @@ app, rt = fast_app(
 )
 
 
-def init_manager(root_path: str = ".", llm_client=None) -> DialogManager:
+def init_manager(root_path: str = ".", llm_client=None, save_delay: float = SAVE_DELAY) -> DialogManager:
     """Initialize the global DialogManager instance.
 
     Args:
         root_path: Root directory for dialog files.
         llm_client: LLM client for prompt execution.
+        save_delay: Debounce for dialog writes, see DialogManager.
 
     Returns:
         The initialized DialogManager instance.
     """
     global manager
-    manager = DialogManager(root_path=root_path, default_llm_client=llm_client)
+    manager = DialogManager(root_path=root_path, default_llm_client=llm_client, save_delay=save_delay)
     return manager
 
 
+def init_manager_in_background(setup: Callable[..., Any], *args, **kwargs) -> Future:
+    """Run manager setup on a worker thread so the server can bind meanwhile.
+
+    `setup` is called with `*args, **kwargs` and is expected to call
+    `init_manager` (or return a DialogManager). The first call to
+    `get_manager` waits for it to finish and re-raises any setup error.
+
+    Args:
+        setup: Callable that initializes the global manager, e.g. one that
+            creates a dialog and adds starter messages.
+
+    Returns:
+        Future for the setup call.
+    """
+    global _manager_future
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dialoghelper-setup")
+    _manager_future = executor.submit(setup, *args, **kwargs)
+    executor.shutdown(wait=False)
+    return _manager_future
+
+
 def get_manager() -> DialogManager:
     """Get the global DialogManager instance, initializing if needed."""
-    global manager
+    global manager, _manager_future
+    future = _manager_future
+    if future is not None:
+        # A failed setup keeps its future, so every call re-raises the error
+        # instead of falling through to a fresh, empty manager
+        result = future.result()
+        if isinstance(result, DialogManager):
+            manager = result
+        if _manager_future is future:
+            _manager_future = None
     if manager is None:
-        manager = DialogManager()
+        manager = DialogManager(save_delay=SAVE_DELAY)
     return manager
 
 
-def _get_dialog_name(data: dict) -> Optional[str]:
-    """Extract dialog name from request data, falling back to active dialog."""
-    dname = data.get('dlg_name', '')
-    if not dname:
-        mgr = get_manager()
-        dname = mgr.active_dialog
-    return dname
+_INT_FIELDS = ('is_exported', 'skipped', 'pinned', 'i_collapsed',
+               'o_collapsed', 'heading_collapsed')
+
+
+def _int_fields(form) -> Dict[str, int]:
+    """Parse the optional integer message flags present in the form.
+
+    Plain digit strings (the common case) are converted directly; anything
+    else goes through int() and is ignored if it does not parse.
+    """
+    kwargs = {}
+    for field in _INT_FIELDS:
+        value = form.get(field)
+        if not value:
+            continue
+        if value.isdecimal() or (value[0] == '-' and value[1:].isdecimal()):
+            kwargs[field] = int(value)
+        else:
+            try:
+                kwargs[field] = int(value)
+            except (ValueError, TypeError):
+                pass
+    return kwargs
+
+
+def _get_dialog_name(form) -> Optional[str]:
+    """Extract dialog name from the request form, falling back to active dialog."""
+    return form.get('dlg_name') or get_manager().active_dialog
+
+
+def _nth_newline(text: str, n: int) -> int:
+    """Return the offset just past the n-th newline in text (n >= 1), or -1."""
+    pos = -1
+    for _ in range(n):
+        pos = text.find('\n', pos + 1)
+        if pos < 0:
+            return -1
+    return pos + 1
+
+
+def _insert_line(content: str, insert_line: int, new_str: str) -> str:
+    """Insert new_str as a line after line insert_line (0 = before the first)."""
+    if insert_line <= 0:
+        return new_str + '\n' + content
+    cut = _nth_newline(content, insert_line)
+    if cut < 0:
+        return content + '\n' + new_str
+    return content[:cut] + new_str + '\n' + content[cut:]
+
+
+def _replace_lines(content: str, start_line: int, end_line: int, new_content: str) -> str:
+    """Replace lines start_line..end_line (1-based, inclusive) with new_content.
+
+    Slices the content at newline offsets instead of splitting it into a
+    list of lines. Non-positive line numbers keep Python's negative-slice
+    behaviour via the list path.
+    """
+    if start_line < 1 or end_line < 0:
+        lines = content.split('\n')
+        new_lines = new_content.rstrip('\n').split('\n') if new_content else []
+        return '\n'.join(lines[:start_line-1] + new_lines + lines[end_line:])
+
+    parts = []
+    if start_line > 1:
+        cut = _nth_newline(content, start_line - 1)
+        parts.append(content if cut < 0 else content[:cut - 1])
+    if new_content:
+        parts.append(new_content.rstrip('\n'))
+    cut = _nth_newline(content, end_line) if end_line else 0
+    if cut >= 0:
+        parts.append(content[cut:])
+    return '\n'.join(parts)
+
+
+def _json_response(content: Any, status_code: int = 200) -> Response:
+    """JSON response serialized with orjson when installed, else JSONResponse."""
+    if orjson is not None:
+        try:
+            body = orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:  # e.g. ints wider than 64 bits
+            pass
+        else:
+            return Response(body, status_code=status_code, media_type="application/json")
+    return JSONResponse(content, status_code=status_code)
+
+
+def _json_loads(text: str) -> Any:
+    """Parse a JSON form field, with orjson when available.
+
+    Input orjson rejects but json accepts (NaN, ints wider than 64 bits)
+    is retried with json, so results and errors match json.loads.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+
+def _messages_response(fields: Dict[str, Any], key: str, msgs: List[Message]) -> Response:
+    """JSON object of fields plus key: [messages], as a single response.
+
+    The array is joined from each Message's cached to_json() bytes, so
+    unchanged messages are not re-encoded on every request.
+    """
+    head = json.dumps(fields, ensure_ascii=False, separators=(',', ':'))[1:-1]
+    prefix = f"{{{head}{',' if head else ''}{json.dumps(key)}:[".encode('utf-8')
+    body = prefix + b','.join([m.to_json() for m in msgs]) + b']}'
+    return Response(body, media_type="application/json")
+
+
+_HEARTBEAT_FRAME = sse_message("<!-- heartbeat -->").encode('utf-8')
+
+
+class _HtmlStream:
+    """Framed SSE events waiting for a dialog's html_stream_ connections.
+
+    A deque plus one future per idle listener: add_html_ appends and wakes
+    the waiters directly, which is cheaper than asyncio.Queue's getter
+    bookkeeping on every event. The deque holds at most HTML_BACKLOG
+    frames, so a dialog nobody streams drops its oldest updates instead
+    of growing without bound.
+    """
+    __slots__ = ('frames', 'waiters', 'listeners', 'heartbeat')
+
+    def __init__(self):
+        self.frames: deque = deque(maxlen=HTML_BACKLOG)
+        self.waiters: List[asyncio.Future] = []
+        self.listeners = 0  # open html_stream_ connections
+        self.heartbeat: Optional[asyncio.Task] = None  # keepalive task while anyone listens
+
+    def push(self, *frames: bytes):
+        """Append frames and wake every listener waiting for one."""
+        self.frames.extend(frames)
+        waiters, self.waiters = self.waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def wait(self):
+        """Wait until push() is called."""
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await waiter
+        finally:
+            # Only still listed if cancelled before a push
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+
+
+def _stream_for(dname: str) -> _HtmlStream:
+    """Return the pending SSE events for a dialog, creating them on first use."""
+    stream = html_queues.get(dname)
+    if stream is None:
+        stream = html_queues[dname] = _HtmlStream()
+    return stream
+
+
+def _channel_for(data_id: str) -> asyncio.Queue:
+    """Return the one-slot queue that hands push_data_ values to pop_data_blocking_."""
+    channel = data_channels.get(data_id)
+    if channel is None:
+        channel = data_channels[data_id] = asyncio.Queue(maxsize=1)
+    return channel
+
+
+async def _heartbeat(stream: _HtmlStream):
+    """Queue a keepalive frame for each listener whenever the stream is idle.
+
+    A single sleeping task per dialog replaces a wait_for timeout around
+    every wait in each connection.
+    """
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        if not stream.frames:
+            stream.push(*[_HEARTBEAT_FRAME] * stream.listeners)
+
+
+@lru_cache(maxsize=256)
+def _compile_pattern(re_pattern: str) -> "re.Pattern":
+    """Compile a find_msgs_ search pattern, cached across requests.
+
+    Clients tend to repeat the same few searches, so hot patterns cost a
+    dict lookup instead of a pass through re's own cache.
+    """
+    return re.compile(re_pattern, re.DOTALL | re.MULTILINE)
+
+
+def _log_run_failure(task: "asyncio.Future"):
+    """Done-callback for prompt runs: log errors nobody awaited."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Prompt run failed", exc_info=task.exception())
+
+
+async def _run_prompt(dname: str, msgid: str):
+    """Run a prompt message, with its LLM call on _run_executor.
+
+    The run is shielded: if the request is cancelled (e.g. the client
+    disconnects), the response is still stored in the dialog, and a
+    failure is logged instead of being lost.
+    """
+    task = asyncio.ensure_future(get_manager().execute_prompt_async(
+        msg_id=msgid, dialog_name=dname, executor=_run_executor
+    ))
+    task.add_done_callback(_log_run_failure)
+    return await asyncio.shield(task)
 
 
 def _ensure_dialog(dname: str) -> Optional[Dict]:
@@ -107,15 +358,15 @@ async def curr_dialog_(req):
     Body: dlg_name, with_messages
     Returns: {name, mode} or {name, mode, messages}
     """
-    data = dict(await req.form())
-    dname = _get_dialog_name(data)
+    form = await req.form()
+    dname = _get_dialog_name(form)
 
     if not dname:
-        return JSONResponse({})
+        return _json_response({})
 
     mgr = get_manager()
     if err := _ensure_dialog(dname):
-        return JSONResponse(err)
+        return _json_response(err)
 
     dialog = mgr.dialogs[dname]
     result = {
@@ -123,11 +374,11 @@ async def curr_dialog_(req):
         'mode': dialog.mode
     }
 
-    with_messages = data.get('with_messages', 'false').lower() == 'true'
+    with_messages = form.get('with_messages', 'false').lower() == 'true'
     if with_messages:
-        result['messages'] = [m.to_dict() for m in dialog.messages]
+        return _messages_response(result, 'messages', dialog.messages)
 
-    return JSONResponse(result)
+    return _json_response(result)
 
 
 @rt
@@ -138,24 +389,24 @@ async def msg_idx_(req):
     Body: dlg_name, msgid
     Returns: {msgid: int}
     """
-    data = dict(await req.form())
-    dname = _get_dialog_name(data)
+    form = await req.form()
+    dname = _get_dialog_name(form)
 
     if not dname:
-        return JSONResponse({"error": "No dialog specified"})
+        return _json_response({"error": "No dialog specified"})
 
     mgr = get_manager()
     if err := _ensure_dialog(dname):
-        return JSONResponse(err)
+        return _json_response(err)
 
     dialog = mgr.dialogs[dname]
-    msgid = data.get('msgid', '')
+    msgid = form.get('msgid', '')
 
     idx = dialog.get_message_index(msgid)
     if idx is None:
-        return JSONResponse({"error": f"Message '{msgid}' not found"})
+        return _json_response({"error": f"Message '{msgid}' not found"})
 
-    return JSONResponse({"msgid": idx})
+    return _json_response({"msgid": idx})
 
 
 @rt
@@ -166,41 +417,39 @@ async def find_msgs_(req):
     Body: dlg_name, re_pattern, msg_type, limit
     Returns: {msgs: [dict]}
     """
-    data = dict(await req.form())
-    dname = _get_dialog_name(data)
+    form = await req.form()
+    dname = _get_dialog_name(form)
 
     if not dname:
-        return JSONResponse({"msgs": []})
+        return _json_response({"msgs": []})
 
     mgr = get_manager()
     if err := _ensure_dialog(dname):
-        return JSONResponse(err)
+        return _json_response(err)
 
     dialog = mgr.dialogs[dname]
 
-    re_pattern = data.get('re_pattern', '')
-    msg_type = data.get('msg_type', None)
+    re_pattern = form.get('re_pattern', '')
+    msg_type = form.get('msg_type', None)
     if msg_type == 'None' or msg_type == '':
         msg_type = None
-    limit = data.get('limit', None)
+    limit = form.get('limit', None)
     if limit and limit != 'None':
         limit = int(limit)
     else:
         limit = None
 
     # Filter messages
-    msgs = dialog.messages
-    if msg_type:
-        msgs = [m for m in msgs if m.msg_type == msg_type]
+    msgs = dialog.get_messages_by_type(msg_type) if msg_type else dialog.messages
 
     if re_pattern:
-        pattern = re.compile(re_pattern, re.DOTALL | re.MULTILINE)
+        pattern = _compile_pattern(re_pattern)
         msgs = [m for m in msgs if pattern.search(m.content)]
 
     if limit:
         msgs = msgs[:limit]
 
-    return JSONResponse({"msgs": [m.to_dict() for m in msgs]})
+    return _messages_response({}, "msgs", msgs)
 
 
 @rt
@@ -211,12 +460,12 @@ async def add_html_(req):
     Body: dlg_name, content
     Returns: "ok"
     """
-    data = dict(await req.form())
-    dname = _get_dialog_name(data) or 'default'
-    content = data.get('content', '')
+    form = await req.form()
+    dname = _get_dialog_name(form) or 'default'
+    content = form.get('content', '')
 
-    # Queue HTML for SSE delivery
-    await html_queues[dname].put(content)
+    # Queue HTML for SSE delivery, framed once here so the stream only writes it
+    _stream_for(dname).push(sse_message(Safe(content)).encode('utf-8'))
 
     return PlainTextResponse("ok")
 
@@ -231,14 +480,29 @@ async def html_stream_(req):
     dname = req.query_params.get('dlg_name', 'default')
 
     async def generate():
-        queue = html_queues[dname]
-        while True:
-            try:
-                content = await asyncio.wait_for(queue.get(), timeout=30)
-                yield sse_message(Safe(content))
-            except asyncio.TimeoutError:
-                # Send heartbeat
-                yield sse_message("<!-- heartbeat -->")
+        stream = _stream_for(dname)
+        stream.listeners += 1
+        if stream.listeners == 1:
+            stream.heartbeat = asyncio.create_task(_heartbeat(stream))
+        try:
+            while True:
+                if stream.frames:
+                    yield stream.frames.popleft()
+                else:
+                    await stream.wait()
+        finally:
+            # On disconnect, drop the stream once nobody listens and nothing
+            # is waiting to be delivered, so stale dialog names don't leak
+            stream.listeners -= 1
+            if stream.listeners <= 0:
+                if stream.heartbeat is not None:
+                    stream.heartbeat.cancel()
+                    stream.heartbeat = None
+                # Keepalives are only meaningful for open connections
+                stream.frames = deque((f for f in stream.frames if f is not _HEARTBEAT_FRAME),
+                                      maxlen=HTML_BACKLOG)
+                if not stream.frames and html_queues.get(dname) is stream:
+                    del html_queues[dname]
 
     return EventStream(generate())
 
@@ -251,29 +515,29 @@ async def read_msg_(req):
     Body: dlg_name, n, relative, msgid, view_range, nums
     Returns: {msg: dict}
     """
-    data = dict(await req.form())
-    dname = _get_dialog_name(data)
+    form = await req.form()
+    dname = _get_dialog_name(form)
 
     if not dname:
-        return JSONResponse({"error": "No dialog specified"})
+        return _json_response({"error": "No dialog specified"})
 
     mgr = get_manager()
     if err := _ensure_dialog(dname):
-        return JSONResponse(err)
+        return _json_response(err)
 
     dialog = mgr.dialogs[dname]
 
-    n = int(data.get('n', -1))
-    relative = data.get('relative', 'true').lower() == 'true'
-    msgid = data.get('msgid', '')
-    view_range = data.get('view_range', None)
-    nums = data.get('nums', 'false').lower() == 'true'
+    n = int(form.get('n', -1))
+    relative = form.get('relative', 'true').lower() == 'true'
+    msgid = form.get('msgid', '')
+    view_range = form.get('view_range', None)
+    nums = form.get('nums', 'false').lower() == 'true'
 
     # Find the message
     if relative and msgid:
         base_idx = dialog.get_message_index(msgid)
         if base_idx is None:
-            return JSONResponse({"error": f"Message '{msgid}' not found"})
+            return _json_response({"error": f"Message '{msgid}' not found"})
         target_idx = base_idx + n
     elif msgid and n == 0:
         target_idx = dialog.get_message_index(msgid)
@@ -285,44 +549,44 @@ async def read_msg_(req):
             target_idx = len(dialog.messages) + n
 
     if target_idx is None or target_idx < 0 or target_idx >= len(dialog.messages):
-        return JSONResponse({"error": f"Message index {target_idx} out of range"})
+        return _json_response({"error": f"Message index {target_idx} out of range"})
 
     msg = dialog.messages[target_idx]
     result = msg.to_dict()
 
-    # Apply view_range and nums to content
-    content = result['content']
-    lines = content.split('\n')
-
-    if view_range:
+    if isinstance(view_range, str) and view_range:
         try:
-            if isinstance(view_range, str):
-                view_range = json.loads(view_range)
-            start, end = view_range
-            if end == -1:
-                end = len(lines)
-            lines = lines[start-1:end]  # 1-indexed
-        except (json.JSONDecodeError, ValueError, TypeError):
-            pass
+            view_range = _json_loads(view_range)
+        except json.JSONDecodeError:
+            view_range = None
+
+    # Apply view_range and nums to content; without either it is returned
+    # as is rather than split into lines and joined back
+    if view_range or nums:
+        lines = result['content'].split('\n')
 
-    if nums:
-        # Add line numbers like cat -n
-        numbered_lines = []
-        start_num = 1
         if view_range:
             try:
-                if isinstance(view_range, str):
-                    view_range = json.loads(view_range)
-                start_num = view_range[0]
-            except:
+                start, end = view_range
+                if end == -1:
+                    end = len(lines)
+                lines = lines[start-1:end]  # 1-indexed
+            except (ValueError, TypeError):
                 pass
-        for i, line in enumerate(lines, start=start_num):
-            numbered_lines.append(f"{i:>6} │ {line}")
-        lines = numbered_lines
 
-    result['content'] = '\n'.join(lines)
+        if nums:
+            # Add line numbers like cat -n
+            start_num = 1
+            if view_range:
+                try:
+                    start_num = view_range[0]
+                except:
+                    pass
+            lines = [f"{i:>6} │ {line}" for i, line in enumerate(lines, start=start_num)]
 
-    return JSONResponse({"msg": result})
+        result['content'] = '\n'.join(lines)
+
+    return _json_response({"msg": result})
 
 
 @rt
@@ -333,8 +597,8 @@ async def add_relative_(req):
     Body: dlg_name, content, placement, msgid, msg_type, output, run, ...
     Returns: message id (string)
     """
-    data = dict(await req.form())
-    dname = _get_dialog_name(data)
+    form = await req.form()
+    dname = _get_dialog_name(form)
 
     if not dname:
         return PlainTextResponse("Error: No dialog specified")
@@ -350,22 +614,15 @@ async def add_relative_(req):
     try:
         dialog = mgr.dialogs[dname]
 
-        content = data.get('content', '')
-        placement = data.get('placement', 'add_after')
-        msgid = data.get('msgid', '')
-        msg_type = data.get('msg_type', 'note')
-        output = data.get('output', '')
-        run = data.get('run', 'false').lower() == 'true'
+        content = form.get('content', '')
+        placement = form.get('placement', 'add_after')
+        msgid = form.get('msgid', '')
+        msg_type = form.get('msg_type', 'note')
+        output = form.get('output', '')
+        run = form.get('run', 'false').lower() == 'true'
 
         # Parse optional int fields
-        kwargs = {}
-        for field in ['is_exported', 'skipped', 'pinned', 'i_collapsed',
-                      'o_collapsed', 'heading_collapsed']:
-            if field in data:
-                try:
-                    kwargs[field] = int(data[field])
-                except (ValueError, TypeError):
-                    pass
+        kwargs = _int_fields(form)
 
         # Determine insertion index
         if placement == 'at_start':
@@ -398,18 +655,18 @@ async def add_relative_(req):
         if new_msg_id.startswith("Error"):
             return PlainTextResponse(new_msg_id)
 
-        # Execute if run=True
-        if run:
-            if msg_type == 'code':
-                mgr.execute_code(msg_id=new_msg_id)
-            elif msg_type == 'prompt':
-                mgr.execute_prompt(msg_id=new_msg_id)
-
-        return PlainTextResponse(new_msg_id)
-
     finally:
         mgr.active_dialog = prev_active
 
+    # Execute if run=True, before returning so the output can be read next
+    if run:
+        if msg_type == 'code':
+            mgr.execute_code(msg_id=new_msg_id, dialog_name=dname)
+        elif msg_type == 'prompt':
+            await _run_prompt(dname, new_msg_id)
+
+    return PlainTextResponse(new_msg_id)
+
 
 @rt
 async def update_msg_(req):
@@ -419,8 +676,8 @@ async def update_msg_(req):
     Body: dlg_name, msgid, content, output, skipped, pinned, ...
     Returns: message id (string)
     """
-    data = dict(await req.form())
-    dname = _get_dialog_name(data)
+    form = await req.form()
+    dname = _get_dialog_name(form)
 
     if not dname:
         return PlainTextResponse("Error: No dialog specified")
@@ -433,27 +690,20 @@ async def update_msg_(req):
     mgr.active_dialog = dname
 
     try:
-        msgid = data.get('msgid', '')
+        msgid = form.get('msgid', '')
         if not msgid:
             return PlainTextResponse("Error: No message ID provided")
 
         # Build kwargs for update
         kwargs = {}
-        if 'content' in data and data['content']:
-            kwargs['content'] = data['content']
-        if 'output' in data and data['output']:
-            kwargs['output'] = data['output']
-
-        for field in ['is_exported', 'skipped', 'pinned', 'i_collapsed',
-                      'o_collapsed', 'heading_collapsed', 'msg_type']:
-            if field in data and data[field] not in ('', 'None', None):
-                try:
-                    if field == 'msg_type':
-                        kwargs[field] = data[field]
-                    else:
-                        kwargs[field] = int(data[field])
-                except (ValueError, TypeError):
-                    pass
+        if 'content' in form and form['content']:
+            kwargs['content'] = form['content']
+        if 'output' in form and form['output']:
+            kwargs['output'] = form['output']
+
+        kwargs.update(_int_fields(form))
+        if form.get('msg_type') not in ('', 'None', None):
+            kwargs['msg_type'] = form['msg_type']
 
         if kwargs:
             result = mgr.update_message(msgid, **kwargs)
@@ -474,8 +724,8 @@ async def rm_msg_(req):
     Body: dlg_name, msid (note: typo in original API)
     Returns: "ok"
     """
-    data = dict(await req.form())
-    dname = _get_dialog_name(data)
+    form = await req.form()
+    dname = _get_dialog_name(form)
 
     if not dname:
         return PlainTextResponse("Error: No dialog specified", status_code=400)
@@ -489,7 +739,7 @@ async def rm_msg_(req):
 
     try:
         # Note: original API uses 'msid' (typo for msgid)
-        msgid = data.get('msid', '') or data.get('msgid', '')
+        msgid = form.get('msid', '') or form.get('msgid', '')
         if not msgid:
             return PlainTextResponse("Error: No message ID provided", status_code=400)
 
@@ -511,50 +761,44 @@ async def add_runq_(req):
     Body: dlg_name, msgid, api
     Returns: {"status": "queued"} or message output if api=false
     """
-    data = dict(await req.form())
-    dname = _get_dialog_name(data)
+    form = await req.form()
+    dname = _get_dialog_name(form)
 
     if not dname:
-        return JSONResponse({"error": "No dialog specified"})
+        return _json_response({"error": "No dialog specified"})
 
     mgr = get_manager()
     if dname not in mgr.dialogs:
-        return JSONResponse({"error": f"Dialog '{dname}' not found"})
+        return _json_response({"error": f"Dialog '{dname}' not found"})
 
-    msgid = data.get('msgid', '')
-    api = data.get('api', 'false').lower() == 'true'
+    msgid = form.get('msgid', '')
+    api = form.get('api', 'false').lower() == 'true'
 
     if not msgid:
-        return JSONResponse({"error": "No message ID provided"})
+        return _json_response({"error": "No message ID provided"})
 
     # Add to run queue
     run_queue[dname].append(msgid)
 
     if api:
-        return JSONResponse({"status": "queued"})
+        return _json_response({"status": "queued"})
 
-    # Execute immediately if not API mode
-    prev_active = mgr.active_dialog
-    mgr.active_dialog = dname
-
-    try:
-        dialog = mgr.dialogs[dname]
-        msg = dialog.get_message_by_id(msgid)
+    # Execute immediately if not API mode; prompts await their LLM call
+    # off the loop
+    dialog = mgr.dialogs[dname]
+    msg = dialog.get_message_by_id(msgid)
 
-        if not msg:
-            return JSONResponse({"error": f"Message '{msgid}' not found"})
-
-        if msg.msg_type == 'code':
-            outputs = mgr.execute_code(msg_id=msgid)
-            return JSONResponse({"outputs": outputs})
-        elif msg.msg_type == 'prompt':
-            response = mgr.execute_prompt(msg_id=msgid)
-            return JSONResponse({"response": response.content})
-        else:
-            return JSONResponse({"error": f"Cannot run message of type '{msg.msg_type}'"})
+    if not msg:
+        return _json_response({"error": f"Message '{msgid}' not found"})
 
-    finally:
-        mgr.active_dialog = prev_active
+    if msg.msg_type == 'code':
+        outputs = mgr.execute_code(msg_id=msgid, dialog_name=dname)
+        return _json_response({"outputs": outputs})
+    elif msg.msg_type == 'prompt':
+        response = await _run_prompt(dname, msgid)
+        return _json_response({"response": response.content})
+    else:
+        return _json_response({"error": f"Cannot run message of type '{msg.msg_type}'"})
 
 
 @rt
@@ -565,36 +809,29 @@ async def pop_data_blocking_(req):
     Body: data_id, timeout
     Returns: stored data
     """
-    data = dict(await req.form())
-    data_id = data.get('data_id', '')
-    timeout = int(data.get('timeout', 15))
+    form = await req.form()
+    data_id = form.get('data_id', '')
+    timeout = int(form.get('timeout', 15))
 
     if not data_id:
-        return JSONResponse({"error": "No data_id provided"})
-
-    # Create event if doesn't exist
-    if data_id not in data_store:
-        data_store[data_id] = asyncio.Event()
-
-    event = data_store[data_id]
+        return _json_response({"error": "No data_id provided"})
 
+    channel = _channel_for(data_id)
+    data_waiters[data_id] = data_waiters.get(data_id, 0) + 1
     try:
-        # Wait for data with timeout
-        await asyncio.wait_for(event.wait(), timeout=timeout)
-
-        # Get and remove data
-        result = data_values.pop(data_id, {"error": "Data expired"})
-        del data_store[data_id]
-
-        return JSONResponse(result)
-
+        result = await asyncio.wait_for(channel.get(), timeout=timeout)
+        return _json_response(result)
     except asyncio.TimeoutError:
-        # Clean up
-        if data_id in data_store:
-            del data_store[data_id]
-        if data_id in data_values:
-            del data_values[data_id]
-        return JSONResponse({"error": "timeout"})
+        return _json_response({"error": "timeout"})
+    finally:
+        # Other waiters still hold this channel; only drop it with the last one
+        waiters = data_waiters[data_id] - 1
+        if waiters:
+            data_waiters[data_id] = waiters
+        else:
+            del data_waiters[data_id]
+            if channel.empty() and data_channels.get(data_id) is channel:
+                del data_channels[data_id]
 
 
 @rt
@@ -605,22 +842,23 @@ async def push_data_(req):
     Body: data_id, data (JSON string)
     Returns: "ok"
     """
-    form_data = dict(await req.form())
-    data_id = form_data.get('data_id', '')
-    data = form_data.get('data', '{}')
+    form = await req.form()
+    data_id = form.get('data_id', '')
+    data = form.get('data', '{}')
 
     if not data_id:
         return PlainTextResponse("Error: No data_id provided")
 
     try:
-        data_values[data_id] = json.loads(data)
+        value = _json_loads(data)
     except json.JSONDecodeError:
-        data_values[data_id] = {"raw": data}
+        value = {"raw": data}
 
-    # Create event if doesn't exist and signal it
-    if data_id not in data_store:
-        data_store[data_id] = asyncio.Event()
-    data_store[data_id].set()
+    # A newer push replaces a value nobody has popped yet
+    channel = _channel_for(data_id)
+    if channel.full():
+        channel.get_nowait()
+    channel.put_nowait(value)
 
     return PlainTextResponse("ok")
 
@@ -635,43 +873,33 @@ async def msg_insert_line_(req):
     Body: dlg_name, msgid, insert_line, new_str
     Returns: {success: message}
     """
-    data = dict(await req.form())
-    dname = _get_dialog_name(data)
+    form = await req.form()
+    dname = _get_dialog_name(form)
 
     if not dname:
-        return JSONResponse({"error": "No dialog specified"})
+        return _json_response({"error": "No dialog specified"})
 
     mgr = get_manager()
     if dname not in mgr.dialogs:
-        return JSONResponse({"error": f"Dialog '{dname}' not found"})
+        return _json_response({"error": f"Dialog '{dname}' not found"})
 
     prev_active = mgr.active_dialog
     mgr.active_dialog = dname
 
     try:
         dialog = mgr.dialogs[dname]
-        msgid = data.get('msgid', '')
-        insert_line = int(data.get('insert_line', 0))
-        new_str = data.get('new_str', '')
+        msgid = form.get('msgid', '')
+        insert_line = int(form.get('insert_line', 0))
+        new_str = form.get('new_str', '')
 
         msg = dialog.get_message_by_id(msgid)
         if not msg:
-            return JSONResponse({"error": f"Message '{msgid}' not found"})
-
-        lines = msg.content.split('\n')
+            return _json_response({"error": f"Message '{msgid}' not found"})
 
         # Insert at line position (0 = before first line)
-        if insert_line <= 0:
-            lines.insert(0, new_str)
-        elif insert_line >= len(lines):
-            lines.append(new_str)
-        else:
-            lines.insert(insert_line, new_str)
+        mgr.update_message(msgid, content=_insert_line(msg.content, insert_line, new_str))
 
-        # Update message content
-        mgr.update_message(msgid, content='\n'.join(lines))
-
-        return JSONResponse({"success": f"Inserted text after line {insert_line} in message {msgid}"})
+        return _json_response({"success": f"Inserted text after line {insert_line} in message {msgid}"})
 
     finally:
         mgr.active_dialog = prev_active
@@ -685,36 +913,36 @@ async def msg_str_replace_(req):
     Body: dlg_name, msgid, old_str, new_str
     Returns: {success: message}
     """
-    data = dict(await req.form())
-    dname = _get_dialog_name(data)
+    form = await req.form()
+    dname = _get_dialog_name(form)
 
     if not dname:
-        return JSONResponse({"error": "No dialog specified"})
+        return _json_response({"error": "No dialog specified"})
 
     mgr = get_manager()
     if dname not in mgr.dialogs:
-        return JSONResponse({"error": f"Dialog '{dname}' not found"})
+        return _json_response({"error": f"Dialog '{dname}' not found"})
 
     prev_active = mgr.active_dialog
     mgr.active_dialog = dname
 
     try:
         dialog = mgr.dialogs[dname]
-        msgid = data.get('msgid', '')
-        old_str = data.get('old_str', '')
-        new_str = data.get('new_str', '')
+        msgid = form.get('msgid', '')
+        old_str = form.get('old_str', '')
+        new_str = form.get('new_str', '')
 
         msg = dialog.get_message_by_id(msgid)
         if not msg:
-            return JSONResponse({"error": f"Message '{msgid}' not found"})
+            return _json_response({"error": f"Message '{msgid}' not found"})
 
         if old_str not in msg.content:
-            return JSONResponse({"error": f"String not found in message"})
+            return _json_response({"error": f"String not found in message"})
 
         new_content = msg.content.replace(old_str, new_str, 1)
         mgr.update_message(msgid, content=new_content)
 
-        return JSONResponse({"success": f"Replaced text in message {msgid}"})
+        return _json_response({"success": f"Replaced text in message {msgid}"})
 
     finally:
         mgr.active_dialog = prev_active
@@ -728,44 +956,49 @@ async def msg_strs_replace_(req):
     Body: dlg_name, msgid, old_strs (JSON array), new_strs (JSON array)
     Returns: {success: message}
     """
-    data = dict(await req.form())
-    dname = _get_dialog_name(data)
+    form = await req.form()
+    dname = _get_dialog_name(form)
 
     if not dname:
-        return JSONResponse({"error": "No dialog specified"})
+        return _json_response({"error": "No dialog specified"})
 
     mgr = get_manager()
     if dname not in mgr.dialogs:
-        return JSONResponse({"error": f"Dialog '{dname}' not found"})
+        return _json_response({"error": f"Dialog '{dname}' not found"})
 
     prev_active = mgr.active_dialog
     mgr.active_dialog = dname
 
     try:
         dialog = mgr.dialogs[dname]
-        msgid = data.get('msgid', '')
+        msgid = form.get('msgid', '')
 
         # Parse arrays
         try:
-            old_strs = json.loads(data.get('old_strs', '[]'))
-            new_strs = json.loads(data.get('new_strs', '[]'))
+            old_strs = _json_loads(form.get('old_strs', '[]'))
+            new_strs = _json_loads(form.get('new_strs', '[]'))
         except json.JSONDecodeError:
-            return JSONResponse({"error": "Invalid JSON arrays"})
+            return _json_response({"error": "Invalid JSON arrays"})
 
         if len(old_strs) != len(new_strs):
-            return JSONResponse({"error": "old_strs and new_strs must have same length"})
+            return _json_response({"error": "old_strs and new_strs must have same length"})
 
         msg = dialog.get_message_by_id(msgid)
         if not msg:
-            return JSONResponse({"error": f"Message '{msgid}' not found"})
+            return _json_response({"error": f"Message '{msgid}' not found"})
 
+        # Pairs apply in order, each to the result of the previous one, so a
+        # single scan of the original text would not be equivalent
         content = msg.content
         for old_str, new_str in zip(old_strs, new_strs):
-            content = content.replace(old_str, new_str, 1)
+            if old_str != new_str:
+                content = content.replace(old_str, new_str, 1)
 
-        mgr.update_message(msgid, content=content)
+        # Nothing matched: skip the save and the undo entry
+        if content != msg.content:
+            mgr.update_message(msgid, content=content)
 
-        return JSONResponse({"success": f"Successfully replaced all the strings in message {msgid}"})
+        return _json_response({"success": f"Successfully replaced all the strings in message {msgid}"})
 
     finally:
         mgr.active_dialog = prev_active
@@ -779,41 +1012,36 @@ async def msg_replace_lines_(req):
     Body: dlg_name, msgid, start_line, end_line, new_content
     Returns: {success: message}
     """
-    data = dict(await req.form())
-    dname = _get_dialog_name(data)
+    form = await req.form()
+    dname = _get_dialog_name(form)
 
     if not dname:
-        return JSONResponse({"error": "No dialog specified"})
+        return _json_response({"error": "No dialog specified"})
 
     mgr = get_manager()
     if dname not in mgr.dialogs:
-        return JSONResponse({"error": f"Dialog '{dname}' not found"})
+        return _json_response({"error": f"Dialog '{dname}' not found"})
 
     prev_active = mgr.active_dialog
     mgr.active_dialog = dname
 
     try:
         dialog = mgr.dialogs[dname]
-        msgid = data.get('msgid', '')
-        start_line = int(data.get('start_line', 1))
-        end_line = int(data.get('end_line', 1))
-        new_content = data.get('new_content', '')
+        msgid = form.get('msgid', '')
+        start_line = int(form.get('start_line', 1))
+        end_line = int(form.get('end_line', 1))
+        new_content = form.get('new_content', '')
 
         msg = dialog.get_message_by_id(msgid)
         if not msg:
-            return JSONResponse({"error": f"Message '{msgid}' not found"})
-
-        lines = msg.content.split('\n')
+            return _json_response({"error": f"Message '{msgid}' not found"})
 
         # 1-based indexing, inclusive
-        new_lines = new_content.rstrip('\n').split('\n') if new_content else []
-
-        # Replace lines
-        result_lines = lines[:start_line-1] + new_lines + lines[end_line:]
-
-        mgr.update_message(msgid, content='\n'.join(result_lines))
+        mgr.update_message(
+            msgid, content=_replace_lines(msg.content, start_line, end_line, new_content)
+        )
 
-        return JSONResponse({"success": f"Replaced lines {start_line} to {end_line} in message {msgid}"})
+        return _json_response({"success": f"Replaced lines {start_line} to {end_line} in message {msgid}"})
 
     finally:
         mgr.active_dialog = prev_active
@@ -829,21 +1057,21 @@ async def use_dialog_(req):
     Body: dlg_name, dialog_path, mode
     Returns: {status, message}
     """
-    data = dict(await req.form())
-    dialog_name = data.get('dlg_name', '')
-    dialog_path = data.get('dialog_path', '')
-    mode = data.get('mode', 'connect')
+    form = await req.form()
+    dialog_name = form.get('dlg_name', '')
+    dialog_path = form.get('dialog_path', '')
+    mode = form.get('mode', 'connect')
 
     if not dialog_name or not dialog_path:
-        return JSONResponse({"error": "dialog_name and dialog_path required"})
+        return _json_response({"error": "dialog_name and dialog_path required"})
 
     mgr = get_manager()
     result = mgr.use_dialog(dialog_name, dialog_path, mode=mode)
 
     if result.startswith("Error"):
-        return JSONResponse({"error": result})
+        return _json_response({"error": result})
 
-    return JSONResponse({"status": "ok", "message": result})
+    return _json_response({"status": "ok", "message": result})
 
 
 @rt
@@ -854,19 +1082,19 @@ async def unuse_dialog_(req):
     Body: dlg_name
     Returns: {status, message}
     """
-    data = dict(await req.form())
-    dialog_name = data.get('dlg_name', '')
+    form = await req.form()
+    dialog_name = form.get('dlg_name', '')
 
     if not dialog_name:
-        return JSONResponse({"error": "dialog_name required"})
+        return _json_response({"error": "dialog_name required"})
 
     mgr = get_manager()
     result = mgr.unuse_dialog(dialog_name)
 
     if result.startswith("Error"):
-        return JSONResponse({"error": result})
+        return _json_response({"error": result})
 
-    return JSONResponse({"status": "ok", "message": result})
+    return _json_response({"status": "ok", "message": result})
 
 
 @rt
@@ -888,28 +1116,31 @@ async def list_dialogs_(req):
             'is_active': dialog.is_active
         })
 
-    return JSONResponse({"dialogs": dialogs})
+    return _json_response({"dialogs": dialogs})
 
 
 # ================== Index/Health Endpoints ==================
 
+# The status markup never changes shape, so it is rendered once and only
+# the counts are filled in per request instead of building a component tree
+_INDEX_TMPL = (
+    '<div id="status"><div>DialogHelper Server v1.0'
+    '<div>Active dialogs: %d</div><div>Current: %s</div></div></div>'
+)
+
+
 @rt
 def index():
     """Health check and info page."""
-    return Div(
-        Div(
-            f"DialogHelper Server v1.0",
-            Div(f"Active dialogs: {len(get_manager().dialogs)}"),
-            Div(f"Current: {get_manager().active_dialog or 'None'}"),
-        ),
-        id="status"
-    )
+    mgr = get_manager()
+    body = _INDEX_TMPL % (len(mgr.dialogs), html.escape(mgr.active_dialog or 'None'))
+    return Response(body.encode('utf-8'), media_type="text/html")
 
 
 @rt
 def health():
     """Health check endpoint."""
-    return JSONResponse({"status": "ok"})
+    return _json_response({"status": "ok"})
 
 
 def serve(port: int = 5001, host: str = "0.0.0.0", reload: bool = False):
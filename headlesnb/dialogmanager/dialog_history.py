@@ -11,23 +11,21 @@ Design Notes:
 
 from typing import Any, Dict, List, Optional
 from dataclasses import dataclass, field
-from datetime import datetime
-from copy import deepcopy
 
 from ..history import HistoryCommand
 from .message import Message
-from .serialization import save_dialog_to_file
 
 
-@dataclass
+@dataclass(slots=True)
 class InsertMessageCommand(HistoryCommand):
     """Command for inserting a message."""
     msg_index: int
     message: Message
     _inserted_id: Optional[str] = field(default=None, repr=False)
+    _desc: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
-        super().__init__()
+        HistoryCommand.__init__(self)
 
     def execute(self, manager) -> str:
         dialog = manager.dialogs[manager.active_dialog]
@@ -41,11 +39,10 @@ class InsertMessageCommand(HistoryCommand):
 
         # Update stored index if it was -1
         self.msg_index = actual_index
+        self._desc = None
 
         # Save dialog
-        if dialog.path:
-            save_dialog_to_file(dialog, dialog.path)
-        dialog.last_activity = datetime.now()
+        manager._mark_dirty(dialog)
 
         return f"Inserted {self.message.msg_type} message at index {actual_index}"
 
@@ -57,24 +54,65 @@ class InsertMessageCommand(HistoryCommand):
             del dialog.messages[self.msg_index]
 
         # Save dialog
-        if dialog.path:
-            save_dialog_to_file(dialog, dialog.path)
-        dialog.last_activity = datetime.now()
+        manager._mark_dirty(dialog)
 
         return f"Undid insert of {self.message.msg_type} message at index {self.msg_index}"
 
     def description(self) -> str:
-        return f"Insert {self.message.msg_type} message at [{self.msg_index}]"
+        if self._desc is None:
+            self._desc = f"Insert {self.message.msg_type} message at [{self.msg_index}]"
+        return self._desc
 
 
-@dataclass
+@dataclass(slots=True)
+class InsertMessagesCommand(HistoryCommand):
+    """Command for inserting several consecutive messages as one operation."""
+    msg_index: int
+    messages: List[Message]
+    _desc: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        HistoryCommand.__init__(self)
+
+    def execute(self, manager) -> str:
+        dialog = manager.dialogs[manager.active_dialog]
+
+        # Handle append case
+        actual_index = len(dialog.messages) if self.msg_index == -1 else self.msg_index
+        dialog.messages[actual_index:actual_index] = self.messages
+        self.msg_index = actual_index
+        self._desc = None
+
+        # Save dialog once for the whole batch
+        manager._mark_dirty(dialog)
+
+        return f"Inserted {len(self.messages)} message(s) at index {actual_index}"
+
+    def undo(self, manager) -> str:
+        dialog = manager.dialogs[manager.active_dialog]
+
+        del dialog.messages[self.msg_index:self.msg_index + len(self.messages)]
+
+        # Save dialog
+        manager._mark_dirty(dialog)
+
+        return f"Undid insert of {len(self.messages)} message(s) at index {self.msg_index}"
+
+    def description(self) -> str:
+        if self._desc is None:
+            self._desc = f"Insert {len(self.messages)} messages at [{self.msg_index}]"
+        return self._desc
+
+
+@dataclass(slots=True)
 class DeleteMessageCommand(HistoryCommand):
     """Command for deleting messages."""
     msg_indices: List[int]
     deleted_messages: List[Dict[str, Any]] = field(default_factory=list)
+    _desc: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
-        super().__init__()
+        HistoryCommand.__init__(self)
 
     def execute(self, manager) -> str:
         dialog = manager.dialogs[manager.active_dialog]
@@ -89,14 +127,12 @@ class DeleteMessageCommand(HistoryCommand):
                 msg = dialog.messages[idx]
                 self.deleted_messages.append({
                     'index': idx,
-                    'message': deepcopy(msg)
+                    'message': msg.clone()
                 })
                 del dialog.messages[idx]
 
         # Save dialog
-        if dialog.path:
-            save_dialog_to_file(dialog, dialog.path)
-        dialog.last_activity = datetime.now()
+        manager._mark_dirty(dialog)
 
         return f"Deleted {len(self.deleted_messages)} message(s)"
 
@@ -110,26 +146,27 @@ class DeleteMessageCommand(HistoryCommand):
             dialog.messages.insert(idx, msg)
 
         # Save dialog
-        if dialog.path:
-            save_dialog_to_file(dialog, dialog.path)
-        dialog.last_activity = datetime.now()
+        manager._mark_dirty(dialog)
 
         return f"Restored {len(self.deleted_messages)} deleted message(s)"
 
     def description(self) -> str:
-        return f"Delete {len(self.msg_indices)} message(s) at {self.msg_indices}"
+        if self._desc is None:
+            self._desc = f"Delete {len(self.msg_indices)} message(s) at {self.msg_indices}"
+        return self._desc
 
 
-@dataclass
+@dataclass(slots=True)
 class UpdateMessageCommand(HistoryCommand):
     """Command for updating a message's content or output."""
     msg_index: int
     field_name: str  # 'content', 'output', or other field
     old_value: Any
     new_value: Any
+    _desc: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
-        super().__init__()
+        HistoryCommand.__init__(self)
 
     def execute(self, manager) -> str:
         dialog = manager.dialogs[manager.active_dialog]
@@ -143,9 +180,7 @@ class UpdateMessageCommand(HistoryCommand):
         setattr(msg, self.field_name, self.new_value)
 
         # Save dialog
-        if dialog.path:
-            save_dialog_to_file(dialog, dialog.path)
-        dialog.last_activity = datetime.now()
+        manager._mark_dirty(dialog)
 
         return f"Updated message [{self.msg_index}] {self.field_name}"
 
@@ -157,24 +192,25 @@ class UpdateMessageCommand(HistoryCommand):
         setattr(msg, self.field_name, self.old_value)
 
         # Save dialog
-        if dialog.path:
-            save_dialog_to_file(dialog, dialog.path)
-        dialog.last_activity = datetime.now()
+        manager._mark_dirty(dialog)
 
         return f"Restored message [{self.msg_index}] {self.field_name} to previous value"
 
     def description(self) -> str:
-        return f"Update message [{self.msg_index}] {self.field_name}"
+        if self._desc is None:
+            self._desc = f"Update message [{self.msg_index}] {self.field_name}"
+        return self._desc
 
 
-@dataclass
+@dataclass(slots=True)
 class MoveMessageCommand(HistoryCommand):
     """Command for moving a message."""
     from_index: int
     to_index: int
+    _desc: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
-        super().__init__()
+        HistoryCommand.__init__(self)
 
     def execute(self, manager) -> str:
         dialog = manager.dialogs[manager.active_dialog]
@@ -186,9 +222,7 @@ class MoveMessageCommand(HistoryCommand):
         dialog.messages.insert(self.to_index, msg)
 
         # Save dialog
-        if dialog.path:
-            save_dialog_to_file(dialog, dialog.path)
-        dialog.last_activity = datetime.now()
+        manager._mark_dirty(dialog)
 
         return f"Moved message from [{self.from_index}] to [{self.to_index}]"
 
@@ -200,24 +234,25 @@ class MoveMessageCommand(HistoryCommand):
         dialog.messages.insert(self.from_index, msg)
 
         # Save dialog
-        if dialog.path:
-            save_dialog_to_file(dialog, dialog.path)
-        dialog.last_activity = datetime.now()
+        manager._mark_dirty(dialog)
 
         return f"Moved message back from [{self.to_index}] to [{self.from_index}]"
 
     def description(self) -> str:
-        return f"Move message [{self.from_index}] -> [{self.to_index}]"
+        if self._desc is None:
+            self._desc = f"Move message [{self.from_index}] -> [{self.to_index}]"
+        return self._desc
 
 
-@dataclass
+@dataclass(slots=True)
 class SwapMessagesCommand(HistoryCommand):
     """Command for swapping two messages."""
     index1: int
     index2: int
+    _desc: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
-        super().__init__()
+        HistoryCommand.__init__(self)
 
     def execute(self, manager) -> str:
         dialog = manager.dialogs[manager.active_dialog]
@@ -227,9 +262,7 @@ class SwapMessagesCommand(HistoryCommand):
             dialog.messages[self.index2], dialog.messages[self.index1]
 
         # Save dialog
-        if dialog.path:
-            save_dialog_to_file(dialog, dialog.path)
-        dialog.last_activity = datetime.now()
+        manager._mark_dirty(dialog)
 
         return f"Swapped messages [{self.index1}] and [{self.index2}]"
 
@@ -238,17 +271,21 @@ class SwapMessagesCommand(HistoryCommand):
         return self.execute(manager)
 
     def description(self) -> str:
-        return f"Swap messages [{self.index1}] <-> [{self.index2}]"
+        if self._desc is None:
+            self._desc = f"Swap messages [{self.index1}] <-> [{self.index2}]"
+        return self._desc
 
 
-@dataclass
+@dataclass(slots=True)
 class ReorderMessagesCommand(HistoryCommand):
     """Command for reordering messages."""
     old_order: List[int] = field(default_factory=list)
     new_order: List[int] = field(default_factory=list)
+    inverse_order: List[int] = field(default_factory=list)
+    _desc: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
-        super().__init__()
+        HistoryCommand.__init__(self)
 
     def execute(self, manager) -> str:
         dialog = manager.dialogs[manager.active_dialog]
@@ -258,35 +295,41 @@ class ReorderMessagesCommand(HistoryCommand):
             self.old_order = list(range(len(dialog.messages)))
 
         # Create new message list in specified order
-        old_messages = dialog.messages.copy()
-        dialog.messages = [old_messages[i] for i in self.new_order]
+        messages = dialog.messages
+        dialog.messages = [messages[i] for i in self.new_order]
 
         # Save dialog
-        if dialog.path:
-            save_dialog_to_file(dialog, dialog.path)
-        dialog.last_activity = datetime.now()
+        manager._mark_dirty(dialog)
 
         return f"Reordered {len(dialog.messages)} messages"
 
     def undo(self, manager) -> str:
         dialog = manager.dialogs[manager.active_dialog]
 
+        # Inverse permutation: the message now at position i came from
+        # new_order[i]; computed once, then reused across undo/redo cycles
+        if not self.inverse_order:
+            self.inverse_order = [0] * len(self.new_order)
+            for new_pos, old_pos in enumerate(self.new_order):
+                self.inverse_order[old_pos] = new_pos
+
         # Restore old order
-        old_messages = dialog.messages.copy()
-        dialog.messages = [old_messages[self.new_order.index(i)] for i in self.old_order]
+        messages = dialog.messages
+        inverse = self.inverse_order
+        dialog.messages = [messages[inverse[i]] for i in self.old_order]
 
         # Save dialog
-        if dialog.path:
-            save_dialog_to_file(dialog, dialog.path)
-        dialog.last_activity = datetime.now()
+        manager._mark_dirty(dialog)
 
         return f"Restored previous message order"
 
     def description(self) -> str:
-        return f"Reorder messages: {self.new_order}"
+        if self._desc is None:
+            self._desc = f"Reorder messages: {self.new_order}"
+        return self._desc
 
 
-@dataclass
+@dataclass(slots=True)
 class UpdateMessageOutputCommand(HistoryCommand):
     """Specialized command for updating message output (e.g., LLM responses).
 
@@ -298,9 +341,10 @@ class UpdateMessageOutputCommand(HistoryCommand):
     new_output: str
     old_time_run: Optional[str] = None
     new_time_run: Optional[str] = None
+    _desc: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
-        super().__init__()
+        HistoryCommand.__init__(self)
 
     def execute(self, manager) -> str:
         dialog = manager.dialogs[manager.active_dialog]
@@ -318,9 +362,7 @@ class UpdateMessageOutputCommand(HistoryCommand):
             msg.time_run = self.new_time_run
 
         # Save dialog
-        if dialog.path:
-            save_dialog_to_file(dialog, dialog.path)
-        dialog.last_activity = datetime.now()
+        manager._mark_dirty(dialog)
 
         return f"Updated output for message [{self.msg_index}]"
 
@@ -333,11 +375,11 @@ class UpdateMessageOutputCommand(HistoryCommand):
         msg.time_run = self.old_time_run
 
         # Save dialog
-        if dialog.path:
-            save_dialog_to_file(dialog, dialog.path)
-        dialog.last_activity = datetime.now()
+        manager._mark_dirty(dialog)
 
         return f"Restored previous output for message [{self.msg_index}]"
 
     def description(self) -> str:
-        return f"Update output for message [{self.msg_index}]"
+        if self._desc is None:
+            self._desc = f"Update output for message [{self.msg_index}]"
+        return self._desc
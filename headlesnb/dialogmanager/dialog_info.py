@@ -10,8 +10,10 @@ Example:
     ... )
 """
 
+import asyncio
+import threading
 from dataclasses import dataclass, field
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from pathlib import Path
 from datetime import datetime
 
@@ -31,7 +33,8 @@ class DialogInfo:
     Attributes:
         name: Unique identifier for this dialog.
         path: File system path where dialog is stored. None for in-memory dialogs.
-        shell: CaptureShell instance for code execution. None if not needed.
+        shell: CaptureShell instance for code execution. None until the
+            first code execution; see ensure_shell().
         history: Operation history for undo/redo support.
         created_at: Timestamp when dialog was created or loaded.
         last_activity: Timestamp of most recent modification.
@@ -52,7 +55,7 @@ class DialogInfo:
     name: str
     path: Optional[Path] = None
     shell: Optional[CaptureShell] = None
-    history: OperationHistory = field(default_factory=lambda: OperationHistory(max_size=100))
+    history: OperationHistory = field(default_factory=OperationHistory)
     created_at: datetime = field(default_factory=datetime.now)
     last_activity: datetime = field(default_factory=datetime.now)
     is_active: bool = False
@@ -61,6 +64,26 @@ class DialogInfo:
     version: int = 2
     current_msg_id: Optional[str] = None
     llm_client: Optional[Any] = None
+    dirty: bool = False  # In-memory changes not yet written to disk
+    save_timer: Optional[Union[threading.Timer, asyncio.TimerHandle]] = field(default=None, repr=False, compare=False)  # Pending debounced save
+    batch_depth: int = field(default=0, repr=False, compare=False)  # Open DialogManager.batch() blocks
+    batch_changed: bool = field(default=False, repr=False, compare=False)  # Changed inside the open batch
+    # msg id -> position in messages; rebuilt lazily, see get_message_index
+    _id_index: Dict[str, int] = field(default_factory=dict, init=False, repr=False, compare=False)
+    # msg_type -> messages in dialog order; None when stale, see get_messages_by_type
+    _by_type: Optional[Dict[Optional[str], List[Message]]] = field(default=None, init=False, repr=False, compare=False)
+    _by_type_key: tuple = field(default=(), init=False, repr=False, compare=False)
+    # (path, hash, mtime_ns, size) of the last write; lets unchanged saves be skipped
+    _saved_state: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+
+    def ensure_shell(self) -> CaptureShell:
+        """Return the dialog's shell, starting it on first use.
+
+        Dialogs that are only read or edited never start a kernel.
+        """
+        if self.shell is None:
+            self.shell = CaptureShell(path=self.path.parent) if self.path else CaptureShell()
+        return self.shell
 
     def get_message_by_id(self, msg_id: str) -> Optional[Message]:
         """Get a message by its ID.
@@ -71,10 +94,8 @@ class DialogInfo:
         Returns:
             The Message with the given ID, or None if not found.
         """
-        for msg in self.messages:
-            if msg.id == msg_id:
-                return msg
-        return None
+        i = self.get_message_index(msg_id)
+        return None if i is None else self.messages[i]
 
     def get_message_index(self, msg_id: str) -> Optional[int]:
         """Get the index of a message by its ID.
@@ -85,10 +106,17 @@ class DialogInfo:
         Returns:
             The index of the message, or None if not found.
         """
-        for i, msg in enumerate(self.messages):
-            if msg.id == msg_id:
-                return i
-        return None
+        messages = self.messages
+        i = self._id_index.get(msg_id)
+        if i is not None and i < len(messages) and messages[i].id == msg_id:
+            return i
+        # messages is edited in place by commands and callers, so a stale or
+        # missing entry just means the list changed: rebuild once and retry
+        index: Dict[str, int] = {}
+        for i, msg in enumerate(messages):
+            index.setdefault(msg.id, i)
+        self._id_index = index
+        return index.get(msg_id)
 
     def message_count(self) -> int:
         """Get the total number of messages.
@@ -107,4 +135,17 @@ class DialogInfo:
         Returns:
             List of messages with the given type.
         """
-        return [msg for msg in self.messages if msg.msg_type == msg_type]
+        messages = self.messages
+        # Replacing or resizing the list is detected here; in-place edits
+        # such as moves or type changes must call messages_changed()
+        key = (id(messages), len(messages))
+        if self._by_type is None or self._by_type_key != key:
+            by_type: Dict[Optional[str], List[Message]] = {}
+            for msg in messages:
+                by_type.setdefault(msg.msg_type, []).append(msg)
+            self._by_type, self._by_type_key = by_type, key
+        return list(self._by_type.get(msg_type, ()))
+
+    def messages_changed(self):
+        """Drop lookups derived from messages after they were edited in place."""
+        self._by_type = None
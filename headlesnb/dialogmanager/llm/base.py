@@ -17,7 +17,7 @@ from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional, Iterator, Union
 
 
-@dataclass
+@dataclass(slots=True)
 class LLMResponse:
     """Response from an LLM call.
 
@@ -95,6 +95,19 @@ class LLMClient(ABC):
         """
         pass
 
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """Estimate token counts for several texts at once.
+
+        Clients with a cheaper batched path should override this.
+
+        Args:
+            texts: Texts to count tokens for.
+
+        Returns:
+            Estimated token count for each text, in order.
+        """
+        return [self.count_tokens(text) for text in texts]
+
     @property
     @abstractmethod
     def context_window(self) -> int:
@@ -8,15 +8,43 @@ Example:
     >>> messages = builder.build_context(dialog.messages, current_prompt)
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from bisect import bisect_right
 from dataclasses import dataclass, field
+from itertools import accumulate
 import json
 
+try:
+    import orjson
+except ImportError:  # optional, see the "fast" extra
+    orjson = None
+
 from ..message import Message
 from .base import LLMClient
 
+# Regular messages are formatted newest-first in batches of this size, so
+# older messages past the budget are never formatted
+_FORMAT_BATCH = 64
+
+# Shared decoder for stored code outputs (avoids json.loads' per-call dispatch)
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _loads_output(text: str) -> Any:
+    """Parse a stored code output, with orjson when available.
+
+    Input orjson rejects but json accepts (NaN, ints wider than 64 bits)
+    is retried with json, so results and errors match json.loads.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return _JSON_DECODER.decode(text)
+
 
-@dataclass
+@dataclass(slots=True)
 class ContextBudget:
     """Track token budget usage.
 
@@ -82,6 +110,10 @@ class ContextBuilder:
         """
         self.llm_client = llm_client
         self.max_tokens = max_tokens
+        # (msg id, include_outputs) -> ((msg_type, content, output), formatted, tokens)
+        self._fmt_cache: Dict[Tuple[str, bool], tuple] = {}
+        # (msg id, field name) -> (text, tokens)
+        self._tok_cache: Dict[Tuple[str, str], Tuple[str, int]] = {}
 
     def count_tokens(self, text: str) -> int:
         """Count tokens in text.
@@ -99,13 +131,111 @@ class ContextBuilder:
         # Fallback: ~4 characters per token
         return len(text) // 4
 
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """Count tokens in several texts with one call.
+
+        Args:
+            texts: Texts to count tokens for.
+
+        Returns:
+            Token count for each text, in order.
+        """
+        if self.llm_client:
+            return self.llm_client.count_tokens_batch(texts)
+        return [len(text) >> 2 for text in texts]
+
+    def invalidate(self, msg_id: Optional[str] = None):
+        """Forget cached formatting and token counts.
+
+        Entries are already checked against the message fields on every
+        lookup, so this only frees memory (e.g. for released dialogs) or
+        resets counts after llm_client changes.
+
+        Args:
+            msg_id: Message to forget. If None, clears everything.
+        """
+        if msg_id is None:
+            self._fmt_cache.clear()
+            self._tok_cache.clear()
+            return
+        for include_outputs in (True, False):
+            self._fmt_cache.pop((msg_id, include_outputs), None)
+        for name in ('content', 'output'):
+            self._tok_cache.pop((msg_id, name), None)
+
+    def _formatted(self, msgs: List[Message], include_outputs: bool) -> List[Tuple[Dict[str, Any], int]]:
+        """Format messages and count their tokens, cached.
+
+        A cache entry is reused while the message's type, content and
+        output are unchanged, so repeated builds over a dialog only pay
+        for new or edited messages; those are counted in one batch.
+        """
+        cache = self._fmt_cache
+        result = []
+        misses = []
+        for msg in msgs:
+            key = (msg.id, include_outputs)
+            stamp = (msg.msg_type, msg.content, msg.output)
+            hit = cache.get(key)
+            if hit is not None and hit[0] == stamp:
+                result.append((hit[1], hit[2]))
+            else:
+                formatted = self._format_message(msg, include_outputs)
+                misses.append((len(result), key, stamp, formatted))
+                result.append(None)
+        if misses:
+            counts = self.count_tokens_batch(
+                [self._message_to_text(formatted) for _, _, _, formatted in misses]
+            )
+            for (i, key, stamp, formatted), tokens in zip(misses, counts):
+                cache[key] = (stamp, formatted, tokens)
+                result[i] = (formatted, tokens)
+        return result
+
+    def _entries(
+        self,
+        msgs: List[Message],
+        include_outputs: bool,
+        seen: Optional[set] = None
+    ) -> List[tuple]:
+        """Return (msg, formatted, tokens) for msgs, in order.
+
+        When seen is given, messages whose formatted content is already in
+        it are left out and the content of the others is added to it.
+        """
+        entries = [
+            (msg, formatted, tokens) for msg, (formatted, tokens)
+            in zip(msgs, self._formatted(msgs, include_outputs))
+        ]
+        if seen is None:
+            return entries
+        unique = []
+        for entry in entries:
+            content = entry[1]['content']
+            if content not in seen:
+                seen.add(content)
+                unique.append(entry)
+        return unique
+
+    def _count_field(self, msg: Message, name: str) -> int:
+        """Count tokens in one text field of a message, cached."""
+        text = getattr(msg, name)
+        key = (msg.id, name)
+        hit = self._tok_cache.get(key)
+        if hit is not None and hit[0] == text:
+            return hit[1]
+        tokens = self.count_tokens(text)
+        self._tok_cache[key] = (text, tokens)
+        return tokens
+
     def build_context(
         self,
         dialog_messages: List[Message],
         current_prompt: Optional[str] = None,
         include_outputs: bool = True,
         system_prompt: str = "",
-        reserved_tokens: int = 4096
+        reserved_tokens: int = 4096,
+        deduplicate: bool = False
     ) -> List[Dict[str, Any]]:
         """Build context for LLM from dialog messages.
 
@@ -121,6 +251,9 @@ class ContextBuilder:
             include_outputs: Whether to include message outputs.
             system_prompt: System prompt (for budget calculation).
             reserved_tokens: Tokens to reserve for response.
+            deduplicate: Drop regular messages whose formatted content is
+                identical to a pinned or a newer message (e.g. re-run code
+                with the same output), so repeats don't use the budget.
 
         Returns:
             List of message dictionaries for LLM API.
@@ -133,8 +266,8 @@ class ContextBuilder:
         # Account for system prompt
         if system_prompt:
             budget.consume(self.count_tokens(system_prompt))
-
-        result_messages: List[Dict[str, Any]] = []
+        # Remaining budget, tracked in a local through the selection loops
+        available = budget.available
 
         # Separate pinned vs regular messages
         pinned_messages = []
@@ -148,57 +281,64 @@ class ContextBuilder:
             else:
                 regular_messages.append(msg)
 
+        # Formatted messages that made it into the context, by message id
+        pinned_by_id: Dict[str, Dict[str, Any]] = {}
+        regular_by_id: Dict[str, Dict[str, Any]] = {}
+
         # Always include pinned messages first
-        for msg in pinned_messages:
-            formatted = self._format_message(msg, include_outputs)
-            tokens = self.count_tokens(self._message_to_text(formatted))
-            budget.consume(tokens)  # Pinned always included
-            result_messages.append(formatted)
-
-        # Add regular messages newest-first until budget exhausted
-        # (but we'll reverse at the end to maintain order)
-        regular_to_include = []
-        for msg in reversed(regular_messages):
-            formatted = self._format_message(msg, include_outputs)
-            tokens = self.count_tokens(self._message_to_text(formatted))
-            if budget.can_fit(tokens):
-                budget.consume(tokens)
-                regular_to_include.append(formatted)
-
-        # Reverse to maintain chronological order
-        regular_to_include.reverse()
-
-        # Insert regular messages after pinned ones
-        # Actually, we should maintain original order
-        # So let's rebuild in proper order
-
-        # Build final list maintaining original message order
-        final_messages = []
-        included_ids = {msg['id'] for msg in result_messages}
-        regular_ids = {self._get_msg_id(m) for m in regular_to_include}
+        for msg, (formatted, tokens) in zip(
+            pinned_messages, self._formatted(pinned_messages, include_outputs)
+        ):
+            if tokens <= available:  # Pinned always included, counted if it fits
+                available -= tokens
+            pinned_by_id.setdefault(msg.id, formatted)
+
+        # Add regular messages newest-first until budget exhausted. They are
+        # formatted in batches; within a batch the run that fits as a whole
+        # is found by binary search over the running token totals
+        regular_messages.reverse()
+        seen = {formatted['content'] for formatted in pinned_by_id.values()} if deduplicate else None
+        older: List[tuple] = []
+        pos = 0
+        while pos < len(regular_messages):
+            batch = self._entries(regular_messages[pos:pos + _FORMAT_BATCH], include_outputs, seen)
+            pos += _FORMAT_BATCH
+            totals = list(accumulate(tokens for _, _, tokens in batch))
+            fit = bisect_right(totals, available)
+            if fit:
+                available -= totals[fit - 1]
+                regular_by_id.update((msg.id, formatted) for msg, formatted, _ in batch[:fit])
+            if fit < len(batch):
+                older = batch[fit:]
+                break
+
+        # Older messages are tried one by one, so a message too large to fit
+        # is skipped rather than ending the scan. Formatting only adds text,
+        # so with the character estimate len(content) >> 2 is a lower bound
+        # and messages that can't fit are dropped before being formatted
+        rest = regular_messages[pos:]
+        if self.llm_client is None:
+            rest = [msg for msg in rest if len(msg.content) >> 2 <= available]
+        older += self._entries(rest, include_outputs, seen)
+        # Nothing older can fit once the budget is below the smallest count
+        smallest = min((tokens for _, _, tokens in older), default=0)
+        if available >= smallest:
+            for msg, formatted, tokens in older:
+                if tokens <= available:
+                    available -= tokens
+                    regular_by_id[msg.id] = formatted
+                    if available < smallest:
+                        break
 
+        # Build final list maintaining original message order; cached dicts
+        # are copied so callers can't alter them
+        llm_messages = []
         for msg in dialog_messages:
             if msg.skipped:
                 continue
-            msg_id = msg.id
-            if msg.pinned and msg_id in included_ids:
-                # Find the formatted pinned message
-                for fmt in result_messages:
-                    if fmt.get('id') == msg_id:
-                        final_messages.append(fmt)
-                        break
-            elif msg_id in regular_ids:
-                # Find the formatted regular message
-                for fmt in regular_to_include:
-                    if self._get_msg_id(fmt) == msg_id:
-                        final_messages.append(fmt)
-                        break
-
-        # Convert to LLM format (removing our internal 'id' field)
-        llm_messages = []
-        for msg in final_messages:
-            llm_msg = {k: v for k, v in msg.items() if k != 'id'}
-            llm_messages.append(llm_msg)
+            formatted = (pinned_by_id if msg.pinned else regular_by_id).get(msg.id)
+            if formatted is not None:
+                llm_messages.append(dict(formatted))
 
         # Add current prompt if provided
         if current_prompt:
@@ -221,14 +361,16 @@ class ContextBuilder:
             include_outputs: Whether to include outputs.
 
         Returns:
-            Dictionary with 'role', 'content', and 'id' keys.
+            Dictionary with 'role' and 'content' keys, ready to send; the
+            message id stays on msg.
         """
         if msg.msg_type == 'code':
             # Code messages become user messages with output
             content = f"```python\n{msg.content}\n```"
-            if include_outputs and msg.output:
+            # Stored outputs are a JSON list; plain text can't parse, so don't try
+            if include_outputs and msg.output.lstrip()[:1] == '[':
                 try:
-                    outputs = json.loads(msg.output)
+                    outputs = _loads_output(msg.output)
                     output_text = self._format_code_output(outputs)
                     if output_text:
                         content += f"\n\nOutput:\n```\n{output_text}\n```"
@@ -236,41 +378,30 @@ class ContextBuilder:
                     pass
             return {
                 'role': 'user',
-                'content': content,
-                'id': msg.id
+                'content': content
             }
 
         elif msg.msg_type == 'prompt':
-            # Prompt messages: content is user, output is assistant
-            messages = [{
+            # Prompt messages: content is user, output is assistant. Only
+            # the user part is returned; the caller should handle assistant
+            # responses (see build_context_with_prompt_response)
+            return {
                 'role': 'user',
-                'content': msg.content,
-                'id': msg.id
-            }]
-            if msg.output:
-                messages.append({
-                    'role': 'assistant',
-                    'content': msg.output,
-                    'id': f"{msg.id}_response"
-                })
-            # For simplicity, return just the user part
-            # The caller should handle assistant responses
-            return messages[0]
+                'content': msg.content
+            }
 
         elif msg.msg_type == 'note':
             # Note messages become user context
             return {
                 'role': 'user',
-                'content': f"[Note]\n{msg.content}",
-                'id': msg.id
+                'content': f"[Note]\n{msg.content}"
             }
 
         else:
             # Raw or unknown - include as context
             return {
                 'role': 'user',
-                'content': msg.content,
-                'id': msg.id
+                'content': msg.content
             }
 
     def _format_code_output(self, outputs: List[Dict]) -> str:
@@ -282,25 +413,37 @@ class ContextBuilder:
         Returns:
             Formatted output string.
         """
-        result = []
+        # Fragments of every output go into one flat list, joined once
+        parts: List[str] = []
+        sep = ''
         for output in outputs:
             output_type = output.get('output_type', '')
 
             if output_type == 'stream':
-                text = ''.join(output.get('text', []))
-                result.append(text)
+                text = output.get('text', [])
 
             elif output_type in ('execute_result', 'display_data'):
                 data = output.get('data', {})
-                if 'text/plain' in data:
-                    result.append(''.join(data['text/plain']))
+                if 'text/plain' not in data:
+                    continue
+                text = data['text/plain']
 
             elif output_type == 'error':
                 ename = output.get('ename', 'Error')
                 evalue = output.get('evalue', '')
-                result.append(f"{ename}: {evalue}")
+                text = f"{ename}: {evalue}"
 
-        return '\n'.join(result)
+            else:
+                continue
+
+            parts.append(sep)
+            sep = '\n'
+            if isinstance(text, str):
+                parts.append(text)
+            else:
+                parts.extend(text)
+
+        return ''.join(parts)
 
     def _message_to_text(self, msg: Dict[str, Any]) -> str:
         """Convert message dict to text for token counting.
@@ -319,10 +462,6 @@ class ContextBuilder:
             )
         return str(content)
 
-    def _get_msg_id(self, msg: Dict[str, Any]) -> str:
-        """Get message ID from formatted message."""
-        return msg.get('id', '')
-
     def build_context_with_prompt_response(
         self,
         dialog_messages: List[Message],
@@ -349,45 +488,45 @@ class ContextBuilder:
 
         if system_prompt:
             budget.consume(self.count_tokens(system_prompt))
+        available = budget.available
 
         result: List[Dict[str, Any]] = []
 
+        # Format and count code and note messages up front in one batch
+        formatted_code_notes = iter(self._formatted(
+            [msg for msg in dialog_messages
+             if not msg.skipped and msg.msg_type in ('code', 'note')],
+            True
+        ))
+
         for msg in dialog_messages:
             if msg.skipped:
                 continue
 
-            if msg.msg_type == 'prompt':
-                # Add user message
-                user_msg = {'role': 'user', 'content': msg.content}
-                user_tokens = self.count_tokens(msg.content)
+            msg_type = msg.msg_type
+            if msg_type == 'prompt':
+                # User prompt plus the assistant response, if present
+                tokens = self._count_field(msg, 'content')
+                if msg.output:
+                    tokens += self._count_field(msg, 'output')
+            elif msg_type == 'code' or msg_type == 'note':
+                # Code gets its outputs appended, notes a "[Note]" header
+                formatted, tokens = next(formatted_code_notes)
+            else:
+                continue
 
-                # Add assistant response if present
+            # Pinned messages are always included, counted if they fit; the
+            # outgoing dicts are only built for messages that are included
+            fits = tokens <= available
+            if fits:
+                available -= tokens
+            elif not msg.pinned:
+                continue
+            if msg_type == 'prompt':
+                result.append({'role': 'user', 'content': msg.content})
                 if msg.output:
-                    assistant_msg = {'role': 'assistant', 'content': msg.output}
-                    assistant_tokens = self.count_tokens(msg.output)
-                    total_tokens = user_tokens + assistant_tokens
-
-                    if msg.pinned or budget.can_fit(total_tokens):
-                        budget.consume(total_tokens)
-                        result.append(user_msg)
-                        result.append(assistant_msg)
-                else:
-                    if msg.pinned or budget.can_fit(user_tokens):
-                        budget.consume(user_tokens)
-                        result.append(user_msg)
-
-            elif msg.msg_type == 'code':
-                formatted = self._format_message(msg, include_outputs=True)
-                tokens = self.count_tokens(formatted['content'])
-                if msg.pinned or budget.can_fit(tokens):
-                    budget.consume(tokens)
-                    result.append({'role': 'user', 'content': formatted['content']})
-
-            elif msg.msg_type == 'note':
-                content = f"[Note]\n{msg.content}"
-                tokens = self.count_tokens(content)
-                if msg.pinned or budget.can_fit(tokens):
-                    budget.consume(tokens)
-                    result.append({'role': 'user', 'content': content})
+                    result.append({'role': 'assistant', 'content': msg.output})
+            else:
+                result.append({'role': 'user', 'content': formatted['content']})
 
         return result
@@ -10,6 +10,7 @@ Example:
     'Hello!'
 """
 
+from itertools import chain
 from typing import List, Dict, Any, Optional, Iterator, Union
 from dataclasses import dataclass, field
 
@@ -38,6 +39,22 @@ class MockLLMResponse:
     stop_reason: str = "end_turn"
 
 
+def _user_texts(messages: List[Dict[str, Any]]) -> List[str]:
+    """Collect the text of every user message, including text content blocks."""
+    texts = []
+    for msg in messages:
+        if msg.get('role') == 'user':
+            content = msg.get('content', '')
+            if isinstance(content, str):
+                texts.append(content)
+            elif isinstance(content, list):
+                texts.extend(
+                    item['text'] for item in content
+                    if isinstance(item, dict) and 'text' in item
+                )
+    return texts
+
+
 class MockLLMClient(LLMClient):
     """Mock LLM client for testing without API calls.
 
@@ -46,7 +63,8 @@ class MockLLMClient(LLMClient):
 
     Attributes:
         responses: List of responses to cycle through.
-        call_history: Record of all calls made for assertions.
+        call_history: Record of calls made for assertions, oldest first
+            (bounded by history_limit).
 
     Example:
         >>> # Simple usage with string responses
@@ -70,7 +88,9 @@ class MockLLMClient(LLMClient):
         self,
         responses: Optional[List[Union[str, MockLLMResponse]]] = None,
         default_response: str = "Mock response",
-        context_window_size: int = 200000
+        context_window_size: int = 200000,
+        stream_chunk_size: int = 64,
+        history_limit: Optional[int] = None
     ):
         """Initialize the mock client.
 
@@ -79,10 +99,24 @@ class MockLLMClient(LLMClient):
                 or MockLLMResponse objects for more control.
             default_response: Response to use if responses list is empty.
             context_window_size: Simulated context window size.
+            stream_chunk_size: Characters per chunk when streaming. Use 1
+                to stream character by character.
+            history_limit: Keep only the most recent calls in call_history.
+                None (the default) keeps every call.
+
+        Raises:
+            ValueError: If stream_chunk_size is not positive or
+                history_limit is negative.
         """
+        if stream_chunk_size <= 0:
+            raise ValueError(f"stream_chunk_size must be positive, got {stream_chunk_size}")
+        if history_limit is not None and history_limit < 0:
+            raise ValueError(f"history_limit must be non-negative, got {history_limit}")
         self.responses = responses or []
         self.default_response = default_response
         self._context_window = context_window_size
+        self.stream_chunk_size = stream_chunk_size
+        self.history_limit = history_limit
         self._response_index = 0
         self.call_history: List[Dict[str, Any]] = []
 
@@ -103,20 +137,24 @@ class MockLLMClient(LLMClient):
             tools: Tool definitions (recorded in history).
             max_tokens: Max tokens (recorded in history).
             temperature: Temperature (recorded in history).
-            stream: If True, yield response character by character.
+            stream: If True, yield the response in stream_chunk_size chunks.
 
         Returns:
             LLMResponse or iterator of strings if streaming.
         """
-        # Record the call
+        # Record the call; messages are kept by reference, and the user
+        # texts are extracted once here for the assertion helpers
         self.call_history.append({
             'messages': messages,
             'system_prompt': system_prompt,
             'tools': tools,
             'max_tokens': max_tokens,
             'temperature': temperature,
-            'stream': stream
+            'stream': stream,
+            'user_texts': _user_texts(messages)
         })
+        if self.history_limit is not None and len(self.call_history) > self.history_limit:
+            del self.call_history[:len(self.call_history) - self.history_limit]
 
         # Get response (cycle through list)
         if self.responses:
@@ -148,17 +186,19 @@ class MockLLMClient(LLMClient):
             return self._stream_response(llm_response.content)
         return llm_response
 
-    def _stream_response(self, content: str) -> Iterator[str]:
-        """Yield response content character by character.
+    def _stream_response(self, content: str, chunk: Optional[int] = None) -> Iterator[str]:
+        """Yield response content in fixed-size chunks.
 
         Args:
             content: Content to stream.
+            chunk: Characters per chunk. Defaults to stream_chunk_size.
 
         Yields:
-            Individual characters from content.
+            Consecutive slices of content.
         """
-        for char in content:
-            yield char
+        chunk = chunk or self.stream_chunk_size
+        for i in range(0, len(content), chunk):
+            yield content[i:i + chunk]
 
     def count_tokens(self, text: str) -> int:
         """Estimate tokens (4 chars per token).
@@ -171,6 +211,17 @@ class MockLLMClient(LLMClient):
         """
         return len(text) // 4
 
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """Estimate tokens for several texts (4 chars per token).
+
+        Args:
+            texts: Texts to count.
+
+        Returns:
+            Estimated token count for each text.
+        """
+        return [len(text) >> 2 for text in texts]
+
     @property
     def context_window(self) -> int:
         """Get mock context window size."""
@@ -207,16 +258,8 @@ class MockLLMClient(LLMClient):
         if not self.call_history:
             raise AssertionError("No calls recorded")
 
-        last_call = self.call_history[-1]
-        for msg in reversed(last_call['messages']):
-            if msg.get('role') == 'user':
-                content = msg.get('content', '')
-                if isinstance(content, str) and text in content:
-                    return
-                if isinstance(content, list):
-                    for item in content:
-                        if isinstance(item, dict) and text in item.get('text', ''):
-                            return
+        if any(text in user_text for user_text in self.call_history[-1]['user_texts']):
+            return
 
         raise AssertionError(f"'{text}' not found in last user message")
 
@@ -226,18 +269,7 @@ class MockLLMClient(LLMClient):
         Returns:
             List of user message contents.
         """
-        messages = []
-        for call in self.call_history:
-            for msg in call['messages']:
-                if msg.get('role') == 'user':
-                    content = msg.get('content', '')
-                    if isinstance(content, str):
-                        messages.append(content)
-                    elif isinstance(content, list):
-                        for item in content:
-                            if isinstance(item, dict) and 'text' in item:
-                                messages.append(item['text'])
-        return messages
+        return list(chain.from_iterable(call['user_texts'] for call in self.call_history))
 
     def get_last_system_prompt(self) -> Optional[str]:
         """Get the system prompt from the last call.
@@ -16,14 +16,16 @@ Example:
     >>> response = manager.execute_prompt()
 """
 
+import asyncio
 import threading
 import json
+import logging
+from concurrent.futures import Executor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, Iterator, List, Optional, Union, Any
 from datetime import datetime
 
-from execnb.shell import CaptureShell
-
 from .message import Message, generate_msg_id
 from .dialog_info import DialogInfo
 from .serialization import (
@@ -34,6 +36,7 @@ from .serialization import (
 )
 from .dialog_history import (
     InsertMessageCommand,
+    InsertMessagesCommand,
     DeleteMessageCommand,
     UpdateMessageCommand,
     MoveMessageCommand,
@@ -42,6 +45,10 @@ from .dialog_history import (
     UpdateMessageOutputCommand
 )
 from .llm import LLMClient, LLMResponse, MockLLMClient, ContextBuilder
+from ..base import _format_mime_data, _join_text
+from ..history import DEFAULT_HISTORY_SIZE
+
+logger = logging.getLogger(__name__)
 
 
 class DialogManager:
@@ -68,10 +75,13 @@ class DialogManager:
         >>> response = manager.execute_prompt()
     """
 
+    HISTORY_MAX_SIZE: int = DEFAULT_HISTORY_SIZE  # undo steps kept per dialog
+
     def __init__(
         self,
         root_path: str = ".",
-        default_llm_client: Optional[LLMClient] = None
+        default_llm_client: Optional[LLMClient] = None,
+        save_delay: float = 0
     ):
         """Initialize the DialogManager.
 
@@ -79,11 +89,19 @@ class DialogManager:
             root_path: Root directory for file operations.
             default_llm_client: Default LLM client for prompt execution.
                 If None, uses MockLLMClient.
+            save_delay: Seconds to wait after the last change before writing
+                a dialog to disk, so a burst of edits is saved once; 0 (the
+                default) writes synchronously on every change. Called from
+                a running event loop, the delayed save runs on that loop;
+                otherwise it runs on a timer thread, so dialogs should then
+                not be changed from other threads meanwhile.
         """
         self.root_path = Path(root_path).resolve()
         self.dialogs: Dict[str, DialogInfo] = {}
         self.active_dialog: Optional[str] = None
+        self.save_delay = save_delay
         self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
         self._default_llm_client = default_llm_client or MockLLMClient()
         self._context_builder = ContextBuilder(
             llm_client=self._default_llm_client
@@ -121,7 +139,6 @@ class DialogManager:
                 dialog = DialogInfo(
                     name=dialog_name,
                     path=full_path,
-                    shell=CaptureShell(path=full_path.parent),
                     llm_client=llm_client or self._default_llm_client,
                     is_active=True
                 )
@@ -133,13 +150,13 @@ class DialogManager:
                 if not full_path.exists():
                     return f"Error: Dialog '{dialog_path}' not found."
                 dialog = load_dialog_from_file(full_path, dialog_name)
-                dialog.shell = CaptureShell(path=full_path.parent)
                 dialog.llm_client = llm_client or self._default_llm_client
                 dialog.is_active = True
 
             else:
                 return f"Error: Invalid mode '{mode}'."
 
+            dialog.history.set_max_size(self.HISTORY_MAX_SIZE)
             self.dialogs[dialog_name] = dialog
             self.active_dialog = dialog_name
 
@@ -172,7 +189,9 @@ class DialogManager:
 
             dialog = self.dialogs[dialog_name]
             if dialog.path:
-                save_dialog_to_file(dialog, dialog.path)
+                self._save_dialog(dialog)
+            for msg in dialog.messages:
+                self._context_builder.invalidate(msg.id)
 
             del self.dialogs[dialog_name]
 
@@ -270,6 +289,49 @@ class DialogManager:
         except Exception as e:
             return f"Error adding message: {str(e)}"
 
+    def add_messages(
+        self,
+        messages: List[Dict[str, Any]],
+        index: int = -1
+    ) -> Union[List[str], str]:
+        """Add several consecutive messages to the active dialog.
+
+        The dialog is saved once and a single undo entry covers the batch.
+
+        Args:
+            messages: Dicts with 'content', optional 'msg_type' (default
+                'note') and any other message attributes accepted by
+                add_message.
+            index: Position of the first message (-1 for append).
+
+        Returns:
+            Message IDs of the new messages, in order.
+        """
+        if not self.active_dialog:
+            return "Error: No active dialog. Use use_dialog first."
+
+        dialog = self.dialogs[self.active_dialog]
+
+        if not messages:
+            return "Error: No messages provided"
+        if index != -1 and not 0 <= index <= len(dialog.messages):
+            return f"Error: Index {index} out of range (0-{len(dialog.messages)})"
+
+        try:
+            msgs = [Message(**m) for m in messages]
+        except TypeError as e:
+            return f"Error: Invalid message: {str(e)}"
+
+        command = InsertMessagesCommand(msg_index=index, messages=msgs)
+
+        try:
+            command.execute(self)
+            dialog.history.add_command(command)
+            dialog.current_msg_id = msgs[-1].id
+            return [msg.id for msg in msgs]
+        except Exception as e:
+            return f"Error adding messages: {str(e)}"
+
     def update_message(
         self,
         msg_id: str,
@@ -299,51 +361,53 @@ class DialogManager:
 
         msg = dialog.messages[msg_index]
 
-        # Update content if provided
-        if content is not None:
-            old_content = msg.content
-            command = UpdateMessageCommand(
-                msg_index=msg_index,
-                field_name='content',
-                old_value=old_content,
-                new_value=content
-            )
-            try:
-                command.execute(self)
-                dialog.history.add_command(command)
-            except Exception as e:
-                return f"Error updating content: {str(e)}"
-
-        # Update output if provided
-        if output is not None:
-            old_output = msg.output
-            command = UpdateMessageOutputCommand(
-                msg_index=msg_index,
-                old_output=old_output,
-                new_output=output,
-                new_time_run=datetime.now().strftime("%I:%M:%S%p").lower()
-            )
-            try:
-                command.execute(self)
-                dialog.history.add_command(command)
-            except Exception as e:
-                return f"Error updating output: {str(e)}"
-
-        # Update other attributes
-        for key, value in kwargs.items():
-            if hasattr(msg, key):
-                old_value = getattr(msg, key)
+        # One save for all the fields changed below
+        with self.batch():
+            # Update content if provided
+            if content is not None:
+                old_content = msg.content
                 command = UpdateMessageCommand(
                     msg_index=msg_index,
-                    field_name=key,
-                    old_value=old_value,
-                    new_value=value
+                    field_name='content',
+                    old_value=old_content,
+                    new_value=content
+                )
+                try:
+                    command.execute(self)
+                    dialog.history.add_command(command)
+                except Exception as e:
+                    return f"Error updating content: {str(e)}"
+
+            # Update output if provided
+            if output is not None:
+                old_output = msg.output
+                command = UpdateMessageOutputCommand(
+                    msg_index=msg_index,
+                    old_output=old_output,
+                    new_output=output,
+                    new_time_run=datetime.now().strftime("%I:%M:%S%p").lower()
                 )
                 try:
                     command.execute(self)
                     dialog.history.add_command(command)
                 except Exception as e:
-                    return f"Error updating {key}: {str(e)}"
+                    return f"Error updating output: {str(e)}"
+
+            # Update other attributes
+            for key, value in kwargs.items():
+                if hasattr(msg, key):
+                    old_value = getattr(msg, key)
+                    command = UpdateMessageCommand(
+                        msg_index=msg_index,
+                        field_name=key,
+                        old_value=old_value,
+                        new_value=value
+                    )
+                    try:
+                        command.execute(self)
+                        dialog.history.add_command(command)
+                    except Exception as e:
+                        return f"Error updating {key}: {str(e)}"
 
         return f"Message '{msg_id}' updated"
 
@@ -469,7 +533,8 @@ class DialogManager:
         self,
         code: Optional[str] = None,
         msg_id: Optional[str] = None,
-        timeout: int = 30
+        timeout: int = 30,
+        dialog_name: Optional[str] = None
     ) -> List[Union[str, Dict]]:
         """Execute code in the dialog's kernel.
 
@@ -477,14 +542,19 @@ class DialogManager:
             code: Code to execute directly.
             msg_id: ID of code message to execute.
             timeout: Execution timeout in seconds.
+            dialog_name: Dialog to run in. Defaults to the active dialog;
+                pass it instead of switching active_dialog.
 
         Returns:
             List of outputs.
         """
-        if not self.active_dialog:
+        dialog_name = dialog_name or self.active_dialog
+        if not dialog_name:
             return ["Error: No active dialog"]
+        if dialog_name not in self.dialogs:
+            return [f"Error: Dialog '{dialog_name}' not found"]
 
-        dialog = self.dialogs[self.active_dialog]
+        dialog = self.dialogs[dialog_name]
 
         # Get code to execute
         if msg_id:
@@ -499,15 +569,15 @@ class DialogManager:
             return ["Error: No code provided"]
 
         try:
-            outputs = dialog.shell.run(code, timeout=min(timeout, 60))
-            dialog.last_activity = datetime.now()
+            outputs = dialog.ensure_shell().run(code, timeout=min(timeout, 60))
+            now = datetime.now()
+            dialog.last_activity = now
 
             # Store outputs in message if executing by ID
             if msg_id and msg:
                 msg.output = json.dumps(outputs)
-                msg.time_run = datetime.now().strftime("%I:%M:%S%p").lower()
-                if dialog.path:
-                    save_dialog_to_file(dialog, dialog.path)
+                msg.time_run = now.strftime("%I:%M:%S%p").lower()
+                self._mark_dirty(dialog, now)
 
             return self._format_outputs(outputs)
 
@@ -524,7 +594,8 @@ class DialogManager:
         system_prompt: str = "",
         max_tokens: int = 4096,
         include_context: bool = True,
-        stream: bool = False
+        stream: bool = False,
+        dialog_name: Optional[str] = None
     ) -> LLMResponse:
         """Execute a prompt message via LLM.
 
@@ -535,14 +606,79 @@ class DialogManager:
             max_tokens: Maximum response tokens.
             include_context: Include prior messages as context.
             stream: Enable streaming response.
+            dialog_name: Dialog to run in. Defaults to the active dialog;
+                pass it instead of switching active_dialog.
 
         Returns:
             LLMResponse with the response.
         """
-        if not self.active_dialog:
+        request = self._prompt_request(msg_id, system_prompt, include_context, dialog_name)
+        if isinstance(request, LLMResponse):
+            return request
+
+        try:
+            response = self._call_llm(request, system_prompt, max_tokens, stream)
+            return self._store_prompt_response(request, response)
+        except Exception as e:
+            return LLMResponse(content=f"Error: {str(e)}")
+
+    async def execute_prompt_async(
+        self,
+        msg_id: Optional[str] = None,
+        system_prompt: str = "",
+        max_tokens: int = 4096,
+        include_context: bool = True,
+        stream: bool = False,
+        dialog_name: Optional[str] = None,
+        executor: Optional[Executor] = None
+    ) -> LLMResponse:
+        """Execute a prompt message via LLM without blocking the event loop.
+
+        Same as execute_prompt, but only the LLM call runs on `executor`.
+        The dialog is read and updated on the calling loop's thread, so it
+        is never modified concurrently with the loop's other handlers.
+
+        Args:
+            msg_id, system_prompt, max_tokens, include_context, stream,
+                dialog_name: As for execute_prompt.
+            executor: Executor for the LLM call. Defaults to the loop's
+                default executor.
+
+        Returns:
+            LLMResponse with the response.
+        """
+        request = self._prompt_request(msg_id, system_prompt, include_context, dialog_name)
+        if isinstance(request, LLMResponse):
+            return request
+
+        loop = asyncio.get_running_loop()
+        try:
+            response = await loop.run_in_executor(
+                executor, self._call_llm, request, system_prompt, max_tokens, stream
+            )
+            return self._store_prompt_response(request, response)
+        except Exception as e:
+            return LLMResponse(content=f"Error: {str(e)}")
+
+    def _prompt_request(
+        self,
+        msg_id: Optional[str],
+        system_prompt: str,
+        include_context: bool,
+        dialog_name: Optional[str]
+    ) -> Union[tuple, LLMResponse]:
+        """Find the prompt to run and build its context.
+
+        Returns:
+            (dialog, msg, llm, context), or an error LLMResponse.
+        """
+        dialog_name = dialog_name or self.active_dialog
+        if not dialog_name:
             return LLMResponse(content="Error: No active dialog")
+        if dialog_name not in self.dialogs:
+            return LLMResponse(content=f"Error: Dialog '{dialog_name}' not found")
 
-        dialog = self.dialogs[self.active_dialog]
+        dialog = self.dialogs[dialog_name]
         llm = dialog.llm_client or self._default_llm_client
 
         # Find prompt message
@@ -575,34 +711,38 @@ class DialogManager:
         else:
             context = [{'role': 'user', 'content': msg.content}]
 
-        # Execute LLM call
-        try:
-            response = llm.chat(
-                messages=context,
-                system_prompt=system_prompt,
-                max_tokens=max_tokens,
-                stream=stream
-            )
+        return dialog, msg, llm, context
 
-            # Handle streaming
-            if stream:
-                # Collect stream into response
-                content = ''.join(response)
-                response = LLMResponse(content=content, stop_reason='end_turn')
+    def _call_llm(self, request: tuple, system_prompt: str, max_tokens: int, stream: bool) -> LLMResponse:
+        """Send a prepared prompt to its LLM; touches no dialog state."""
+        _, _, llm, context = request
+        response = llm.chat(
+            messages=context,
+            system_prompt=system_prompt,
+            max_tokens=max_tokens,
+            stream=stream
+        )
 
-            # Update message with response
-            msg.output = response.content
-            msg.time_run = datetime.now().strftime("%I:%M:%S%p").lower()
+        # Handle streaming
+        if stream:
+            # Collect stream into response
+            content = ''.join(response)
+            response = LLMResponse(content=content, stop_reason='end_turn')
+        return response
 
-            # Save dialog
-            if dialog.path:
-                save_dialog_to_file(dialog, dialog.path)
-            dialog.last_activity = datetime.now()
+    def _store_prompt_response(self, request: tuple, response: LLMResponse) -> LLMResponse:
+        """Write an LLM response into its prompt message and save."""
+        dialog, msg, _, _ = request
 
-            return response
+        # Update message with response
+        now = datetime.now()
+        msg.output = response.content
+        msg.time_run = now.strftime("%I:%M:%S%p").lower()
 
-        except Exception as e:
-            return LLMResponse(content=f"Error: {str(e)}")
+        # Save dialog
+        self._mark_dirty(dialog, now)
+
+        return response
 
     # ================== Undo/Redo Operations ==================
 
@@ -626,11 +766,11 @@ class DialogManager:
         descriptions = dialog.history.get_undo_description(steps)
 
         try:
-            results = dialog.history.undo(self, steps)
-            summary = f"Undid {len(results)} operation(s):\n"
-            for desc in descriptions[:len(results)]:
-                summary += f"  - {desc}\n"
-            return summary.rstrip()
+            with self.batch():
+                results = dialog.history.undo(self, steps)
+            lines = [f"Undid {len(results)} operation(s):"]
+            lines.extend(f"  - {desc}" for desc in descriptions[:len(results)])
+            return "\n".join(lines)
         except Exception as e:
             return f"Error during undo: {str(e)}"
 
@@ -654,11 +794,11 @@ class DialogManager:
         descriptions = dialog.history.get_redo_description(steps)
 
         try:
-            results = dialog.history.redo(self, steps)
-            summary = f"Redid {len(results)} operation(s):\n"
-            for desc in descriptions[:len(results)]:
-                summary += f"  - {desc}\n"
-            return summary.rstrip()
+            with self.batch():
+                results = dialog.history.redo(self, steps)
+            lines = [f"Redid {len(results)} operation(s):"]
+            lines.extend(f"  - {desc}" for desc in descriptions[:len(results)])
+            return "\n".join(lines)
         except Exception as e:
             return f"Error during redo: {str(e)}"
 
@@ -674,16 +814,20 @@ class DialogManager:
         dialog = self.dialogs[self.active_dialog]
         summary = dialog.history.get_history_summary()
 
-        result = f"History for '{self.active_dialog}':\n"
-        result += f"  Undo available: {summary['undo_count']}\n"
-        result += f"  Redo available: {summary['redo_count']}\n"
-
-        if summary['recent_operations']:
-            result += "\nRecent:\n"
-            for i, op in enumerate(summary['recent_operations'], 1):
-                result += f"  {i}. {op}\n"
+        parts = [
+            f"History for '{self.active_dialog}':",
+            f"  Undo available: {summary.undo_count}",
+            f"  Redo available: {summary.redo_count}",
+        ]
+
+        if summary.recent_operations:
+            parts.append("\nRecent:")
+            parts.extend(
+                f"  {i}. {op}"
+                for i, op in enumerate(summary.recent_operations, 1)
+            )
 
-        return result.rstrip()
+        return "\n".join(parts)
 
     def clear_history(self) -> str:
         """Clear operation history."""
@@ -757,8 +901,163 @@ class DialogManager:
         except Exception as e:
             return f"Error: {str(e)}"
 
+    def reorder_messages(self, new_order: List[int]) -> str:
+        """Reorder messages according to a new sequence of indices.
+
+        Args:
+            new_order: Message indices in the desired order; must contain
+                every index from 0 to len(messages)-1 exactly once.
+
+        Returns:
+            Success message.
+        """
+        if not self.active_dialog:
+            return "Error: No active dialog"
+
+        dialog = self.dialogs[self.active_dialog]
+        count = len(dialog.messages)
+
+        if len(new_order) != count:
+            return f"Error: new_order length ({len(new_order)}) doesn't match message count ({count})"
+        if set(new_order) != set(range(count)):
+            return "Error: new_order must contain each message index exactly once"
+        if new_order == list(range(count)):
+            return "No reorder needed"
+
+        command = ReorderMessagesCommand(new_order=list(new_order))
+
+        try:
+            command.execute(self)
+            dialog.history.add_command(command)
+            return f"Reordered {count} messages"
+        except Exception as e:
+            return f"Error: {str(e)}"
+
     # ================== Helper Methods ==================
 
+    def save_dialog(self, dialog_name: Optional[str] = None) -> str:
+        """Write pending in-memory changes of a dialog to disk.
+
+        With a `save_delay`, changes are written shortly after the last
+        modification; this forces the pending write immediately. Pending
+        changes are also flushed by unuse_dialog.
+
+        Args:
+            dialog_name: Dialog to save (uses active if None).
+
+        Returns:
+            Success message.
+        """
+        name = dialog_name or self.active_dialog
+        if not name:
+            return "Error: No dialog specified"
+        if name not in self.dialogs:
+            return f"Error: Dialog '{name}' not found"
+
+        dialog = self.dialogs[name]
+        if not dialog.dirty or not dialog.path:
+            return f"Dialog '{name}' has no unsaved changes"
+
+        self._save_dialog(dialog)
+        return f"Dialog '{name}' saved"
+
+    @contextmanager
+    def batch(self, dialog_name: Optional[str] = None) -> Iterator[DialogInfo]:
+        """Group several changes to a dialog into a single save.
+
+        Changes made inside the block mark the dialog dirty without writing
+        it; when the outermost block exits, last_activity is stamped and the
+        dialog is saved once. Blocks may be nested.
+
+        Args:
+            dialog_name: Dialog to batch (uses active if None).
+
+        Yields:
+            The batched DialogInfo.
+
+        Example:
+            >>> with manager.batch():
+            ...     manager.add_message("a")
+            ...     manager.add_message("b")
+        """
+        name = dialog_name or self.active_dialog
+        if name not in self.dialogs:
+            raise KeyError(f"Dialog '{name}' not found")
+
+        dialog = self.dialogs[name]
+        dialog.batch_depth += 1
+        try:
+            yield dialog
+        finally:
+            dialog.batch_depth -= 1
+            if not dialog.batch_depth and dialog.batch_changed:
+                dialog.batch_changed = False
+                dialog.last_activity = datetime.now()
+                if dialog.dirty and dialog.path:
+                    self._schedule_save(dialog)
+
+    def _mark_dirty(self, dialog: DialogInfo, now: Optional[datetime] = None):
+        """Record an in-memory change and save it, debounced by save_delay.
+
+        Args:
+            dialog: The changed dialog.
+            now: Time of the change, if the caller already read the clock.
+        """
+        dialog.messages_changed()
+        if dialog.path:
+            dialog.dirty = True
+        if dialog.batch_depth:
+            dialog.batch_changed = True
+            return  # stamped and written once when the batch ends
+        dialog.last_activity = now or datetime.now()
+        if dialog.path:
+            self._schedule_save(dialog)
+
+    def _schedule_save(self, dialog: DialogInfo):
+        """Save a dirty dialog now, or after save_delay if one is set."""
+        if self.save_delay <= 0:
+            self._save_dialog(dialog)
+            return
+
+        # Restart the timer so a burst of changes results in a single write
+        if dialog.save_timer is not None:
+            dialog.save_timer.cancel()
+
+        # Under an event loop (the dialoghelper server) the flush runs on the
+        # loop's thread, the same one that mutates the dialog
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            dialog.save_timer = loop.call_later(self.save_delay, self._flush_dialog, dialog)
+        else:
+            dialog.save_timer = threading.Timer(self.save_delay, self._flush_dialog, args=(dialog,))
+            dialog.save_timer.start()
+
+    def _flush_dialog(self, dialog: DialogInfo):
+        """Timer callback: save the dialog if it is still managed and dirty."""
+        if self.dialogs.get(dialog.name) is not dialog or not dialog.dirty:
+            return
+        try:
+            self._save_dialog(dialog)
+        except Exception:
+            # Leave the dialog dirty; the next change, save or unuse retries
+            logger.exception("Failed to save dialog '%s'", dialog.name)
+
+    def _save_dialog(self, dialog: DialogInfo):
+        """Write the dialog to disk now and clear its dirty flag."""
+        with self._save_lock:
+            if dialog.save_timer is not None:
+                dialog.save_timer.cancel()
+                dialog.save_timer = None
+            dialog.dirty = False
+            try:
+                save_dialog_to_file(dialog, dialog.path)
+            except BaseException:
+                dialog.dirty = True
+                raise
+
     def _format_outputs(self, outputs: List) -> List[Union[str, Dict]]:
         """Format execution outputs for display."""
         if not outputs:
@@ -769,17 +1068,13 @@ class DialogManager:
             output_type = output.get('output_type', 'unknown')
 
             if output_type == 'stream':
-                text = ''.join(output.get('text', []))
+                text = _join_text(output.get('text', []))
                 result.append(f"[{output['name']}]\n{text}")
 
             elif output_type in ('execute_result', 'display_data'):
-                data = output.get('data', {})
-                if 'text/plain' in data:
-                    result.append(''.join(data['text/plain']))
-                elif 'text/html' in data:
-                    result.append({'type': 'html', 'content': ''.join(data['text/html'])})
-                elif 'image/png' in data:
-                    result.append({'type': 'image', 'format': 'png', 'data': ''.join(data['image/png'])})
+                formatted = _format_mime_data(output.get('data', {}))
+                if formatted is not None:
+                    result.append(formatted)
 
             elif output_type == 'error':
                 traceback = ''.join(output.get('traceback', []))
@@ -804,8 +1099,8 @@ class DialogManager:
             return f"Error: Dialog '{name}' not found"
 
         dialog = self.dialogs[name]
+        # A kernel that was never started is already fresh
         if dialog.shell:
             dialog.shell.restart_kernel()
-            dialog.last_activity = datetime.now()
-            return f"Kernel restarted for '{name}'"
-        return f"Error: No kernel for '{name}'"
+        dialog.last_activity = datetime.now()
+        return f"Kernel restarted for '{name}'"
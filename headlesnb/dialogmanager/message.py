@@ -9,10 +9,16 @@ Example:
     '_a1b2c3d4'  # Auto-generated
 """
 
+import json
 import secrets
 from dataclasses import dataclass, field
 from typing import Optional
 
+try:
+    import orjson
+except ImportError:  # optional, see the "fast" extra
+    orjson = None
+
 
 def generate_msg_id() -> str:
     """Generate a unique message ID.
@@ -96,6 +102,46 @@ class Message:
             'use_thinking': self.use_thinking
         }
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        # Any field change invalidates the cached encodings (see to_json
+        # and serialization._cell_json); the revision tells an encoder that
+        # raced with this change not to cache what it built
+        d = self.__dict__
+        d['_rev'] = d.get('_rev', 0) + 1
+        d.pop('_json', None)
+        d.pop('_cell_json', None)
+
+    def to_json(self) -> bytes:
+        """Return to_dict() encoded as compact UTF-8 JSON.
+
+        The encoding is cached until a field is assigned, so serving an
+        unchanged dialog repeatedly does not re-encode its messages.
+        """
+        d = self.__dict__
+        data = d.get('_json')
+        if data is None:
+            rev = d.get('_rev')
+            if orjson is not None:
+                data = orjson.dumps(self.to_dict())
+            else:
+                data = json.dumps(self.to_dict(), ensure_ascii=False,
+                                  separators=(',', ':')).encode('utf-8')
+            if d.get('_rev') == rev:
+                d['_json'] = data
+        return data
+
+    def clone(self) -> 'Message':
+        """Return an independent copy of this message, including its id.
+
+        Every field holds an immutable value (str, int, bool or None), so
+        copying the instance dict is a full copy, without deepcopy's
+        per-object traversal.
+        """
+        msg = object.__new__(type(self))
+        msg.__dict__.update(self.__dict__)
+        return msg
+
     @classmethod
     def from_dict(cls, data: dict) -> 'Message':
         """Create message from dictionary.
@@ -16,8 +16,10 @@ Example:
 """
 
 import json
+import os
 import re
 import secrets
+import shutil
 from typing import Optional, Dict, Any, List
 from pathlib import Path
 
@@ -250,8 +252,11 @@ def dialog_to_notebook(dialog: DialogInfo) -> dict:
         >>> nb['metadata']['solveit_dialog_mode']
         'learning'
     """
-    cells = [message_to_cell(msg) for msg in dialog.messages]
+    return _notebook_dict(dialog, [message_to_cell(msg) for msg in dialog.messages])
 
+
+def _notebook_dict(dialog: DialogInfo, cells: list) -> dict:
+    """Notebook dictionary for a dialog with the given cells."""
     return {
         'nbformat': 4,
         'nbformat_minor': 5,
@@ -331,16 +336,71 @@ def _source_list_to_text(source: list) -> str:
     return ''.join(source)
 
 
+def _cell_json(msg: Message) -> str:
+    """JSON for message_to_cell(msg), indented to sit in a notebook's cell list.
+
+    Cached on the message until one of its fields is assigned, so a save
+    only re-encodes the messages that changed (and prompt separators stay
+    stable between saves). If a field is assigned while encoding, the
+    result is returned but not cached.
+    """
+    d = msg.__dict__
+    text = d.get('_cell_json')
+    if text is None:
+        rev = d.get('_rev')
+        text = json.dumps(message_to_cell(msg), indent=1, ensure_ascii=False)
+        # Cells are nested two levels deep in the notebook
+        text = text.replace('\n', '\n  ')
+        if d.get('_rev') == rev:
+            d['_cell_json'] = text
+    return text
+
+
 def save_dialog_to_file(dialog: DialogInfo, path: Path) -> None:
     """Save a dialog to an .ipynb file.
 
+    The file is written to a temp file and moved into place with
+    os.replace, so readers never see a partial file. If the serialized
+    dialog is identical to the last write and the file is untouched since,
+    nothing is written.
+
     Args:
         dialog: The DialogInfo to save.
         path: Path to save to.
     """
-    nb_dict = dialog_to_notebook(dialog)
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(nb_dict, f, indent=1, ensure_ascii=False)
+    # Same text as json.dumps(dialog_to_notebook(dialog), indent=1), with
+    # each cell taken from its message's cached encoding
+    text = json.dumps(_notebook_dict(dialog, []), indent=1, ensure_ascii=False)
+    if dialog.messages:
+        # 'cells' is the last key, so the text ends with '"cells": []\n}'
+        cells = ',\n  '.join([_cell_json(msg) for msg in dialog.messages])
+        text = text[:-len('[]\n}')] + '[\n  ' + cells + '\n ]\n}'
+    data = text.encode('utf-8')
+    digest = hash(data)
+
+    saved = dialog._saved_state
+    if saved is not None and saved[:2] == (path, digest):
+        try:
+            st = os.stat(path)
+        except OSError:
+            pass
+        else:
+            if (st.st_mtime_ns, st.st_size) == saved[2:]:
+                return
+
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        if path.exists():
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    st = os.stat(path)
+    dialog._saved_state = (path, digest, st.st_mtime_ns, st.st_size)
 
 
 def load_dialog_from_file(path: Path, name: str) -> DialogInfo:
@@ -22,7 +22,7 @@ Key Design Decisions:
 
 3. **What Gets Tracked**: Only operations that modify the notebook structure or
    content are tracked:
-   - insert_cell, delete_cell, overwrite_cell_source
+   - insert_cell, insert_cells, delete_cell, overwrite_cell_source
    - move_cell, swap_cells, reorder_cells
 
    Operations that don't modify the notebook (execute_cell, read operations) are
@@ -34,17 +34,20 @@ Key Design Decisions:
 4. **State Preservation**: Each command stores the minimum information needed to
    undo the operation:
    - insert_cell: stores the inserted cell and index
-   - delete_cell: stores the deleted cells with their original indices
+   - delete_cell: stores references to the removed cells with their original
+     indices (the cells are no longer in the notebook, so no copy is made)
    - overwrite_cell_source: stores the old and new source
    - move_cell/swap_cells/reorder_cells: stores the transformation that occurred
 
 5. **Index Handling**: Special care is taken with indices:
-   - delete_cell operations store cells in descending index order to avoid
-     index shifting issues during redo
-   - reorder_cells stores the complete old order for accurate undo
+   - delete_cell operations store cells in descending index order; both
+     delete and undo rebuild the cell list in a single pass
+   - reorder_cells stores the inverse permutation so undo is a single O(n) pass
 
-6. **Memory Management**: History has a configurable maximum size (default: 100)
-   to prevent unbounded memory growth.
+6. **Memory Management**: History has a configurable maximum size (default:
+   DEFAULT_HISTORY_SIZE = 100, overridable per manager via HISTORY_MAX_SIZE) to
+   prevent unbounded memory growth. Both stacks are deques with maxlen, so
+   dropping the oldest operation is O(1).
 
 7. **Atomicity**: Operations are atomic - if an undo/redo fails, the notebook
    remains in a consistent state.
@@ -62,11 +65,23 @@ but the history stack itself is not separately locked. It's designed to be used
 only through the NotebookManager's synchronized methods.
 """
 
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Tuple, Union
+from collections import deque
+from itertools import islice
 from dataclasses import dataclass, field
 from datetime import datetime
 from copy import deepcopy
 
+DEFAULT_HISTORY_SIZE = 100
+
+
+def _reindex_cells(cells, start: int = 0, stop: Optional[int] = None):
+    """Refresh the `idx_` attribute of `cells[start:stop]` to match positions."""
+    if stop is None:
+        stop = len(cells)
+    for i in range(start, min(stop, len(cells))):
+        cells[i].idx_ = i
+
 
 class HistoryCommand:
     """
@@ -75,6 +90,9 @@ class HistoryCommand:
     Each command represents a single operation that can be undone and redone.
     Commands store the minimal information needed to reverse their effects.
     """
+    # Lets subclasses declared with @dataclass(slots=True) drop their __dict__
+    __slots__ = ('timestamp',)
+
     def __init__(self):
         self.timestamp = datetime.now()
 
@@ -124,10 +142,8 @@ class InsertCellCommand(HistoryCommand):
         for i, cell in enumerate(nb.cells):
             cell.idx_ = i
 
-        # Save notebook
-        from execnb.nbio import write_nb
-        write_nb(nb, nb_info.path)
-        nb_info.last_activity = datetime.now()
+        # Save notebook (debounced)
+        manager._mark_dirty(nb_info)
 
         # Update stored index if it was -1
         self.cell_index = actual_index
@@ -146,10 +162,8 @@ class InsertCellCommand(HistoryCommand):
         for i, cell in enumerate(nb.cells):
             cell.idx_ = i
 
-        # Save notebook
-        from execnb.nbio import write_nb
-        write_nb(nb, nb_info.path)
-        nb_info.last_activity = datetime.now()
+        # Save notebook (debounced)
+        manager._mark_dirty(nb_info)
 
         return f"Undid insert of {self.cell_type} cell at index {self.cell_index}"
 
@@ -157,6 +171,55 @@ class InsertCellCommand(HistoryCommand):
         return f"Insert {self.cell_type} cell at [{self.cell_index}]"
 
 
+@dataclass
+class InsertCellsCommand(HistoryCommand):
+    """Command for inserting several consecutive cells as one operation."""
+    cell_index: int
+    cells: List[Tuple[str, str]]  # (cell_type, cell_source) pairs
+
+    def __post_init__(self):
+        super().__init__()
+
+    def execute(self, manager) -> str:
+        from execnb.nbio import mk_cell
+
+        nb_info = manager.notebooks[manager.active_notebook]
+        nb = nb_info.notebook
+
+        # Handle append case
+        actual_index = len(nb.cells) if self.cell_index == -1 else self.cell_index
+
+        # Splice all new cells in at once
+        nb.cells[actual_index:actual_index] = [
+            mk_cell(source, cell_type=cell_type) for cell_type, source in self.cells
+        ]
+        _reindex_cells(nb.cells, actual_index)
+
+        # Save notebook (debounced)
+        manager._mark_dirty(nb_info)
+
+        # Update stored index if it was -1
+        self.cell_index = actual_index
+
+        return f"Inserted {len(self.cells)} cell(s) at index {actual_index}"
+
+    def undo(self, manager) -> str:
+        nb_info = manager.notebooks[manager.active_notebook]
+        nb = nb_info.notebook
+
+        # Remove the inserted block
+        del nb.cells[self.cell_index:self.cell_index + len(self.cells)]
+        _reindex_cells(nb.cells, self.cell_index)
+
+        # Save notebook (debounced)
+        manager._mark_dirty(nb_info)
+
+        return f"Undid insert of {len(self.cells)} cell(s) at index {self.cell_index}"
+
+    def description(self) -> str:
+        return f"Insert {len(self.cells)} cell(s) at [{self.cell_index}]"
+
+
 @dataclass
 class DeleteCellCommand(HistoryCommand):
     """Command for deleting cells."""
@@ -167,57 +230,51 @@ class DeleteCellCommand(HistoryCommand):
         super().__init__()
 
     def execute(self, manager) -> str:
-        from execnb.nbio import write_nb, nb2dict
-
         nb_info = manager.notebooks[manager.active_notebook]
         nb = nb_info.notebook
 
         # Sort indices in descending order
-        sorted_indices = sorted(set(self.cell_indices), reverse=True)
-
-        # Store cells before deletion
-        self.deleted_cells = []
+        sorted_indices = sorted(
+            {i for i in self.cell_indices if 0 <= i < len(nb.cells)}, reverse=True
+        )
+
+        # Keep a reference to each removed cell with its original index.
+        # The cell object is no longer in the notebook, so no copy is needed.
+        self.deleted_cells = [
+            {'index': idx, 'cell': nb.cells[idx]} for idx in sorted_indices
+        ]
+
+        # Drop all deleted cells in one pass instead of shifting per pop
+        keep = [True] * len(nb.cells)
         for idx in sorted_indices:
-            if idx < len(nb.cells):
-                # Store cell as dict with its original index
-                cell_dict = nb2dict(nb.cells[idx])
-                self.deleted_cells.append({
-                    'index': idx,
-                    'cell': cell_dict
-                })
-                del nb.cells[idx]
+            keep[idx] = False
+        nb.cells = [cell for cell, k in zip(nb.cells, keep) if k]
 
-        # Reindex cells
-        for i, cell in enumerate(nb.cells):
-            cell.idx_ = i
+        if self.deleted_cells:
+            _reindex_cells(nb.cells, self.deleted_cells[-1]['index'])
 
-        # Save notebook
-        write_nb(nb, nb_info.path)
-        nb_info.last_activity = datetime.now()
+        # Save notebook (debounced)
+        manager._mark_dirty(nb_info)
 
         return f"Deleted {len(self.deleted_cells)} cell(s)"
 
     def undo(self, manager) -> str:
-        from execnb.nbio import write_nb, NbCell
-
         nb_info = manager.notebooks[manager.active_notebook]
         nb = nb_info.notebook
 
-        # Re-insert cells in reverse order (ascending indices)
-        for item in reversed(self.deleted_cells):
-            idx = item['index']
-            cell_dict = item['cell']
-            # Recreate cell object
-            cell = NbCell(idx, cell_dict)
-            nb.cells.insert(idx, cell)
+        # Merge the deleted cells back at their original indices in one pass
+        restored = {item['index']: item['cell'] for item in self.deleted_cells}
+        remaining = iter(nb.cells)
+        nb.cells = [
+            restored[i] if i in restored else next(remaining)
+            for i in range(len(nb.cells) + len(restored))
+        ]
 
-        # Reindex cells
-        for i, cell in enumerate(nb.cells):
-            cell.idx_ = i
+        if self.deleted_cells:
+            _reindex_cells(nb.cells, self.deleted_cells[-1]['index'])
 
-        # Save notebook
-        write_nb(nb, nb_info.path)
-        nb_info.last_activity = datetime.now()
+        # Save notebook (debounced)
+        manager._mark_dirty(nb_info)
 
         return f"Restored {len(self.deleted_cells)} deleted cell(s)"
 
@@ -236,8 +293,6 @@ class OverwriteCellCommand(HistoryCommand):
         super().__init__()
 
     def execute(self, manager) -> str:
-        from execnb.nbio import write_nb
-
         nb_info = manager.notebooks[manager.active_notebook]
         nb = nb_info.notebook
 
@@ -248,24 +303,20 @@ class OverwriteCellCommand(HistoryCommand):
         # Update cell source
         nb.cells[self.cell_index].set_source(self.new_source)
 
-        # Save notebook
-        write_nb(nb, nb_info.path)
-        nb_info.last_activity = datetime.now()
+        # Save notebook (debounced)
+        manager._mark_dirty(nb_info)
 
         return f"Overwrote cell [{self.cell_index}] source"
 
     def undo(self, manager) -> str:
-        from execnb.nbio import write_nb
-
         nb_info = manager.notebooks[manager.active_notebook]
         nb = nb_info.notebook
 
         # Restore old source
         nb.cells[self.cell_index].set_source(self.old_source)
 
-        # Save notebook
-        write_nb(nb, nb_info.path)
-        nb_info.last_activity = datetime.now()
+        # Save notebook (debounced)
+        manager._mark_dirty(nb_info)
 
         return f"Restored cell [{self.cell_index}] to previous source"
 
@@ -283,44 +334,31 @@ class MoveCellCommand(HistoryCommand):
         super().__init__()
 
     def execute(self, manager) -> str:
-        from execnb.nbio import write_nb
-
         nb_info = manager.notebooks[manager.active_notebook]
         nb = nb_info.notebook
 
-        # Remove cell from original position
-        cell = nb.cells.pop(self.from_index)
+        # Remove cell from original position and insert at new position
+        nb.cells.insert(self.to_index, nb.cells.pop(self.from_index))
 
-        # Insert at new position
-        nb.cells.insert(self.to_index, cell)
+        # Only cells between the two positions shifted
+        _reindex_cells(nb.cells, min(self.from_index, self.to_index),
+                       max(self.from_index, self.to_index) + 1)
 
-        # Reindex cells
-        for i, c in enumerate(nb.cells):
-            c.idx_ = i
-
-        # Save notebook
-        write_nb(nb, nb_info.path)
-        nb_info.last_activity = datetime.now()
+        manager._mark_dirty(nb_info, save=False)
 
         return f"Moved cell from [{self.from_index}] to [{self.to_index}]"
 
     def undo(self, manager) -> str:
-        from execnb.nbio import write_nb
-
         nb_info = manager.notebooks[manager.active_notebook]
         nb = nb_info.notebook
 
         # Move cell back
-        cell = nb.cells.pop(self.to_index)
-        nb.cells.insert(self.from_index, cell)
+        nb.cells.insert(self.from_index, nb.cells.pop(self.to_index))
 
-        # Reindex cells
-        for i, c in enumerate(nb.cells):
-            c.idx_ = i
+        _reindex_cells(nb.cells, min(self.from_index, self.to_index),
+                       max(self.from_index, self.to_index) + 1)
 
-        # Save notebook
-        write_nb(nb, nb_info.path)
-        nb_info.last_activity = datetime.now()
+        manager._mark_dirty(nb_info, save=False)
 
         return f"Moved cell back from [{self.to_index}] to [{self.from_index}]"
 
@@ -338,21 +376,17 @@ class SwapCellsCommand(HistoryCommand):
         super().__init__()
 
     def execute(self, manager) -> str:
-        from execnb.nbio import write_nb
-
         nb_info = manager.notebooks[manager.active_notebook]
         nb = nb_info.notebook
 
         # Swap cells
         nb.cells[self.index1], nb.cells[self.index2] = nb.cells[self.index2], nb.cells[self.index1]
 
-        # Reindex cells
-        for i, c in enumerate(nb.cells):
-            c.idx_ = i
+        # Only the two swapped cells changed position
+        nb.cells[self.index1].idx_ = self.index1
+        nb.cells[self.index2].idx_ = self.index2
 
-        # Save notebook
-        write_nb(nb, nb_info.path)
-        nb_info.last_activity = datetime.now()
+        manager._mark_dirty(nb_info, save=False)
 
         return f"Swapped cells [{self.index1}] and [{self.index2}]"
 
@@ -367,53 +401,41 @@ class SwapCellsCommand(HistoryCommand):
 @dataclass
 class ReorderCellsCommand(HistoryCommand):
     """Command for reordering cells."""
-    old_order: List[int] = field(default_factory=list)
     new_order: List[int] = field(default_factory=list)
+    inverse_order: List[int] = field(default_factory=list)
 
     def __post_init__(self):
         super().__init__()
 
     def execute(self, manager) -> str:
-        from execnb.nbio import write_nb
-
         nb_info = manager.notebooks[manager.active_notebook]
         nb = nb_info.notebook
 
-        # Store old order if not set
-        if not self.old_order:
-            self.old_order = list(range(len(nb.cells)))
+        # Inverse permutation: the cell now at position i came from new_order[i]
+        if not self.inverse_order:
+            self.inverse_order = [0] * len(self.new_order)
+            for new_pos, old_pos in enumerate(self.new_order):
+                self.inverse_order[old_pos] = new_pos
 
-        # Create new cell list in specified order
-        old_cells = nb.cells.copy()
-        nb.cells = [old_cells[i] for i in self.new_order]
-
-        # Reindex cells
-        for i, c in enumerate(nb.cells):
-            c.idx_ = i
+        # Permute cell references in a single pass (no cell copies)
+        cells = nb.cells
+        nb.cells = [cells[i] for i in self.new_order]
+        _reindex_cells(nb.cells)
 
-        # Save notebook
-        write_nb(nb, nb_info.path)
-        nb_info.last_activity = datetime.now()
+        manager._mark_dirty(nb_info, save=False)
 
         return f"Reordered {len(nb.cells)} cells"
 
     def undo(self, manager) -> str:
-        from execnb.nbio import write_nb
-
         nb_info = manager.notebooks[manager.active_notebook]
         nb = nb_info.notebook
 
         # Restore old order
-        old_cells = nb.cells.copy()
-        nb.cells = [old_cells[self.new_order.index(i)] for i in self.old_order]
-
-        # Reindex cells
-        for i, c in enumerate(nb.cells):
-            c.idx_ = i
+        cells = nb.cells
+        nb.cells = [cells[i] for i in self.inverse_order]
+        _reindex_cells(nb.cells)
 
-        # Save notebook
-        write_nb(nb, nb_info.path)
-        nb_info.last_activity = datetime.now()
+        manager._mark_dirty(nb_info, save=False)
 
         return f"Restored previous cell order"
 
@@ -421,6 +443,15 @@ class ReorderCellsCommand(HistoryCommand):
         return f"Reorder cells: {self.new_order}"
 
 
+class HistorySummary(NamedTuple):
+    """Snapshot of an OperationHistory, as returned by get_history_summary()."""
+    undo_count: int
+    redo_count: int
+    can_undo: bool
+    can_redo: bool
+    recent_operations: List[str]  # descriptions of the last 10 operations, oldest first
+
+
 class OperationHistory:
     """
     Manages the history of operations for undo/redo functionality.
@@ -433,7 +464,7 @@ class OperationHistory:
     is cleared (standard undo/redo behavior).
     """
 
-    def __init__(self, max_size: int = 100):
+    def __init__(self, max_size: int = DEFAULT_HISTORY_SIZE):
         """
         Initialize the operation history.
 
@@ -442,23 +473,29 @@ class OperationHistory:
                      Older operations are discarded when limit is reached.
         """
         self.max_size = max_size
-        self.undo_stack: List[HistoryCommand] = []
-        self.redo_stack: List[HistoryCommand] = []
+        # deques with maxlen drop the oldest entry in O(1) when full
+        self.undo_stack: Deque[HistoryCommand] = deque(maxlen=max_size)
+        self.redo_stack: Deque[HistoryCommand] = deque(maxlen=max_size)
+
+    def set_max_size(self, max_size: int):
+        """Change the history limit, keeping the most recent operations."""
+        if max_size == self.max_size:
+            return
+        self.max_size = max_size
+        self.undo_stack = deque(self.undo_stack, maxlen=max_size)
+        self.redo_stack = deque(self.redo_stack, maxlen=max_size)
 
     def add_command(self, command: HistoryCommand):
         """
         Add a command to the history.
 
         This should be called after a command is successfully executed.
-        Clears the redo stack (standard undo/redo behavior).
+        Clears the redo stack (standard undo/redo behavior). Once max_size
+        is reached the oldest operation is discarded.
         """
         self.undo_stack.append(command)
         self.redo_stack.clear()  # Clear redo stack on new operation
 
-        # Limit history size
-        if len(self.undo_stack) > self.max_size:
-            self.undo_stack.pop(0)
-
     def can_undo(self) -> bool:
         """Check if there are operations that can be undone."""
         return len(self.undo_stack) > 0
@@ -544,19 +581,21 @@ class OperationHistory:
         self.undo_stack.clear()
         self.redo_stack.clear()
 
-    def get_history_summary(self) -> Dict[str, Any]:
+    def get_history_summary(self) -> HistorySummary:
         """
         Get a summary of the current history state.
 
-        Returns a dictionary with:
-        - undo_count: Number of operations that can be undone
-        - redo_count: Number of operations that can be redone
-        - recent_operations: List of recent operation descriptions
+        Returns a HistorySummary with the undo/redo counts, whether each is
+        possible, and the descriptions of up to 10 recent operations. Use
+        ``_asdict()`` if a dict is needed.
         """
-        return {
-            'undo_count': len(self.undo_stack),
-            'redo_count': len(self.redo_stack),
-            'can_undo': self.can_undo(),
-            'can_redo': self.can_redo(),
-            'recent_operations': [cmd.description() for cmd in self.undo_stack[-10:]]
-        }
+        return HistorySummary(
+            undo_count=len(self.undo_stack),
+            redo_count=len(self.redo_stack),
+            can_undo=self.can_undo(),
+            can_redo=self.can_redo(),
+            recent_operations=[
+                cmd.description()
+                for cmd in islice(self.undo_stack, max(len(self.undo_stack) - 10, 0), None)
+            ]
+        )
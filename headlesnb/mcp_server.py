@@ -13,7 +13,7 @@ except ImportError:
     print("MCP library not installed. Install with: pip install mcp")
     raise
 
-from .manager import NotebookManager
+from .nb_manager import NotebookManager
 from .tools import get_all_tool_schemas
 
 # Configure logging
@@ -97,6 +97,12 @@ class HeadlesNBMCPServer:
                     )
                     return [TextContent(type="text", text=result)]
 
+                elif name == "save_notebook":
+                    result = self.manager.save_notebook(
+                        notebook_name=arguments.get("notebook_name")
+                    )
+                    return [TextContent(type="text", text=result)]
+
                 elif name == "read_notebook":
                     result = self.manager.read_notebook(
                         notebook_name=arguments["notebook_name"],
@@ -115,6 +121,13 @@ class HeadlesNBMCPServer:
                     )
                     return [TextContent(type="text", text=result)]
 
+                elif name == "insert_cells":
+                    result = self.manager.insert_cells(
+                        cell_index=arguments["cell_index"],
+                        cells=[(c["cell_type"], c["cell_source"]) for c in arguments["cells"]]
+                    )
+                    return [TextContent(type="text", text=result)]
+
                 elif name == "overwrite_cell_source":
                     result = self.manager.overwrite_cell_source(
                         cell_index=arguments["cell_index"],
@@ -127,7 +140,15 @@ class HeadlesNBMCPServer:
                         cell_index=arguments["cell_index"],
                         timeout=arguments.get("timeout", 90),
                         stream=arguments.get("stream", False),
-                        progress_interval=arguments.get("progress_interval", 5)
+                        progress_interval=arguments.get("progress_interval", 5),
+                        use_cache=arguments.get("use_cache", False)
+                    )
+                    return self._format_tool_outputs(outputs)
+
+                elif name == "execute_cells":
+                    outputs = self.manager.execute_cells(
+                        cell_indices=arguments["cell_indices"],
+                        timeout=arguments.get("timeout", 90)
                     )
                     return self._format_tool_outputs(outputs)
 
@@ -230,7 +251,12 @@ class HeadlesNBMCPServer:
             if isinstance(output, str):
                 result.append(TextContent(type="text", text=output))
             elif isinstance(output, dict):
-                if output.get('type') == 'image':
+                if output.get('type') == 'image' and output.get('truncated'):
+                    result.append(TextContent(
+                        type="text",
+                        text=f"[image/{output['format']} output of {output['size']} bytes omitted]"
+                    ))
+                elif output.get('type') == 'image':
                     result.append(ImageContent(
                         type="image",
                         data=output['data'],
@@ -1,20 +1,49 @@
 """Notebook Manager for managing multiple notebooks and their execution state"""
 
 import os
+import stat
+import json
 import time
+import hashlib
 import difflib
+import shutil
+import logging
+import tempfile
+import weakref
+import importlib
 import threading
+from types import ModuleType
+from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, List, Optional, Union, Any, Tuple
 from datetime import datetime
 from dataclasses import dataclass, field
 
 from execnb.shell import CaptureShell
-from execnb.nbio import read_nb, write_nb, new_nb, mk_cell, NbCell
-
+from execnb.nbio import read_nb, new_nb, mk_cell, NbCell, nb2dict
+
+logger = logging.getLogger(__name__)
+
+try:
+    import dill as _pickle  # handles lambdas, closures and interactively defined classes
+except ImportError:
+    import pickle as _pickle
+
+from .base import (
+    _FileEntry,
+    _ListingCache,
+    _format_mime_data,
+    _format_mtime,
+    _format_size,
+    _join_text,
+    _sorted_page,
+    _stat_page
+)
 from .history import (
+    DEFAULT_HISTORY_SIZE,
     OperationHistory,
     InsertCellCommand,
+    InsertCellsCommand,
     DeleteCellCommand,
     OverwriteCellCommand,
     MoveCellCommand,
@@ -23,6 +52,25 @@ from .history import (
 )
 
 
+def _dump_notebook(nb) -> bytes:
+    """Serialize a notebook to .ipynb JSON in execnb's write_nb layout (indent=1, sorted keys)."""
+    return (json.dumps(nb2dict(nb), sort_keys=True, indent=1, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _write_notebook_atomic(nb, path: Path):
+    """Write a notebook via a temp file and os.replace so readers never see a partial file."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_dump_notebook(nb))
+        if path.exists():
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
 @dataclass
 class NotebookInfo:
     """Information about a managed notebook"""
@@ -31,26 +79,145 @@ class NotebookInfo:
     shell: CaptureShell
     notebook: Any  # The notebook object
     kernel_id: str
-    history: OperationHistory = field(default_factory=lambda: OperationHistory(max_size=100))
+    history: OperationHistory = field(default_factory=OperationHistory)
     created_at: datetime = field(default_factory=datetime.now)
     last_activity: datetime = field(default_factory=datetime.now)
     is_active: bool = False
+    dirty: bool = False  # In-memory changes not yet written to disk
+    version: int = 0  # Bumped on every change to cells or outputs
+    read_cache: Dict[tuple, str] = field(default_factory=dict)  # Rendered read_notebook output
+    save_timer: Optional[threading.Timer] = None  # Pending debounced save
+    exec_chain: str = ""  # Running hash of all code run in this kernel session
+    exec_cache: Dict[str, List] = field(default_factory=dict)  # Outputs keyed by _exec_cache_key
+
+
+class _KernelPool:
+    """
+    LRU set of notebooks whose kernel namespace is kept in memory.
+
+    When more than `max_live` notebooks have been activated, the least
+    recently used one is evicted: the user variables of its shell are
+    pickled to a swap file and the shell is reset. Activating the notebook
+    again loads them back. Modules are stored by name and re-imported.
+    Values that cannot be pickled are dropped with a warning, so eviction
+    is best-effort; install `dill` to cover more object types.
+    """
+
+    def __init__(self, max_live: Optional[int] = None):
+        self.max_live = max_live
+        self.live: "OrderedDict[str, NotebookInfo]" = OrderedDict()
+        self._swap_dir: Optional[Path] = None
+
+    def is_live(self, notebook_name: str) -> bool:
+        return self.max_live is None or notebook_name in self.live
+
+    def activate(self, nb_info: "NotebookInfo"):
+        """Mark a notebook as most recently used, restoring it if evicted."""
+        if nb_info.name in self.live:
+            self.live.move_to_end(nb_info.name)
+            return
+
+        self._restore(nb_info)
+        self.live[nb_info.name] = nb_info
+
+        while self.max_live is not None and len(self.live) > self.max_live:
+            _, lru = self.live.popitem(last=False)
+            self._evict(lru)
+
+    def discard(self, nb_info: "NotebookInfo"):
+        """Forget a notebook and its swapped namespace (on unuse or restart)."""
+        self.live.pop(nb_info.name, None)
+        if self._swap_dir is not None:
+            self._swap_path(nb_info).unlink(missing_ok=True)
+
+    def _swap_path(self, nb_info: "NotebookInfo") -> Path:
+        if self._swap_dir is None:
+            self._swap_dir = Path(tempfile.mkdtemp(prefix="headlesnb-kernels-"))
+            weakref.finalize(self, shutil.rmtree, self._swap_dir, ignore_errors=True)
+        return self._swap_dir / f"{nb_info.kernel_id}.ns.pkl"
+
+    def _evict(self, nb_info: "NotebookInfo"):
+        shell = nb_info.shell
+        hidden = getattr(shell, 'user_ns_hidden', {})
+        state, skipped = {}, []
+
+        for key, value in shell.user_ns.items():
+            if key.startswith('_') or key in hidden:
+                continue
+            if isinstance(value, ModuleType):
+                state[key] = ('module', value.__name__)
+                continue
+            try:
+                state[key] = ('value', _pickle.dumps(value))
+            except Exception:
+                skipped.append(key)
+
+        with open(self._swap_path(nb_info), 'wb') as f:
+            _pickle.dump({'execution_count': shell.execution_count, 'ns': state}, f)
+
+        if skipped:
+            logger.warning(
+                "Notebook '%s' kernel evicted; unpicklable variables dropped: %s",
+                nb_info.name, ", ".join(skipped)
+            )
+
+        shell.restart_kernel()
+        nb_info.exec_cache.clear()
+
+    def _restore(self, nb_info: "NotebookInfo"):
+        if self._swap_dir is None:
+            return
+        path = self._swap_path(nb_info)
+        if not path.exists():
+            return
+
+        with open(path, 'rb') as f:
+            saved = _pickle.load(f)
+        path.unlink()
+
+        shell = nb_info.shell
+        for key, (kind, payload) in saved['ns'].items():
+            try:
+                if kind == 'module':
+                    shell.user_ns[key] = importlib.import_module(payload)
+                else:
+                    shell.user_ns[key] = _pickle.loads(payload)
+            except Exception as e:
+                logger.warning("Notebook '%s': could not restore '%s': %s", nb_info.name, key, e)
+        shell.execution_count = saved['execution_count']
 
 
 class NotebookManager:
     """Manager for multiple notebooks with execnb backend"""
 
-    def __init__(self, root_path: str = "."):
+    HISTORY_MAX_SIZE: int = DEFAULT_HISTORY_SIZE  # undo steps kept per notebook
+
+    def __init__(
+        self,
+        root_path: str = ".",
+        save_delay: float = 0,
+        max_live_kernels: Optional[int] = None
+    ):
         """
         Initialize the NotebookManager
 
         Args:
             root_path: Root path for file operations
+            save_delay: Seconds to wait after the last change before writing a
+                notebook to disk, so a burst of changes is saved once; 0 (the
+                default) writes synchronously on every change
+            max_live_kernels: Maximum number of notebooks whose kernel namespace
+                stays in memory; the least recently activated ones are swapped
+                to disk and restored on activation (default: no limit)
         """
         self.root_path = Path(root_path).resolve()
         self.notebooks: Dict[str, NotebookInfo] = {}
         self.active_notebook: Optional[str] = None
+        self.save_delay = save_delay
+        self._kernels = _KernelPool(max_live=max_live_kernels)
+        self._list_cache = _ListingCache()
         self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
 
     # ================== Server Management Tools ==================
 
@@ -78,74 +245,42 @@ class NotebookManager:
         max_depth = min(max_depth, 3)
         start_path = self.root_path / path if path else self.root_path
 
-        if not start_path.exists():
+        # Breadth-first os.scandir walk filtered by pattern, reused from the
+        # listing cache while none of the scanned directories has changed.
+        # Only entries on the requested page are stat'ed.
+        matches = self._list_cache.scan(self.root_path, start_path, max_depth, pattern)
+        # The walk (or the cache check) already stats start_path, so existence
+        # is only checked separately when nothing was found
+        if not matches and not start_path.exists():
             return f"Error: Path '{path}' does not exist"
 
-        files = []
+        # Apply pagination; only the requested page is sorted out of the matches
+        total_count = len(matches)
+        end_index = start_index + limit if limit > 0 else total_count
 
-        def _scan_dir(current_path: Path, current_depth: int):
-            if current_depth > max_depth:
-                return
+        page = _sorted_page(matches, start_index, end_index)
+        paginated_files = []
+        for (rel_path, _), st in zip(page, _stat_page(page)):
+            if st is None:
+                paginated_files.append(_FileEntry(rel_path, "error", "", ""))
+                continue
 
-            try:
-                for item in current_path.iterdir():
-                    rel_path = item.relative_to(self.root_path)
-
-                    # Apply pattern filter if provided
-                    if pattern and not item.match(pattern):
-                        continue
-
-                    try:
-                        stat = item.stat()
-                        if item.is_file():
-                            file_type = "notebook" if item.suffix == ".ipynb" else "file"
-                            size = stat.st_size
-                            size_str = self._format_size(size)
-                        else:
-                            file_type = "directory"
-                            size_str = ""
-
-                        modified = datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
-
-                        files.append({
-                            "path": str(rel_path),
-                            "type": file_type,
-                            "size": size_str,
-                            "modified": modified
-                        })
-
-                        # Recurse into directories
-                        if item.is_dir():
-                            _scan_dir(item, current_depth + 1)
-
-                    except (PermissionError, OSError):
-                        files.append({
-                            "path": str(rel_path),
-                            "type": "error",
-                            "size": "",
-                            "modified": ""
-                        })
-            except (PermissionError, OSError):
-                pass
-
-        _scan_dir(start_path, 0)
-
-        # Sort by path
-        files.sort(key=lambda x: x["path"])
-
-        # Apply pagination
-        total_count = len(files)
-        end_index = start_index + limit if limit > 0 else total_count
-        paginated_files = files[start_index:end_index]
+            if stat.S_ISREG(st.st_mode):
+                file_type = "notebook" if rel_path.endswith(".ipynb") else "file"
+                size_str = self._format_size(st.st_size)
+            else:
+                file_type = "directory"
+                size_str = ""
+
+            modified = _format_mtime(int(st.st_mtime))
+
+            paginated_files.append(_FileEntry(rel_path, file_type, size_str, modified))
 
         # Format as TSV
         header = f"Showing {start_index + 1}-{min(end_index, total_count)} of {total_count} items\n"
         header += "Path\tType\tSize\tLast_Modified"
 
-        rows = [
-            f"{f['path']}\t{f['type']}\t{f['size']}\t{f['modified']}"
-            for f in paginated_files
-        ]
+        rows = ["\t".join(f) for f in paginated_files]
 
         return header + "\n" + "\n".join(rows)
 
@@ -166,6 +301,8 @@ class NotebookManager:
         for nb_info in self.notebooks.values():
             # Determine state based on shell activity
             state = "idle"  # execnb shells are typically idle unless actively executing
+            if not self._kernels.is_live(nb_info.name):
+                state = "evicted"  # namespace swapped to disk until reactivated
 
             last_activity = nb_info.last_activity.strftime("%Y-%m-%d %H:%M:%S")
 
@@ -215,7 +352,7 @@ class NotebookManager:
                 if full_path.exists():
                     return f"Error: Notebook '{notebook_path}' already exists. Use 'connect' mode instead."
                 nb = new_nb()
-                write_nb(nb, full_path)
+                _write_notebook_atomic(nb, full_path)
             elif mode == "connect":
                 if not full_path.exists():
                     return f"Error: Notebook '{notebook_path}' not found. Use 'create' mode to create it."
@@ -237,12 +374,14 @@ class NotebookManager:
                 shell=shell,
                 notebook=nb,
                 kernel_id=kernel_id,
+                history=OperationHistory(max_size=self.HISTORY_MAX_SIZE),
                 is_active=True
             )
 
             # Store and activate
             self.notebooks[notebook_name] = nb_info
             self.active_notebook = notebook_name
+            self._kernels.activate(nb_info)
 
             # Get notebook overview
             cell_count = len(nb.cells)
@@ -301,8 +440,14 @@ class NotebookManager:
 
             nb_info = self.notebooks[notebook_name]
             nb_info.shell.restart_kernel()
+            nb_info.exec_chain = ""
+            nb_info.exec_cache.clear()
             nb_info.last_activity = datetime.now()
 
+            # Drop any swapped-out namespace so it isn't restored later
+            if not self._kernels.is_live(notebook_name):
+                self._kernels.discard(nb_info)
+
             return f"✓ Kernel for notebook '{notebook_name}' restarted successfully\nMemory state cleared"
 
     def unuse_notebook(self, notebook_name: str) -> str:
@@ -322,19 +467,51 @@ class NotebookManager:
             nb_info = self.notebooks[notebook_name]
 
             # Save the notebook before disconnecting
-            write_nb(nb_info.notebook, nb_info.path)
+            self._save_notebook(nb_info)
 
             # Remove from managed notebooks
             del self.notebooks[notebook_name]
+            self._kernels.discard(nb_info)
 
             # Update active notebook if this was active
             if self.active_notebook == notebook_name:
                 self.active_notebook = next(iter(self.notebooks.keys()), None)
                 if self.active_notebook:
                     self.notebooks[self.active_notebook].is_active = True
+                    self._kernels.activate(self.notebooks[self.active_notebook])
 
             return f"✓ Notebook '{notebook_name}' disconnected successfully\nResources released"
 
+    def save_notebook(self, notebook_name: Optional[str] = None) -> str:
+        """
+        Write pending in-memory changes of a notebook to disk.
+
+        move_cell, swap_cells and reorder_cells only mark the notebook
+        dirty, and with a `save_delay` other changes are written shortly
+        after the last modification; this writes pending changes
+        immediately. They are also flushed by unuse_notebook and by the
+        next content-changing operation.
+
+        Args:
+            notebook_name: Notebook identifier to save (default: active notebook)
+
+        Returns:
+            Success message confirming the save
+        """
+        with self._lock:
+            notebook_name = notebook_name or self.active_notebook
+            if not notebook_name:
+                return "Error: No active notebook. Use use_notebook first."
+            if notebook_name not in self.notebooks:
+                return f"Error: Notebook '{notebook_name}' not found"
+
+            nb_info = self.notebooks[notebook_name]
+            if not nb_info.dirty:
+                return f"✓ Notebook '{notebook_name}' has no unsaved changes"
+
+            self._save_notebook(nb_info)
+            return f"✓ Notebook '{notebook_name}' saved to {nb_info.path.relative_to(self.root_path)}"
+
     def read_notebook(
         self,
         notebook_name: str,
@@ -358,6 +535,24 @@ class NotebookManager:
             return f"Error: Notebook '{notebook_name}' not found"
 
         nb_info = self.notebooks[notebook_name]
+
+        # Rendered output is reused until the notebook changes (see _mark_dirty)
+        key = (response_format, start_index, limit, nb_info.version)
+        if key not in nb_info.read_cache:
+            nb_info.read_cache[key] = self._render_notebook(
+                nb_info, response_format, start_index, limit
+            )
+        return nb_info.read_cache[key]
+
+    def _render_notebook(
+        self,
+        nb_info: NotebookInfo,
+        response_format: str,
+        start_index: int,
+        limit: int
+    ) -> str:
+        """Render the read_notebook output for a notebook."""
+        notebook_name = nb_info.name
         nb = nb_info.notebook
 
         total_cells = len(nb.cells)
@@ -407,11 +602,11 @@ class NotebookManager:
                         result.append(f"[{output_type}]\n")
 
                         if output_type == 'stream':
-                            result.append(''.join(output.get('text', [])))
+                            result.append(_join_text(output.get('text', [])))
                         elif output_type in ('execute_result', 'display_data'):
                             data = output.get('data', {})
                             if 'text/plain' in data:
-                                result.append(''.join(data['text/plain']))
+                                result.append(_join_text(data['text/plain']))
                         elif output_type == 'error':
                             result.append(''.join(output.get('traceback', [])))
 
@@ -484,6 +679,59 @@ class NotebookManager:
         except Exception as e:
             return f"Error inserting cell: {str(e)}"
 
+    def insert_cells(
+        self,
+        cell_index: int,
+        cells: List[Tuple[str, str]]
+    ) -> str:
+        """
+        Insert several consecutive cells into the active notebook.
+
+        The cells are spliced in with one write to disk and recorded as a
+        single undoable operation.
+
+        Args:
+            cell_index: Target index of the first new cell (0-based), use -1 to append
+            cells: List of (cell_type, cell_source) pairs, in notebook order
+
+        Returns:
+            Success message with the range of inserted cells
+        """
+        if not self.active_notebook:
+            return "Error: No active notebook. Use use_notebook first."
+
+        if not cells:
+            return "Error: No cells provided"
+
+        for cell_type, _ in cells:
+            if cell_type not in ("code", "markdown"):
+                return f"Error: Invalid cell_type '{cell_type}'. Use 'code' or 'markdown'."
+
+        nb_info = self.notebooks[self.active_notebook]
+
+        if cell_index != -1 and not 0 <= cell_index <= len(nb_info.notebook.cells):
+            return f"Error: Cell index {cell_index} out of range (0-{len(nb_info.notebook.cells)})"
+
+        command = InsertCellsCommand(
+            cell_index=cell_index,
+            cells=[(cell_type, source) for cell_type, source in cells]
+        )
+
+        try:
+            command.execute(self)
+            nb_info.history.add_command(command)
+
+            first = command.cell_index
+            last = first + len(cells) - 1
+
+            return (
+                f"✓ {len(cells)} cell(s) inserted at indices {first}-{last}\n"
+                f"Notebook: {self.active_notebook}"
+            )
+
+        except Exception as e:
+            return f"Error inserting cells: {str(e)}"
+
     def overwrite_cell_source(
         self,
         cell_index: int,
@@ -546,7 +794,8 @@ class NotebookManager:
         cell_index: int,
         timeout: int = 90,
         stream: bool = False,
-        progress_interval: int = 5
+        progress_interval: int = 5,
+        use_cache: bool = False
     ) -> List[Union[str, Dict]]:
         """
         Execute a cell from the active notebook and return outputs.
@@ -556,6 +805,9 @@ class NotebookManager:
             timeout: Maximum seconds to wait for execution
             stream: Enable streaming progress updates
             progress_interval: Seconds between progress updates
+            use_cache: Return the previous outputs without running the kernel
+                if this exact source was the last code run in the kernel
+                session. Only safe for idempotent cells.
 
         Returns:
             List of outputs from the executed cell
@@ -574,17 +826,26 @@ class NotebookManager:
         if cell.cell_type != 'code':
             return [f"Error: Cell [{cell_index}] is not a code cell (type: {cell.cell_type})"]
 
+        if use_cache:
+            cached = nb_info.exec_cache.get(self._exec_cache_key(nb_info, cell.source))
+            if cached is not None:
+                if cell.get('outputs') != cached:
+                    cell.outputs = cached
+                    self._mark_dirty(nb_info)
+                return self._format_outputs(cached)
+
         # Execute the cell
         try:
+            cache_key = self._advance_exec_chain(nb_info, cell.source)
             outputs = nb_info.shell.run(cell.source, timeout=timeout)
+            nb_info.exec_cache[cache_key] = outputs
 
             # Store outputs in cell
             cell.outputs = outputs
             cell.execution_count = getattr(nb_info.shell, '_cell_idx', cell_index + 1)
 
             # Save notebook
-            write_nb(nb, nb_info.path)
-            nb_info.last_activity = datetime.now()
+            self._mark_dirty(nb_info)
 
             return self._format_outputs(outputs)
 
@@ -595,6 +856,82 @@ class NotebookManager:
         except Exception as e:
             return [f"Error executing cell: {str(e)}"]
 
+    def execute_cells(
+        self,
+        cell_indices: List[int],
+        timeout: int = 90
+    ) -> List[Union[str, Dict]]:
+        """
+        Execute several cells of the active notebook in order.
+
+        All indices are validated before anything runs. The cells are fed to
+        the same shell one after another and the notebook is written once at
+        the end instead of after every cell. Execution stops at the first cell
+        that raises an error, or before the next cell once stop_execution is
+        called; remaining cells are reported as skipped.
+
+        Args:
+            cell_indices: Indices of the cells to execute (0-based), in run order
+            timeout: Maximum seconds to wait for each cell
+
+        Returns:
+            Flat list of outputs, each cell's outputs preceded by a "Cell [i]:" header
+        """
+        if not self.active_notebook:
+            return ["Error: No active notebook. Use use_notebook first."]
+
+        nb_info = self.notebooks[self.active_notebook]
+        nb = nb_info.notebook
+
+        if not cell_indices:
+            return ["Error: No cell indices provided"]
+
+        for idx in cell_indices:
+            if idx < 0 or idx >= len(nb.cells):
+                return [f"Error: Cell index {idx} out of range (0-{len(nb.cells) - 1})"]
+            if nb.cells[idx].cell_type != 'code':
+                return [f"Error: Cell [{idx}] is not a code cell (type: {nb.cells[idx].cell_type})"]
+
+        # A stop request applies to the batch that is running when it arrives
+        stop_event = nb_info.shell._stop_execution
+        stop_event.clear()
+
+        results = []
+        executed = 0
+        try:
+            for idx in cell_indices:
+                if stop_event.is_set():
+                    results.append(f"Execution stopped by user; skipped cells {cell_indices[executed:]}")
+                    break
+
+                cell = nb.cells[idx]
+                cache_key = self._advance_exec_chain(nb_info, cell.source)
+                outputs = nb_info.shell.run(cell.source, timeout=timeout)
+                nb_info.exec_cache[cache_key] = outputs
+                cell.outputs = outputs
+                cell.execution_count = getattr(nb_info.shell, '_cell_idx', idx + 1)
+                executed += 1
+
+                results.append(f"Cell [{idx}]:")
+                results.extend(self._format_outputs(outputs))
+
+                if any(o.get('output_type') == 'error' for o in outputs):
+                    skipped = cell_indices[executed:]
+                    if skipped:
+                        results.append(f"Error in cell [{idx}]; skipped cells {skipped}")
+                    break
+        except TimeoutError:
+            results.append(f"Error: Cell [{cell_indices[executed]}] execution timed out after {timeout} seconds")
+        except KeyboardInterrupt:
+            results.append("Error: Cell execution was stopped by user")
+        except Exception as e:
+            results.append(f"Error executing cell [{cell_indices[executed]}]: {str(e)}")
+        finally:
+            if executed:
+                self._mark_dirty(nb_info)
+
+        return results
+
     def insert_execute_code_cell(
         self,
         cell_index: int,
@@ -705,9 +1042,9 @@ class NotebookManager:
             if include_source:
                 for item in command.deleted_cells:
                     idx = item['index']
-                    cell_dict = item['cell']
+                    cell = item['cell']
                     deleted_info.append(
-                        f"Cell [{idx}] ({cell_dict.get('cell_type', 'unknown')}):\n{'-' * 40}\n{cell_dict.get('source', '')}\n"
+                        f"Cell [{idx}] ({cell.get('cell_type', 'unknown')}):\n{'-' * 40}\n{cell.get('source', '')}\n"
                     )
 
             result = f"✓ Deleted {len(sorted_indices)} cell(s): {sorted_indices}\n"
@@ -920,6 +1257,7 @@ class NotebookManager:
         timeout = min(timeout, 60)
 
         try:
+            self._advance_exec_chain(nb_info, code)
             outputs = nb_info.shell.run(code, timeout=timeout)
             nb_info.last_activity = datetime.now()
 
@@ -963,18 +1301,20 @@ class NotebookManager:
         Returns:
             Success message
         """
-        if notebook_name not in self.notebooks:
-            return f"Error: Notebook '{notebook_name}' not found"
+        with self._lock:
+            if notebook_name not in self.notebooks:
+                return f"Error: Notebook '{notebook_name}' not found"
 
-        # Deactivate current active notebook
-        if self.active_notebook:
-            self.notebooks[self.active_notebook].is_active = False
+            # Deactivate current active notebook
+            if self.active_notebook:
+                self.notebooks[self.active_notebook].is_active = False
 
-        # Activate new notebook
-        self.active_notebook = notebook_name
-        self.notebooks[notebook_name].is_active = True
+            # Activate new notebook (the kernel pool is only touched under the lock)
+            self.active_notebook = notebook_name
+            self.notebooks[notebook_name].is_active = True
+            self._kernels.activate(self.notebooks[notebook_name])
 
-        return f"✓ Notebook '{notebook_name}' is now active"
+            return f"✓ Notebook '{notebook_name}' is now active"
 
     # ================== Undo/Redo Operations ==================
 
@@ -1002,11 +1342,10 @@ class NotebookManager:
         try:
             results = nb_info.history.undo(self, steps)
 
-            summary = f"✓ Undid {len(results)} operation(s):\n"
-            for desc in descriptions[:len(results)]:
-                summary += f"  - {desc}\n"
+            lines = [f"✓ Undid {len(results)} operation(s):"]
+            lines.extend(f"  - {desc}" for desc in descriptions[:len(results)])
 
-            return summary.rstrip()
+            return "\n".join(lines)
 
         except Exception as e:
             return f"Error during undo: {str(e)}"
@@ -1035,11 +1374,10 @@ class NotebookManager:
         try:
             results = nb_info.history.redo(self, steps)
 
-            summary = f"✓ Redid {len(results)} operation(s):\n"
-            for desc in descriptions[:len(results)]:
-                summary += f"  - {desc}\n"
+            lines = [f"✓ Redid {len(results)} operation(s):"]
+            lines.extend(f"  - {desc}" for desc in descriptions[:len(results)])
 
-            return summary.rstrip()
+            return "\n".join(lines)
 
         except Exception as e:
             return f"Error during redo: {str(e)}"
@@ -1057,18 +1395,22 @@ class NotebookManager:
         nb_info = self.notebooks[self.active_notebook]
         summary = nb_info.history.get_history_summary()
 
-        result = f"Operation History for '{self.active_notebook}':\n"
-        result += f"  Undo available: {summary['undo_count']} operation(s)\n"
-        result += f"  Redo available: {summary['redo_count']} operation(s)\n"
+        parts = [
+            f"Operation History for '{self.active_notebook}':",
+            f"  Undo available: {summary.undo_count} operation(s)",
+            f"  Redo available: {summary.redo_count} operation(s)",
+        ]
 
-        if summary['recent_operations']:
-            result += f"\nRecent operations:\n"
-            for i, op in enumerate(summary['recent_operations'], 1):
-                result += f"  {i}. {op}\n"
+        if summary.recent_operations:
+            parts.append("\nRecent operations:")
+            parts.extend(
+                f"  {i}. {op}"
+                for i, op in enumerate(summary.recent_operations, 1)
+            )
         else:
-            result += "\nNo operations in history\n"
+            parts.append("\nNo operations in history")
 
-        return result.rstrip()
+        return "\n".join(parts)
 
     def clear_history(self) -> str:
         """
@@ -1087,14 +1429,78 @@ class NotebookManager:
 
     # ================== Helper Methods ==================
 
+    def _exec_cache_key(self, nb_info: NotebookInfo, source: str) -> str:
+        """Key for outputs of `source` when it was the last code run in the session."""
+        return hashlib.blake2b(
+            source.encode() + nb_info.exec_chain.encode(), digest_size=16
+        ).hexdigest()
+
+    def _advance_exec_chain(self, nb_info: NotebookInfo, source: str) -> str:
+        """
+        Record that `source` is about to run in the notebook's kernel.
+
+        Any code run changes kernel state, so cached outputs from before it are
+        dropped. Returns the cache key under which this run's outputs are valid.
+        """
+        nb_info.exec_chain = hashlib.blake2b(
+            nb_info.exec_chain.encode() + source.encode(), digest_size=16
+        ).hexdigest()
+        nb_info.exec_cache.clear()
+        return self._exec_cache_key(nb_info, source)
+
+    def _mark_dirty(self, nb_info: NotebookInfo, save: bool = True):
+        """Record an in-memory change and schedule a debounced save.
+
+        Args:
+            nb_info: The changed notebook.
+            save: If False, only mark the notebook dirty; used by the pure
+                cell permutations (move/swap/reorder), which are written by
+                save_notebook, unuse_notebook or the next content change.
+        """
+        nb_info.dirty = True
+        nb_info.version += 1
+        nb_info.read_cache.clear()
+        nb_info.last_activity = datetime.now()
+
+        if not save:
+            return
+        if self.save_delay <= 0:
+            self._save_notebook(nb_info)
+            return
+
+        # Restart the timer so a burst of changes results in a single write
+        if nb_info.save_timer is not None:
+            nb_info.save_timer.cancel()
+        nb_info.save_timer = threading.Timer(self.save_delay, self._flush_notebook, args=(nb_info,))
+        nb_info.save_timer.start()
+
+    def _flush_notebook(self, nb_info: NotebookInfo):
+        """Timer callback: save the notebook if it is still managed and dirty."""
+        with self._lock:
+            if self.notebooks.get(nb_info.name) is not nb_info or not nb_info.dirty:
+                return
+            try:
+                self._save_notebook(nb_info)
+            except Exception:
+                # Leave the notebook dirty; the next change, save or unuse retries
+                logger.exception("Failed to save notebook '%s'", nb_info.name)
+
+    def _save_notebook(self, nb_info: NotebookInfo):
+        """Write the notebook to disk now and clear its dirty flag."""
+        with self._save_lock:
+            if nb_info.save_timer is not None:
+                nb_info.save_timer.cancel()
+                nb_info.save_timer = None
+            nb_info.dirty = False
+            try:
+                _write_notebook_atomic(nb_info.notebook, nb_info.path)
+            except BaseException:
+                nb_info.dirty = True
+                raise
+
     def _format_size(self, size: int) -> str:
         """Format file size in human-readable format"""
-        if size < 1024:
-            return f"{size} B"
-        elif size < 1024 * 1024:
-            return f"{size / 1024:.1f} KB"
-        else:
-            return f"{size / (1024 * 1024):.1f} MB"
+        return _format_size(size)
 
     def _format_outputs(self, outputs: List) -> List[Union[str, Dict]]:
         """Format outputs for display"""
@@ -1107,21 +1513,14 @@ class NotebookManager:
             output_type = output.get('output_type', 'unknown')
 
             if output_type == 'stream':
-                text = ''.join(output.get('text', []))
+                text = _join_text(output.get('text', []))
                 result.append(f"[{output['name']}]\n{text}")
 
             elif output_type in ('execute_result', 'display_data'):
-                data = output.get('data', {})
-
-                # Handle different data types
-                if 'text/plain' in data:
-                    result.append(''.join(data['text/plain']))
-                elif 'text/html' in data:
-                    result.append({'type': 'html', 'content': ''.join(data['text/html'])})
-                elif 'image/png' in data:
-                    result.append({'type': 'image', 'format': 'png', 'data': ''.join(data['image/png'])})
-                elif 'image/jpeg' in data:
-                    result.append({'type': 'image', 'format': 'jpeg', 'data': ''.join(data['image/jpeg'])})
+                # text/plain, then html, then png/jpeg (large images truncated)
+                formatted = _format_mime_data(output.get('data', {}))
+                if formatted is not None:
+                    result.append(formatted)
 
             elif output_type == 'error':
                 traceback = ''.join(output.get('traceback', []))
@@ -2,6 +2,8 @@
 
 from typing import Any, Dict, List
 
+__all__ = ['TOOL_SCHEMAS', 'get_all_tool_schemas']
+
 # Tool schemas for MCP server
 TOOL_SCHEMAS = {
     "list_files": {
@@ -114,6 +116,20 @@ TOOL_SCHEMAS = {
             "required": ["notebook_name"]
         }
     },
+    "save_notebook": {
+        "name": "save_notebook",
+        "description": "Write pending in-memory changes of a notebook to disk immediately, e.g. after move_cell, swap_cells or reorder_cells, which do not save on their own",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "notebook_name": {
+                    "type": "string",
+                    "description": "Notebook identifier to save (default: active notebook)"
+                }
+            },
+            "required": []
+        }
+    },
     "read_notebook": {
         "name": "read_notebook",
         "description": "Read a notebook and return cell information",
@@ -169,6 +185,37 @@ TOOL_SCHEMAS = {
             "required": ["cell_index", "cell_type", "cell_source"]
         }
     },
+    "insert_cells": {
+        "name": "insert_cells",
+        "description": "Insert several consecutive cells into the active notebook as a single undoable operation",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "cell_index": {
+                    "type": "integer",
+                    "description": "Target index of the first new cell (0-based), use -1 to append"
+                },
+                "cells": {
+                    "type": "array",
+                    "description": "Cells to insert, in notebook order",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "cell_type": {
+                                "type": "string",
+                                "enum": ["code", "markdown"]
+                            },
+                            "cell_source": {
+                                "type": "string"
+                            }
+                        },
+                        "required": ["cell_type", "cell_source"]
+                    }
+                }
+            },
+            "required": ["cell_index", "cells"]
+        }
+    },
     "overwrite_cell_source": {
         "name": "overwrite_cell_source",
         "description": "Overwrite the source of a specific cell in the active notebook",
@@ -213,11 +260,37 @@ TOOL_SCHEMAS = {
                     "description": "Seconds between progress updates when stream=true",
                     "default": 5,
                     "minimum": 1
+                },
+                "use_cache": {
+                    "type": "boolean",
+                    "description": "Return the previous outputs without re-running if this exact source was the last code run in the kernel session (idempotent cells only)",
+                    "default": False
                 }
             },
             "required": ["cell_index"]
         }
     },
+    "execute_cells": {
+        "name": "execute_cells",
+        "description": "Execute several cells of the active notebook in order, saving the notebook once at the end. Stops at the first cell that raises an error",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "cell_indices": {
+                    "type": "array",
+                    "items": {"type": "integer"},
+                    "description": "Indices of the cells to execute (0-based), in run order"
+                },
+                "timeout": {
+                    "type": "integer",
+                    "description": "Maximum seconds to wait for each cell",
+                    "default": 90,
+                    "minimum": 1
+                }
+            },
+            "required": ["cell_indices"]
+        }
+    },
     "insert_execute_code_cell": {
         "name": "insert_execute_code_cell",
         "description": "Insert a code cell and execute it immediately",
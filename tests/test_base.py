@@ -0,0 +1,132 @@
+"""Unit tests for BaseManager"""
+
+import json
+import threading
+import tempfile
+import shutil
+from pathlib import Path
+
+import pytest
+
+from headlesnb.base import BaseManager, ManagedItemInfo
+
+
+class FileManager(BaseManager):
+    """Minimal BaseManager storing items as JSON files"""
+
+    def __init__(self, root_path: str = "."):
+        super().__init__(root_path)
+        self.load_started = threading.Event()
+        self.release_load = threading.Event()
+        self.release_load.set()
+        self.release_save = threading.Event()
+        self.release_save.set()
+
+    @property
+    def item_type_name(self) -> str:
+        return "item"
+
+    def _load_item(self, name, path):
+        self.load_started.set()
+        self.release_load.wait(5)
+        return ManagedItemInfo(name=name, path=self.root_path / path)
+
+    def _create_item(self, name, path):
+        return ManagedItemInfo(name=name, path=self.root_path / path)
+
+    def _save_item(self, item):
+        self.release_save.wait(5)
+        if item.name == "broken":
+            raise OSError("disk full")
+        item.path.write_text(json.dumps({"name": item.name}))
+
+
+class TestBaseManager:
+    """Test cases for BaseManager"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        """Create a temporary directory for testing"""
+        temp = tempfile.mkdtemp()
+        yield Path(temp)
+        shutil.rmtree(temp)
+
+    @pytest.fixture
+    def manager(self, temp_dir):
+        """Create a FileManager instance and wait for its saves on teardown"""
+        manager = FileManager(root_path=str(temp_dir))
+        yield manager
+        manager.close()
+
+    def test_use_and_unuse_item(self, manager, temp_dir):
+        """Test creating, switching and releasing items"""
+        assert "activated" in manager.use_item("a", "a.json", mode="create")
+        assert "activated" in manager.use_item("b", "b.json", mode="create")
+        assert manager.get_active_item() == "b"
+        assert not manager._items["a"].is_active
+
+        assert "now active" in manager.set_active_item("a")
+        assert "released" in manager.unuse_item("a")
+        assert manager.get_active_item() == "b"
+
+        # Reopening waits for the background save of the released item
+        assert "activated" in manager.use_item("a", "a.json", mode="connect")
+        assert (temp_dir / "a.json").exists()
+        manager.unuse_item("a")
+
+        assert "Error" in manager.unuse_item("a")
+        assert "Error" in manager.use_item("b", "b.json", mode="create")
+        assert "Error" in manager.use_item("c", "c.json", mode="bogus")
+
+    def test_lock_not_held_during_load(self, manager, temp_dir):
+        """Test that a slow load does not block other operations"""
+        (temp_dir / "slow.json").write_text("{}")
+        manager.use_item("fast", "fast.json", mode="create")
+
+        manager.release_load.clear()
+        loader = threading.Thread(
+            target=manager.use_item, args=("slow", "slow.json", "connect")
+        )
+        loader.start()
+        try:
+            assert manager.load_started.wait(5)
+
+            # Other operations proceed while the load is in progress
+            assert "History cleared" in manager.clear_history()
+            assert "released" in manager.unuse_item("fast")
+
+            # The name being loaded is reserved
+            assert "already in use" in manager.use_item("slow", "slow.json")
+        finally:
+            manager.release_load.set()
+            loader.join(5)
+
+        assert manager.get_active_item() == "slow"
+
+    def test_background_save(self, manager, temp_dir):
+        """Test that close waits for saves and a pending failed save is reported"""
+        manager.use_item("a", "a.json", mode="create")
+        manager.unuse_item("a")
+        manager.use_item("broken", "broken.json", mode="create")
+
+        # Hold the writer so use_item waits on the in-flight save
+        manager.release_save.clear()
+        manager.unuse_item("broken")
+        threading.Timer(0.1, manager.release_save.set).start()
+
+        result = manager.use_item("again", "broken.json", mode="create")
+        assert "Error: Saving" in result and "disk full" in result
+
+        manager.close()
+        assert json.loads((temp_dir / "a.json").read_text()) == {"name": "a"}
+        assert not manager._pending_saves
+
+    def test_failed_background_save_is_logged(self, manager, caplog):
+        """Test that a finished save is forgotten and its failure logged"""
+        manager.use_item("broken", "broken.json", mode="create")
+        with caplog.at_level("WARNING", logger="headlesnb.base"):
+            assert "released" in manager.unuse_item("broken")
+            manager.close()
+
+        assert "Background save" in caplog.text and "disk full" in caplog.text
+        assert not manager._pending_saves
@@ -8,14 +8,17 @@ import pytest
 import json
 import asyncio
 import tempfile
+import threading
+import time
 from pathlib import Path
 from starlette.testclient import TestClient
 
 from headlesnb.dialoghelper_server import (
-    app, init_manager, get_manager, html_queues,
-    data_store, data_values
+    app, init_manager, get_manager, init_manager_in_background, html_queues,
+    data_channels
 )
 from headlesnb.dialogmanager import DialogManager
+import headlesnb.dialoghelper_server as server
 
 
 @pytest.fixture
@@ -66,6 +69,29 @@ class TestCoreEndpoints:
         data = response.json()
         assert data == {} or 'error' in data
 
+    def test_curr_dialog_after_background_setup(self, client, temp_dir):
+        """Test that the first request waits for background manager setup."""
+        def setup(root_path):
+            mgr = init_manager(root_path=root_path)
+            mgr.use_dialog('bg_dialog', 'bg.ipynb', mode='create')
+            return mgr
+
+        init_manager_in_background(setup, temp_dir)
+        response = client.post('/curr_dialog_', data={'dlg_name': ''})
+        assert response.json()['name'] == 'bg_dialog'
+        get_manager().unuse_dialog('bg_dialog')
+
+    def test_failed_background_setup_keeps_raising(self, client):
+        """Test that a failed setup is re-raised on every get_manager call."""
+        def setup():
+            raise RuntimeError("setup failed")
+
+        init_manager_in_background(setup).exception()
+        for _ in range(2):
+            with pytest.raises(RuntimeError, match="setup failed"):
+                get_manager()
+        server._manager_future = None  # Reset
+
     def test_curr_dialog_with_dialog(self, client, setup_manager):
         """Test curr_dialog_ with active dialog."""
         response = client.post('/curr_dialog_', data={'dlg_name': 'test_dialog'})
@@ -529,6 +555,82 @@ class TestRunQueue:
         data = response2.json()
         assert data['status'] == 'queued'
 
+    def test_add_runq_code(self, client, setup_manager):
+        """Test running a code message immediately."""
+        response1 = client.post('/add_relative_', data={
+            'dlg_name': 'test_dialog',
+            'content': 'print("hello")',
+            'placement': 'at_end',
+            'msg_type': 'code'
+        })
+        msg_id = response1.text
+
+        response2 = client.post('/add_runq_', data={
+            'dlg_name': 'test_dialog',
+            'msgid': msg_id
+        })
+        assert response2.status_code == 200
+        data = response2.json()
+        assert 'hello' in json.dumps(data['outputs'])
+
+    def test_add_runq_prompt(self, client, temp_dir):
+        """Test running a prompt message immediately."""
+        from headlesnb.dialogmanager.llm import MockLLMClient
+        mgr = init_manager(root_path=temp_dir, llm_client=MockLLMClient(responses=["Hi there"]))
+        mgr.use_dialog('test_dialog', 'test.ipynb', mode='create')
+        msg_id = mgr.add_message("Hello", msg_type='prompt')
+
+        response = client.post('/add_runq_', data={
+            'dlg_name': 'test_dialog',
+            'msgid': msg_id
+        })
+        assert response.status_code == 200
+        assert response.json()['response'] == "Hi there"
+        assert mgr.dialogs['test_dialog'].get_message_by_id(msg_id).output == "Hi there"
+
+    def test_add_relative_run(self, client, temp_dir):
+        """Test that add_relative_ with run=true returns after the run."""
+        from headlesnb.dialogmanager.llm import MockLLMClient
+        mgr = init_manager(root_path=temp_dir, llm_client=MockLLMClient(responses=["Done"]))
+        mgr.use_dialog('test_dialog', 'test.ipynb', mode='create')
+
+        response1 = client.post('/add_relative_', data={
+            'dlg_name': 'test_dialog',
+            'content': 'print(1 + 1)',
+            'placement': 'at_end',
+            'msg_type': 'code',
+            'run': 'true'
+        })
+        code_msg = mgr.dialogs['test_dialog'].get_message_by_id(response1.text)
+        assert '2' in json.dumps(code_msg.output)
+
+        response2 = client.post('/add_relative_', data={
+            'dlg_name': 'test_dialog',
+            'content': 'Summarise',
+            'placement': 'at_end',
+            'msg_type': 'prompt',
+            'run': 'true'
+        })
+        prompt_msg = mgr.dialogs['test_dialog'].get_message_by_id(response2.text)
+        assert prompt_msg.output == "Done"
+
+
+class TestHtmlStream:
+    """Test HTML delivery over SSE."""
+
+    def test_add_html_frames_like_sse_message(self, client):
+        """Test that queued frames match fasthtml's sse_message framing."""
+        from fasthtml.common import sse_message, Safe
+
+        html_queues.pop('html_dialog', None)
+        content = '<div id="out" hx-swap-oob="true">\n  <b>done</b>\n</div>'
+        response = client.post('/add_html_', data={'dlg_name': 'html_dialog', 'content': content})
+        assert response.text == "ok"
+        try:
+            assert list(html_queues['html_dialog'].frames) == [sse_message(Safe(content)).encode('utf-8')]
+        finally:
+            html_queues.pop('html_dialog', None)
+
 
 class TestDataExchange:
     """Test blocking data exchange endpoints."""
@@ -554,6 +656,40 @@ class TestDataExchange:
         data = response2.json()
         assert data['key'] == 'value'
 
+    def test_pop_data_two_waiters(self):
+        """Test that both waiters on one data_id receive a pushed value."""
+        data_id = 'shared_data_id'
+        results = []
+
+        with TestClient(app) as client:
+            def pop():
+                response = client.post('/pop_data_blocking_', data={
+                    'data_id': data_id,
+                    'timeout': '5'
+                })
+                results.append(response.json())
+
+            def wait_for_waiters(n):
+                deadline = time.time() + 5
+                while server.data_waiters.get(data_id, 0) != n and time.time() < deadline:
+                    time.sleep(0.01)
+
+            threads = [threading.Thread(target=pop) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            wait_for_waiters(2)
+            for value, remaining in ((1, 1), (2, 0)):
+                client.post('/push_data_', data={
+                    'data_id': data_id,
+                    'data': json.dumps({'v': value})
+                })
+                wait_for_waiters(remaining)
+            for thread in threads:
+                thread.join(timeout=10)
+
+        assert sorted(r['v'] for r in results) == [1, 2]
+        assert data_id not in data_channels
+
     def test_pop_data_timeout(self, client):
         """Test pop data timeout."""
         response = client.post('/pop_data_blocking_', data={
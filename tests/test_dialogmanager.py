@@ -121,6 +121,17 @@ class TestMessage:
         assert msg.msg_type == 'prompt'
         assert msg.pinned == 1
 
+    def test_message_clone(self):
+        """Test that clone copies every field and is independent."""
+        msg = Message(content="test", msg_type="code", pinned=1)
+        clone = msg.clone()
+
+        assert clone is not msg
+        assert clone == msg
+        clone.content = "changed"
+        assert msg.content == "test"
+        assert msg.to_dict()['content'] == "test"
+
 
 # ================== Serialization Tests ==================
 
@@ -362,6 +373,30 @@ class TestMessageOperations:
         assert msgs[1].content == "Second"
         assert msgs[2].content == "Third"
 
+    def test_add_messages(self, manager):
+        """Test adding several messages in one call."""
+        manager.use_dialog('test', 'test.ipynb', mode='create')
+        manager.add_message("Last", msg_type='note')
+
+        msg_ids = manager.add_messages([
+            {'content': "print(1)", 'msg_type': 'code'},
+            {'content': "Question?", 'msg_type': 'prompt', 'pinned': 1},
+        ], index=0)
+
+        msgs = manager.dialogs['test'].messages
+        assert [m.id for m in msgs[:2]] == msg_ids
+        assert [m.msg_type for m in msgs] == ['code', 'prompt', 'note']
+        assert msgs[1].pinned == 1
+
+    def test_add_messages_invalid(self, manager):
+        """Test that add_messages rejects bad input without changes."""
+        manager.use_dialog('test', 'test.ipynb', mode='create')
+
+        assert "Error" in manager.add_messages([])
+        assert "Error" in manager.add_messages([{'content': "x"}], index=5)
+        assert "Error" in manager.add_messages([{'content': "x", 'bogus': 1}])
+        assert len(manager.dialogs['test'].messages) == 0
+
     def test_update_message_content(self, manager):
         """Test updating message content."""
         manager.use_dialog('test', 'test.ipynb', mode='create')
@@ -422,6 +457,183 @@ class TestMessageOperations:
         assert "code" in result
         assert "prompt" in result
 
+    def test_messages_by_type_follow_edits(self, dialog_with_messages):
+        """Test that type lookups reflect adds, type changes, moves and undo."""
+        dialog = dialog_with_messages.dialogs['test']
+        note, code, _ = dialog.messages
+        assert dialog.get_messages_by_type('note') == [note]
+
+        new_id = dialog_with_messages.add_message("# Second", msg_type='note')
+        assert [m.id for m in dialog.get_messages_by_type('note')] == [note.id, new_id]
+
+        dialog_with_messages.update_message(code.id, msg_type='note')
+        dialog_with_messages.swap_messages(0, 1)
+        assert [m.id for m in dialog.get_messages_by_type('note')] == [code.id, note.id, new_id]
+        assert dialog.get_messages_by_type('code') == []
+
+        dialog_with_messages.undo(2)
+        assert dialog.get_messages_by_type('code') == [code]
+
+    def test_changes_are_debounced_until_save(self, temp_dir):
+        """Test that a burst of changes is written once, after save_dialog"""
+        manager = DialogManager(root_path=str(temp_dir), save_delay=60)
+        manager.use_dialog('test', 'test.ipynb', mode='create')
+        manager.add_message("First", msg_type='note')
+        manager.add_message("Second", msg_type='note')
+
+        dialog = manager.dialogs['test']
+        assert dialog.dirty
+        assert dialog.save_timer is not None
+        assert json.loads((temp_dir / 'test.ipynb').read_text())['cells'] == []
+
+        assert "saved" in manager.save_dialog()
+        assert not dialog.dirty
+        assert dialog.save_timer is None
+        assert len(json.loads((temp_dir / 'test.ipynb').read_text())['cells']) == 2
+
+        assert "no unsaved changes" in manager.save_dialog('test')
+
+    def test_batch_saves_once(self, manager, temp_dir, monkeypatch):
+        """Test that changes inside batch() are written once, on exit."""
+        manager.use_dialog('test', 'test.ipynb', mode='create')
+        saves = []
+        save = manager._save_dialog
+        monkeypatch.setattr(manager, '_save_dialog', lambda d: (saves.append(d.name), save(d)))
+
+        with manager.batch() as dialog:
+            with manager.batch():
+                manager.add_message("First", msg_type='note')
+            manager.add_message("Second", msg_type='note')
+            assert dialog.dirty and saves == []
+
+        assert saves == ['test']
+        assert len(json.loads((temp_dir / 'test.ipynb').read_text())['cells']) == 2
+
+        msg_id = dialog.messages[0].id
+        manager.update_message(msg_id, content="Changed", pinned=1, skipped=1)
+        assert saves == ['test', 'test']
+
+    def test_save_skips_unchanged_dialog(self, manager, temp_dir):
+        """Test that saves are atomic and unchanged dialogs are not rewritten."""
+        from headlesnb.dialogmanager.serialization import save_dialog_to_file
+
+        manager.use_dialog('test', 'test.ipynb', mode='create')
+        manager.add_message("Hello", msg_type='note')
+        # Prompt separators are random, but stay fixed until the message changes
+        manager.add_message("Question?", msg_type='prompt', output="Answer.")
+        dialog = manager.dialogs['test']
+        path = temp_dir / 'test.ipynb'
+        mtime = path.stat().st_mtime_ns
+
+        save_dialog_to_file(dialog, path)
+        assert path.stat().st_mtime_ns == mtime
+        assert not list(temp_dir.glob('.*.tmp'))
+
+        # An external edit is overwritten even if the dialog did not change
+        path.write_text('{}')
+        save_dialog_to_file(dialog, path)
+        assert len(json.loads(path.read_text())['cells']) == 2
+
+    def test_edit_during_encoding_is_not_cached(self, manager, temp_dir, monkeypatch):
+        """Test that a field assigned while a save encodes it reaches the next save."""
+        from headlesnb.dialogmanager import serialization
+
+        manager.use_dialog('test', 'test.ipynb', mode='create')
+        manager.add_message("old", msg_type='note')
+        dialog = manager.dialogs['test']
+        msg = dialog.messages[0]
+        path = temp_dir / 'test.ipynb'
+        to_cell = serialization.message_to_cell
+
+        def racing_to_cell(m):
+            cell = to_cell(m)
+            m.content = "new"  # another thread edits after the fields were read
+            return cell
+
+        monkeypatch.setattr(serialization, "message_to_cell", racing_to_cell)
+        msg.content = "stale"
+        serialization.save_dialog_to_file(dialog, path)
+        monkeypatch.setattr(serialization, "message_to_cell", to_cell)
+
+        serialization.save_dialog_to_file(dialog, path)
+        assert json.loads(path.read_text())['cells'][0]['source'] == ['new']
+
+    def test_debounced_save_fires(self, temp_dir):
+        """Test that the debounce timer writes the dialog without an explicit save"""
+        import time
+
+        manager = DialogManager(root_path=str(temp_dir), save_delay=0.01)
+        manager.use_dialog('test', 'test.ipynb', mode='create')
+        manager.add_message("Hello", msg_type='note')
+
+        dialog = manager.dialogs['test']
+        deadline = time.time() + 5
+        while dialog.dirty and time.time() < deadline:
+            time.sleep(0.01)
+        assert not dialog.dirty
+        with manager._save_lock:  # dirty clears before the write completes
+            pass
+        assert len(json.loads((temp_dir / 'test.ipynb').read_text())['cells']) == 1
+
+    def test_debounced_save_runs_on_event_loop(self, temp_dir):
+        """Test that under a running loop the debounced save runs on that loop"""
+        import asyncio
+        import threading
+        from headlesnb.dialogmanager import manager as manager_module
+
+        manager = DialogManager(root_path=str(temp_dir), save_delay=0.01)
+        manager.use_dialog('test', 'test.ipynb', mode='create')
+        saved_on = []
+        save = manager_module.save_dialog_to_file
+
+        def recording_save(dialog, path):
+            saved_on.append(threading.current_thread())
+            save(dialog, path)
+
+        async def edit():
+            manager_module.save_dialog_to_file = recording_save
+            try:
+                manager.add_message("Hello", msg_type='note')
+                assert isinstance(manager.dialogs['test'].save_timer, asyncio.TimerHandle)
+                await asyncio.sleep(0.1)
+            finally:
+                manager_module.save_dialog_to_file = save
+
+        asyncio.run(edit())
+        assert saved_on == [threading.current_thread()]
+        assert not manager.dialogs['test'].dirty
+        assert len(json.loads((temp_dir / 'test.ipynb').read_text())['cells']) == 1
+
+    def test_debounced_save_failure_is_logged(self, temp_dir, monkeypatch, caplog):
+        """Test that a failing timer save is logged and leaves the dialog dirty"""
+        from headlesnb.dialogmanager import manager as manager_module
+
+        def fail(dialog, path):
+            raise ValueError("cannot serialize")
+
+        manager = DialogManager(root_path=str(temp_dir), save_delay=60)
+        manager.use_dialog('test', 'test.ipynb', mode='create')
+        manager.add_message("Hello", msg_type='note')
+        dialog = manager.dialogs['test']
+        dialog.save_timer.cancel()
+
+        monkeypatch.setattr(manager_module, "save_dialog_to_file", fail)
+        with caplog.at_level("ERROR", logger="headlesnb.dialogmanager.manager"):
+            manager._flush_dialog(dialog)
+        assert dialog.dirty
+        assert "Failed to save dialog 'test'" in caplog.text
+
+    def test_unuse_dialog_flushes_pending_save(self, temp_dir):
+        """Test that unuse_dialog writes pending changes and cancels the timer"""
+        manager = DialogManager(root_path=str(temp_dir), save_delay=60)
+        manager.use_dialog('test', 'test.ipynb', mode='create')
+        manager.add_message("Hello", msg_type='note')
+        timer = manager.dialogs['test'].save_timer
+
+        manager.unuse_dialog('test')
+        assert not timer.is_alive() or timer.finished.is_set()
+        assert len(json.loads((temp_dir / 'test.ipynb').read_text())['cells']) == 1
+
 
 # ================== Undo/Redo Tests ==================
 
@@ -451,6 +663,48 @@ class TestUndoRedo:
 
         assert len(manager.dialogs['test'].messages) == 1
 
+    def test_reorder_command_undo(self, dialog_with_messages):
+        """Test that a reorder is undone through its inverse permutation."""
+        from headlesnb.dialogmanager.dialog_history import ReorderMessagesCommand
+
+        dialog = dialog_with_messages.dialogs['test']
+        original = list(dialog.messages)
+
+        command = ReorderMessagesCommand(new_order=[2, 0, 1])
+        command.execute(dialog_with_messages)
+        assert dialog.messages == [original[2], original[0], original[1]]
+
+        command.undo(dialog_with_messages)
+        assert dialog.messages == original
+
+    def test_reorder_messages(self, dialog_with_messages):
+        """Test reordering through the manager, and that a no-op is not recorded."""
+        dialog = dialog_with_messages.dialogs['test']
+        original = list(dialog.messages)
+        undo_depth = len(dialog.history.undo_stack)
+
+        result = dialog_with_messages.reorder_messages([0, 1, 2])
+        assert result == "No reorder needed"
+        assert len(dialog.history.undo_stack) == undo_depth
+
+        assert "Error" in dialog_with_messages.reorder_messages([0, 0, 1])
+
+        dialog_with_messages.reorder_messages([1, 2, 0])
+        assert dialog.messages == [original[1], original[2], original[0]]
+        dialog_with_messages.undo()
+        assert dialog.messages == original
+
+    def test_undo_add_messages(self, manager):
+        """Test that a bulk add is undone and redone as one step."""
+        manager.use_dialog('test', 'test.ipynb', mode='create')
+        manager.add_messages([{'content': "A"}, {'content': "B"}, {'content': "C"}])
+
+        manager.undo()
+        assert len(manager.dialogs['test'].messages) == 0
+
+        manager.redo()
+        assert [m.content for m in manager.dialogs['test'].messages] == ["A", "B", "C"]
+
     def test_undo_delete_message(self, manager):
         """Test undoing message deletion."""
         manager.use_dialog('test', 'test.ipynb', mode='create')
@@ -518,6 +772,31 @@ class TestMockLLMClient:
         assert len(mock_client.call_history) == 1
         assert mock_client.call_history[0]['system_prompt'] == "Be helpful"
 
+    def test_stream_chunks(self):
+        """Test streamed responses come in stream_chunk_size chunks."""
+        client = MockLLMClient(responses=["abcde"], stream_chunk_size=2)
+
+        chunks = list(client.chat([{"role": "user", "content": "Hi"}], stream=True))
+
+        assert chunks == ["ab", "cd", "e"]
+
+        with pytest.raises(ValueError):
+            MockLLMClient(stream_chunk_size=0)
+
+    def test_history_limit(self):
+        """Test call history keeps only the most recent calls."""
+        client = MockLLMClient(history_limit=2)
+        for text in ("one", "two", "three"):
+            client.chat([{"role": "user", "content": [{"type": "text", "text": text}]}])
+
+        assert len(client.call_history) == 2
+        assert client.call_history[0]['messages'][0]['content'][0]['text'] == "two"
+        assert client.call_history[-2:] == client.call_history
+        client.assert_last_message_contains("thr")
+        assert client.get_all_user_messages() == ["two", "three"]
+        with pytest.raises(AssertionError):
+            client.assert_last_message_contains("two")
+
     def test_tool_use_response(self):
         """Test mock with tool calls."""
         client = MockLLMClient(responses=[
@@ -637,6 +916,64 @@ class TestContextBuilder:
         content_texts = [m['content'] for m in context]
         assert any('Important' in c for c in content_texts)
 
+    def test_code_output_parsed_only_when_json(self):
+        """Test code outputs are formatted from JSON and plain text is ignored."""
+        builder = ContextBuilder(max_tokens=100000)
+        stored = Message(content="1", msg_type='code', output=json.dumps(
+            [{'output_type': 'execute_result', 'data': {'text/plain': ['1']}}]
+        ))
+        plain = Message(content="2", msg_type='code', output="not json")
+
+        context = builder.build_context([stored, plain])
+
+        assert "Output:\n```\n1\n```" in context[0]['content']
+        assert "Output" not in context[1]['content']
+
+    def test_deduplicate_repeated_messages(self):
+        """Test identical messages are sent once when deduplicating."""
+        builder = ContextBuilder(max_tokens=100000)
+        messages = [
+            Message(content="Same", msg_type='note'),
+            Message(content="Other", msg_type='note'),
+            Message(content="Same", msg_type='note'),
+        ]
+
+        assert len(builder.build_context(messages)) == 3
+        context = builder.build_context(messages, deduplicate=True)
+        assert [m['content'] for m in context] == ["[Note]\nOther", "[Note]\nSame"]
+
+    def test_old_messages_past_budget_not_formatted(self):
+        """Test messages that can't fit are rejected before formatting."""
+        builder = ContextBuilder(max_tokens=1000)
+        messages = [Message(content="x" * 400, msg_type='note') for _ in range(500)]
+        formatted = []
+        format_message = builder._format_message
+        builder._format_message = lambda msg, *args: formatted.append(msg) or format_message(msg, *args)
+
+        context = builder.build_context(messages, reserved_tokens=0)
+
+        assert len(context) == 9
+        assert len(formatted) < 100
+
+    def test_token_counts_cached_until_edit(self):
+        """Test repeated builds only count new or edited messages."""
+        client = MockLLMClient()
+        calls = []
+        count = client.count_tokens_batch
+        client.count_tokens_batch = lambda texts: calls.extend(texts) or count(texts)
+        builder = ContextBuilder(llm_client=client, max_tokens=100000)
+        msg = Message(content="Hello", msg_type='note')
+
+        first = builder.build_context([msg])
+        assert len(calls) == 1
+        first[0]['content'] = "mutated by caller"
+        assert builder.build_context([msg]) == [{'role': 'user', 'content': "[Note]\nHello"}]
+        assert len(calls) == 1
+
+        msg.content = "Edited"
+        assert builder.build_context([msg])[0]['content'] == "[Note]\nEdited"
+        assert len(calls) == 2
+
 
 # ================== Code Execution Tests ==================
 
@@ -664,6 +1001,22 @@ class TestCodeExecution:
         msg = manager.dialogs['test'].messages[0]
         assert msg.output != ""
 
+    def test_shell_started_lazily(self, manager):
+        """Test that the kernel only starts on the first code execution."""
+        manager.use_dialog('test', 'test.ipynb', mode='create')
+        manager.add_message("z = 1", msg_type='code')
+        dialog = manager.dialogs['test']
+        assert dialog.shell is None
+
+        # Restarting a kernel that never started is a no-op
+        assert "restarted" in manager.restart_kernel()
+        assert dialog.shell is None
+
+        manager.execute_code("z = 3")
+        assert dialog.shell is not None
+        manager.restart_kernel()
+        assert any("NameError" in str(r) for r in manager.execute_code("print(z)"))
+
 
 # ================== Integration Tests ==================
 
@@ -719,3 +1072,22 @@ class TestIntegration:
         # State should be persisted (only one message)
         assert len(manager.dialogs['test2'].messages) == 1
         assert manager.dialogs['test2'].messages[0].content == "One"
+
+    def test_package_exports_dialog_symbols_lazily(self):
+        """Test that importing headlesnb does not load the dialog stack until needed."""
+        import subprocess
+        import sys
+
+        code = (
+            "import sys\n"
+            "from headlesnb import NotebookManager\n"
+            "assert 'headlesnb.dialogmanager' not in sys.modules\n"
+            "assert 'headlesnb.tools' not in sys.modules\n"
+            "from headlesnb import DialogManager, TOOL_SCHEMAS\n"
+            "assert 'headlesnb.dialogmanager' in sys.modules\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).parent.parent)
+
+        import headlesnb
+        assert headlesnb.DialogManager is DialogManager
+        assert 'notebook_to_dialog' in dir(headlesnb)
@@ -194,6 +194,18 @@ print(x + y)
         error = out_error(outputs)
         assert error is not None  # Should have NameError
 
+    def test_stop_flag_is_per_shell(self, shell):
+        """Test that the patched stop flag is an Event owned by each shell"""
+        assert CaptureShell._headlesnb_patched
+        other = CaptureShell()
+
+        shell.stop_execution()
+        assert shell._stop_execution.is_set()
+        assert not other._stop_execution.is_set()
+
+        shell.restart_kernel()
+        assert not shell._stop_execution.is_set()
+
     @pytest.mark.skip(reason="stop_execution integration not supported in upstream execnb")
     def test_stop_execution(self, shell):
         """Test stopping execution"""
@@ -1,5 +1,6 @@
 """Unit tests for NotebookManager"""
 
+import os
 import pytest
 import tempfile
 import shutil
@@ -55,6 +56,43 @@ class TestNotebookManager:
         result = manager.list_files(pattern="*.ipynb")
         assert "test_notebook.ipynb" in result
 
+    def test_list_files_pattern_in_subdirectories(self, manager, temp_dir):
+        """Test that pattern filtering still descends into non-matching directories"""
+        (temp_dir / "data" / "raw").mkdir(parents=True)
+        (temp_dir / "data" / "a.csv").write_text("x")
+        (temp_dir / "data" / "raw" / "b.csv").write_text("x")
+        (temp_dir / "data" / "notes.txt").write_text("x")
+
+        result = manager.list_files(pattern="*.csv", max_depth=2)
+        assert "Showing 1-2 of 2 items" in result
+        assert "a.csv\tfile" in result
+        assert "b.csv\tfile" in result
+        assert "notes.txt" not in result
+
+        # Depth bound is respected
+        result = manager.list_files(pattern="*.csv", max_depth=1)
+        assert "b.csv" not in result
+
+        # Patterns with a separator match against the relative path
+        result = manager.list_files(pattern="data/raw/*", max_depth=2)
+        assert "b.csv" in result
+        assert "a.csv" not in result
+
+        # Matching follows the platform's case sensitivity, like fnmatch
+        result = manager.list_files(pattern="*.CSV", max_depth=2)
+        assert ("a.csv" in result) == (os.path.normcase("A") == "a")
+
+    def test_list_files_subpath_and_symlinks(self, manager, temp_dir):
+        """Test relative paths from a subpath and that symlinked dirs are not followed"""
+        (temp_dir / "data" / "raw").mkdir(parents=True)
+        (temp_dir / "data" / "raw" / "b.csv").write_text("x")
+        (temp_dir / "data" / "loop").symlink_to(temp_dir / "data", target_is_directory=True)
+
+        result = manager.list_files(path="data", max_depth=3)
+        assert "data/raw/b.csv\tfile" in result
+        assert "data/loop\tdirectory" in result
+        assert "data/loop/" not in result
+
     def test_list_files_pagination(self, manager, temp_dir):
         """Test file listing pagination"""
         # Create multiple files
@@ -67,6 +105,79 @@ class TestNotebookManager:
         result = manager.list_files(limit=10, start_index=10)
         assert "Showing 11-20 of" in result
 
+    def test_list_files_pages_match_full_sort(self, manager, temp_dir):
+        """Test that partial pages agree with the fully sorted listing"""
+        for i in range(30):
+            (temp_dir / f"file_{i}.txt").touch()
+
+        def paths(result):
+            return [line.split("\t")[0] for line in result.splitlines()[2:]]
+
+        full = paths(manager.list_files(limit=0))
+        assert full == sorted(full)
+        pages = [paths(manager.list_files(limit=7, start_index=i)) for i in range(0, 30, 7)]
+        assert sum(pages, []) == full
+
+    def test_list_files_modified_time(self, manager, temp_dir):
+        """Test that Last_Modified shows the local mtime to the second"""
+        from datetime import datetime
+
+        ts = 1_700_000_000.75
+        (temp_dir / "a.txt").write_text("x")
+        os.utime(temp_dir / "a.txt", (ts, ts))
+
+        expected = datetime.fromtimestamp(int(ts)).strftime("%Y-%m-%d %H:%M:%S")
+        assert f"a.txt\tfile\t1 B\t{expected}" in manager.list_files()
+
+    def test_list_files_parallel_stat(self, manager, temp_dir, monkeypatch):
+        """Test that HEADLESNB_PARALLEL_SCAN gives the same listing"""
+        (temp_dir / "sub").mkdir()
+        for i in range(10):
+            (temp_dir / f"file_{i}.txt").write_text("x" * i)
+
+        serial = manager.list_files(limit=0)
+        monkeypatch.setenv("HEADLESNB_PARALLEL_SCAN", "1")
+        assert manager.list_files(limit=0) == serial
+        assert "sub\tdirectory" in serial
+
+    def test_list_files_cache(self, manager, temp_dir, monkeypatch):
+        """Test that unchanged trees are not re-walked and changes invalidate the cache"""
+        from headlesnb.base import _ListingCache
+
+        (temp_dir / "data").mkdir()
+        (temp_dir / "data" / "a.csv").write_text("x")
+        old = 1_000_000_000
+        for d in (temp_dir, temp_dir / "data"):
+            os.utime(d, (old, old))
+
+        walks = []
+        real_walk = _ListingCache._walk
+        monkeypatch.setattr(_ListingCache, "_walk", staticmethod(
+            lambda *args: walks.append(args) or real_walk(*args)
+        ))
+
+        assert "a.csv" in manager.list_files(max_depth=2)
+        assert "a.csv" in manager.list_files(max_depth=2, limit=1, start_index=1)
+        assert len(walks) == 1
+
+        # A change in a nested directory invalidates the cached walk
+        (temp_dir / "data" / "b.csv").write_text("x")
+        assert "b.csv" in manager.list_files(max_depth=2)
+        assert len(walks) == 2
+
+    def test_list_files_pattern_compiled_once(self, manager, temp_dir):
+        """Test that paging with the same pattern reuses the compiled matcher"""
+        from headlesnb.base import _glob_matcher
+
+        for i in range(30):
+            (temp_dir / f"file_{i}.txt").touch()
+
+        _glob_matcher.cache_clear()
+        assert "Showing 1-10 of 30" in manager.list_files(pattern="file_*", limit=10)
+        assert "Showing 11-20 of 30" in manager.list_files(pattern="file_*", limit=10, start_index=10)
+        info = _glob_matcher.cache_info()
+        assert (info.misses, info.hits) == (1, 1)
+
     def test_list_kernels_empty(self, manager):
         """Test listing kernels when none are active"""
         result = manager.list_kernels()
@@ -189,6 +300,22 @@ class TestNotebookManager:
         result = manager.read_notebook("test", start_index=0, limit=1)
         assert "Showing cells 0-0 of 3" in result
 
+    def test_read_notebook_cache_invalidation(self, manager, sample_notebook):
+        """Test that cached read_notebook output is refreshed after changes"""
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        first = manager.read_notebook("test")
+        assert manager.read_notebook("test") is first
+
+        manager.move_cell(2, 0)
+        moved = manager.read_notebook("test")
+        assert moved.index("x = 42") < moved.index("Hello, World")
+
+        manager.undo()
+        assert manager.read_notebook("test") == first
+
+        manager.execute_cell(0, timeout=10)
+        assert "Outputs:" in manager.read_notebook("test", response_format="detailed")
+
     # ================== Cell Tools Tests ==================
 
     def test_insert_cell_code(self, manager, sample_notebook):
@@ -219,6 +346,34 @@ class TestNotebookManager:
         nb = manager.notebooks["test"].notebook
         assert nb.cells[-1].source == "z = 200"
 
+    def test_insert_cells(self, manager, sample_notebook):
+        """Test inserting several cells as one undoable operation"""
+        from execnb.nbio import read_nb
+
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        result = manager.insert_cells(1, [("code", "a = 1"), ("markdown", "## Notes")])
+        assert "✓ 2 cell(s) inserted at indices 1-2" in result
+
+        nb = manager.notebooks["test"].notebook
+        assert [c.source for c in nb.cells[:4]] == ["print('Hello, World!')", "a = 1", "## Notes", "# Test Notebook"]
+        assert [c.idx_ for c in nb.cells] == [0, 1, 2, 3, 4]
+        assert len(read_nb(sample_notebook).cells) == 5
+
+        manager.undo()
+        assert len(nb.cells) == 3
+        assert nb.cells[1].source == "# Test Notebook"
+
+        manager.redo()
+        assert nb.cells[2].source == "## Notes"
+
+    def test_insert_cells_append_and_invalid(self, manager, sample_notebook):
+        """Test appending cells and rejecting bad input"""
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        assert "indices 3-4" in manager.insert_cells(-1, [("code", "a = 1"), ("code", "b = 2")])
+        assert "Invalid cell_type" in manager.insert_cells(0, [("raw", "x")])
+        assert "out of range" in manager.insert_cells(10, [("code", "x")])
+        assert "Error" in manager.insert_cells(0, [])
+
     def test_insert_cell_no_active(self, manager):
         """Test error when no active notebook"""
         result = manager.insert_cell(0, "code", "test")
@@ -272,6 +427,81 @@ class TestNotebookManager:
         # Should have error
         assert any("Error" in str(o) for o in outputs)
 
+    def test_execute_cells(self, manager, sample_notebook):
+        """Test executing several cells in one call"""
+        from execnb.nbio import read_nb
+
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        outputs = manager.execute_cells([0, 2], timeout=10)
+
+        output_text = " ".join(str(o) for o in outputs)
+        assert "Cell [0]:" in output_text
+        assert "Hello, World!" in output_text
+        assert "42" in output_text
+
+        # Outputs are persisted with the notebook
+        nb = read_nb(sample_notebook)
+        assert nb.cells[0].outputs
+        assert nb.cells[2].outputs
+
+    def test_execute_cells_stops_on_error(self, manager, sample_notebook):
+        """Test that execute_cells skips remaining cells after an error"""
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        manager.insert_cell(0, "code", "raise ValueError('Test error')")
+        outputs = manager.execute_cells([0, 1], timeout=10)
+
+        output_text = " ".join(str(o) for o in outputs)
+        assert "skipped cells [1]" in output_text
+        assert "Hello, World!" not in output_text
+
+    def test_execute_cells_stop_requested(self, manager, sample_notebook):
+        """Test that a stop request skips the remaining cells of the batch"""
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        manager.overwrite_cell_source(0, "get_ipython().stop_execution()")
+        outputs = manager.execute_cells([0, 2], timeout=10)
+
+        output_text = " ".join(str(o) for o in outputs)
+        assert "skipped cells [2]" in output_text
+        assert "42" not in output_text
+
+        # The stop request does not carry over to the next batch
+        outputs = manager.execute_cells([2], timeout=10)
+        assert "42" in " ".join(str(o) for o in outputs)
+
+    def test_execute_cells_invalid(self, manager, sample_notebook):
+        """Test that execute_cells validates all indices before running"""
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        assert "out of range" in manager.execute_cells([0, 10])[0]
+        assert "not a code cell" in manager.execute_cells([0, 1])[0]
+        assert not manager.notebooks["test"].notebook.cells[0].get('outputs')
+
+    def test_execute_cell_use_cache(self, manager, sample_notebook):
+        """Test that use_cache skips re-running the last executed source"""
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        manager.execute_code("n = 0")
+        manager.overwrite_cell_source(0, "n += 1\nprint(n)")
+
+        assert "1" in str(manager.execute_cell(0, timeout=10))
+        assert "1" in str(manager.execute_cell(0, timeout=10, use_cache=True))
+        assert "n = 1" in str(manager.execute_code("print(f'n = {n}')"))
+
+        # The execute_code call changed kernel state, so the cache is invalid
+        assert "2" in str(manager.execute_cell(0, timeout=10, use_cache=True))
+
+        # Without use_cache the cell always runs
+        assert "3" in str(manager.execute_cell(0, timeout=10))
+
+    def test_execute_cell_cache_cleared_on_restart(self, manager, sample_notebook):
+        """Test that restarting the kernel clears the execution cache"""
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        manager.execute_cell(2, timeout=10)
+        assert manager.notebooks["test"].exec_cache
+
+        manager.restart_notebook("test")
+        nb_info = manager.notebooks["test"]
+        assert not nb_info.exec_cache
+        assert nb_info.exec_chain == ""
+
     def test_insert_execute_code_cell(self, manager, sample_notebook):
         """Test inserting and executing a code cell"""
         manager.use_notebook("test", str(sample_notebook.name), mode="connect")
@@ -302,6 +532,34 @@ class TestNotebookManager:
         # Should not have outputs section if not executed
         assert "print('Hello, World!')" in output_text
 
+    def test_format_size(self, manager):
+        """Test human-readable sizes across unit boundaries"""
+        assert manager._format_size(0) == "0 B"
+        assert manager._format_size(1023) == "1023 B"
+        assert manager._format_size(1024) == "1.0 KB"
+        assert manager._format_size(1536) == "1.5 KB"
+        assert manager._format_size(1024 ** 2) == "1.0 MB"
+        assert manager._format_size(5 * 1024 ** 3) == "5.0 GB"
+        assert manager._format_size(3 * 1024 ** 4) == "3.0 TB"
+
+    def test_format_outputs_images(self, manager):
+        """Test image outputs: str payloads kept as is, oversized ones truncated"""
+        from headlesnb.base import MAX_INLINE_PAYLOAD
+
+        small = "iVBOR" * 10
+        large = "A" * (MAX_INLINE_PAYLOAD + 1)
+        outputs = manager._format_outputs([
+            {'output_type': 'display_data', 'data': {'image/png': small}},
+            {'output_type': 'display_data', 'data': {'image/jpeg': [large[:10], large[10:]]}},
+            {'output_type': 'stream', 'name': 'stdout', 'text': "hi\n"},
+        ])
+
+        assert outputs[0] == {'type': 'image', 'format': 'png', 'data': small}
+        assert outputs[1]['truncated'] is True
+        assert outputs[1]['size'] == len(large)
+        assert len(outputs[1]['data']) == 256
+        assert outputs[2] == "[stdout]\nhi\n"
+
     def test_delete_cell_single(self, manager, sample_notebook):
         """Test deleting a single cell"""
         manager.use_notebook("test", str(sample_notebook.name), mode="connect")
@@ -462,6 +720,51 @@ class TestNotebookManager:
         manager.unuse_notebook("nb1")
         manager.unuse_notebook("nb2")
 
+    def test_kernel_pool_evicts_and_restores(self, temp_dir):
+        """Test that only max_live_kernels namespaces stay in memory"""
+        manager = NotebookManager(root_path=str(temp_dir), max_live_kernels=1)
+        manager.use_notebook("nb1", "nb1.ipynb", mode="create")
+        manager.execute_code("import json\ndata = {'a': [1, 2]}")
+
+        manager.use_notebook("nb2", "nb2.ipynb", mode="create")
+        assert "data" not in manager.notebooks["nb1"].shell.user_ns
+        kernels = manager.list_kernels()
+        assert "nb1\tPython 3 (execnb)\tpython\tevicted" in kernels
+        assert "nb2\tPython 3 (execnb)\tpython\tidle" in kernels
+
+        manager.set_active_notebook("nb1")
+        outputs = manager.execute_code("print(json.dumps(data))")
+        assert '{"a": [1, 2]}' in " ".join(str(o) for o in outputs)
+        assert "nb2\tPython 3 (execnb)\tpython\tevicted" in manager.list_kernels()
+
+    def test_set_active_notebook_activates_under_lock(self, temp_dir, monkeypatch):
+        """Test that switching notebooks only touches the kernel pool under the lock"""
+        manager = NotebookManager(root_path=str(temp_dir), max_live_kernels=1)
+        manager.use_notebook("nb1", "nb1.ipynb", mode="create")
+        manager.use_notebook("nb2", "nb2.ipynb", mode="create")
+
+        held = []
+        activate = manager._kernels.activate
+
+        def checking_activate(nb_info):
+            held.append(manager._lock.locked())
+            activate(nb_info)
+
+        monkeypatch.setattr(manager._kernels, "activate", checking_activate)
+        assert "now active" in manager.set_active_notebook("nb1")
+        assert held == [True]
+
+    def test_kernel_pool_restart_discards_swapped_namespace(self, temp_dir):
+        """Test that restarting an evicted notebook does not restore old state"""
+        manager = NotebookManager(root_path=str(temp_dir), max_live_kernels=1)
+        manager.use_notebook("nb1", "nb1.ipynb", mode="create")
+        manager.execute_code("value = 1")
+        manager.use_notebook("nb2", "nb2.ipynb", mode="create")
+
+        manager.restart_notebook("nb1")
+        manager.set_active_notebook("nb1")
+        assert "value" not in manager.notebooks["nb1"].shell.user_ns
+
     # ================== Cell Reordering Tests ==================
 
     def test_move_cell(self, manager, sample_notebook):
@@ -698,6 +1001,134 @@ class TestNotebookManager:
         assert "Hello, World" in nb.cells[1].source
         assert "# Test Notebook" in nb.cells[2].source
 
+    def test_changes_are_debounced_until_save(self, temp_dir, sample_notebook):
+        """Test that a burst of changes is written once, after save_notebook"""
+        from execnb.nbio import read_nb
+
+        manager = NotebookManager(root_path=str(temp_dir), save_delay=60)
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        manager.insert_cell(0, "code", "a = 1")
+        manager.reorder_cells([3, 0, 1, 2])
+        manager.swap_cells(0, 1)
+
+        nb_info = manager.notebooks["test"]
+        assert nb_info.dirty
+        assert nb_info.save_timer is not None
+        assert [c.idx_ for c in nb_info.notebook.cells] == [0, 1, 2, 3]
+
+        # File still has the original cells
+        assert len(read_nb(sample_notebook).cells) == 3
+
+        result = manager.save_notebook()
+        assert "saved" in result
+        assert not nb_info.dirty
+        assert nb_info.save_timer is None
+        assert [c.source for c in read_nb(sample_notebook).cells[:2]] == ["a = 1", "x = 42\nprint(x)"]
+
+        result = manager.save_notebook("test")
+        assert "no unsaved changes" in result
+
+    def test_debounced_save_fires(self, temp_dir, sample_notebook):
+        """Test that the debounce timer writes the notebook without an explicit save"""
+        import time
+        from execnb.nbio import read_nb
+
+        manager = NotebookManager(root_path=str(temp_dir), save_delay=0.01)
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        manager.insert_cell(0, "code", "a = 1")
+
+        nb_info = manager.notebooks["test"]
+        deadline = time.time() + 5
+        while nb_info.dirty and time.time() < deadline:
+            time.sleep(0.01)
+        assert not nb_info.dirty
+        assert read_nb(sample_notebook).cells[0].source == "a = 1"
+
+    def test_debounced_save_failure_is_logged(self, temp_dir, sample_notebook, monkeypatch, caplog):
+        """Test that a failing timer save is logged and leaves the notebook dirty"""
+        import headlesnb.nb_manager as nb_manager
+
+        def fail(nb, path):
+            raise ValueError("cannot serialize")
+
+        manager = NotebookManager(root_path=str(temp_dir), save_delay=60)
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        manager.insert_cell(0, "code", "a = 1")
+        nb_info = manager.notebooks["test"]
+        nb_info.save_timer.cancel()
+
+        monkeypatch.setattr(nb_manager, "_write_notebook_atomic", fail)
+        with caplog.at_level("ERROR", logger="headlesnb.nb_manager"):
+            manager._flush_notebook(nb_info)
+        assert nb_info.dirty
+        assert "Failed to save notebook 'test'" in caplog.text
+
+    def test_unuse_notebook_flushes_pending_save(self, temp_dir, sample_notebook):
+        """Test that unuse_notebook writes pending changes and cancels the timer"""
+        from execnb.nbio import read_nb
+
+        manager = NotebookManager(root_path=str(temp_dir), save_delay=60)
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        manager.insert_cell(0, "code", "a = 1")
+        timer = manager.notebooks["test"].save_timer
+
+        manager.unuse_notebook("test")
+        assert not timer.is_alive() or timer.finished.is_set()
+        assert read_nb(sample_notebook).cells[0].source == "a = 1"
+
+    def test_reordering_defers_write(self, manager, sample_notebook):
+        """Test that move/swap/reorder only mark the notebook dirty"""
+        from execnb.nbio import read_nb
+
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        before = sample_notebook.read_bytes()
+        manager.move_cell(2, 0)
+        manager.swap_cells(0, 1)
+        manager.reorder_cells([2, 0, 1])
+
+        nb_info = manager.notebooks["test"]
+        assert nb_info.dirty
+        assert nb_info.save_timer is None
+        assert sample_notebook.read_bytes() == before
+
+        manager.unuse_notebook("test")
+        assert [c.source for c in read_nb(sample_notebook).cells] == [
+            "# Test Notebook", "print('Hello, World!')", "x = 42\nprint(x)"
+        ]
+
+    def test_save_notebook_writes_atomically(self, manager, sample_notebook, temp_dir):
+        """Test that saves leave a valid notebook and no temp files behind"""
+        import json
+        from headlesnb.nb_manager import _dump_notebook
+
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        manager.insert_cell(0, "code", "s = 'ünïcode'")
+
+        data = json.loads(sample_notebook.read_text(encoding="utf-8"))
+        assert "".join(data["cells"][0]["source"]) == "s = 'ünïcode'"
+        assert sample_notebook.read_bytes() == _dump_notebook(manager.notebooks["test"].notebook)
+        assert [p.name for p in temp_dir.iterdir()] == [sample_notebook.name]
+
+    def test_create_notebook_matches_save_format(self, manager, temp_dir):
+        """Test that created and saved notebooks use execnb's write_nb layout"""
+        from execnb.nbio import nb2dict
+        import json
+
+        manager.use_notebook("new", "new.ipynb", mode="create")
+        path = temp_dir / "new.ipynb"
+        nb = manager.notebooks["new"].notebook
+        expected = json.dumps(nb2dict(nb), sort_keys=True, indent=1, ensure_ascii=False) + "\n"
+        assert path.read_text(encoding="utf-8") == expected
+
+        manager.insert_cell(0, "code", "x = 1")
+        expected = json.dumps(nb2dict(nb), sort_keys=True, indent=1, ensure_ascii=False) + "\n"
+        assert path.read_text(encoding="utf-8") == expected
+
+    def test_save_notebook_not_found(self, manager):
+        """Test saving without an active or known notebook"""
+        assert "Error" in manager.save_notebook()
+        assert "not found" in manager.save_notebook("nonexistent")
+
     # ================== Undo/Redo Tests ==================
 
     def test_undo_insert_cell(self, manager, sample_notebook):
@@ -736,6 +1167,41 @@ class TestNotebookManager:
         assert len(nb.cells) == original_count
         assert nb.cells[1].source == original_source
 
+    def test_undo_redo_delete_scattered_cells(self, manager, temp_dir):
+        """Test deleting non-adjacent cells and restoring them in place"""
+        manager.use_notebook("test", "scattered.ipynb", mode="create")
+        manager.insert_cells(0, [("code", f"c{i}") for i in range(10)])
+        nb = manager.notebooks["test"].notebook
+
+        manager.delete_cell([8, 2, 5, 2])
+        assert [c.source for c in nb.cells] == ["c0", "c1", "c3", "c4", "c6", "c7", "c9"]
+
+        manager.undo()
+        assert [c.source for c in nb.cells] == [f"c{i}" for i in range(10)]
+        assert [c.idx_ for c in nb.cells] == list(range(10))
+
+        manager.redo()
+        assert [c.source for c in nb.cells] == ["c0", "c1", "c3", "c4", "c6", "c7", "c9"]
+        assert [c.idx_ for c in nb.cells] == list(range(7))
+
+    def test_undo_delete_cell_keeps_outputs(self, manager, sample_notebook):
+        """Test that undoing a deletion restores cells with their outputs and indices"""
+        manager.use_notebook("test", str(sample_notebook.name), mode="connect")
+        manager.execute_cells([0, 2], timeout=10)
+
+        nb = manager.notebooks["test"].notebook
+        deleted = [nb.cells[0], nb.cells[2]]
+
+        result = manager.delete_cell([0, 2], include_source=True)
+        assert "x = 42\nprint(x)" in result
+        assert [c.idx_ for c in nb.cells] == [0]
+
+        manager.undo()
+        assert nb.cells[0] is deleted[0]
+        assert nb.cells[2] is deleted[1]
+        assert nb.cells[2].outputs
+        assert [c.idx_ for c in nb.cells] == [0, 1, 2]
+
     def test_undo_overwrite_cell(self, manager, sample_notebook):
         """Test undoing a cell overwrite"""
         manager.use_notebook("test", str(sample_notebook.name), mode="connect")
@@ -1076,6 +1542,24 @@ class TestNotebookManager:
         assert "Error" in result
         assert "No active notebook" in result
 
+    def test_history_max_size(self, temp_dir):
+        """Test that HISTORY_MAX_SIZE bounds the undo history, dropping the oldest"""
+        class SmallHistoryManager(NotebookManager):
+            HISTORY_MAX_SIZE = 3
+
+        manager = SmallHistoryManager(root_path=str(temp_dir))
+        manager.use_notebook("small", "small.ipynb", mode="create")
+        for i in range(5):
+            manager.insert_cell(-1, "code", f"x = {i}")
+
+        history = manager.notebooks["small"].history
+        assert len(history.undo_stack) == 3
+        assert "Undo available: 3" in manager.get_history()
+
+        manager.undo(steps=10)
+        cells = manager.notebooks["small"].notebook.cells
+        assert [c.source for c in cells] == ["x = 0", "x = 1"]
+
     def test_undo_redo_complex_sequence(self, manager, temp_dir):
         """Test a complex sequence of operations with undo/redo"""
         # Create empty notebook
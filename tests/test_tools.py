@@ -18,8 +18,10 @@ class TestToolSchemas:
             "unuse_notebook",
             "read_notebook",
             "insert_cell",
+            "insert_cells",
             "overwrite_cell_source",
             "execute_cell",
+            "execute_cells",
             "insert_execute_code_cell",
             "read_cell",
             "delete_cell",